@@ -0,0 +1,98 @@
+"""
+Compare the "full" and "light" browser modes on real page loads: page load + readiness time,
+bytes transferred, requests made and Chrome RSS per page. Needs Chrome and chromedriver.
+
+Usage:
+    python benchmarks/bench_browser_modes.py [--username NAME | --url URL] [--pages N] [--json]
+
+RSS is only reported when psutil is installed.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+os.environ.setdefault("CACHE_DB_PATH", os.path.join(tempfile.gettempdir(), "leetcode-bench-cache.sqlite3"))
+os.environ.setdefault("HISTORY_ENABLED", "false")
+
+import main  # noqa: E402
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+TRANSFER_JS = """
+const entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+return [entries.reduce((total, e) => total + (e.transferSize || 0), 0), entries.length];
+"""
+
+def chrome_rss_bytes(driver) -> int:
+    """Resident memory of every process started by this session's chromedriver"""
+    if psutil is None:
+        return 0
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        return sum(p.memory_info().rss for p in [root] + root.children(recursive=True))
+    except (psutil.Error, AttributeError):
+        return 0
+
+def bench_mode(mode: str, url: str, pages: int) -> dict:
+    # Launch flags (window size, process model) are read when the session starts
+    main.BROWSER_MODE = mode
+    driver = main.get_chrome_driver()
+    if driver is None:
+        raise SystemExit("Chrome is not available: " + str(main.resolve_chrome_binaries()["error"]))
+    try:
+        main.apply_browser_mode(driver, mode)
+        load_times, transferred, requests_made, rss = [], [], [], []
+        for _ in range(pages):
+            driver.get("about:blank")
+            start = time.perf_counter()
+            driver.get(url)
+            main.wait_for_profile_ready(driver)
+            load_times.append((time.perf_counter() - start) * 1000)
+            size, count = driver.execute_script(TRANSFER_JS)
+            transferred.append(size)
+            requests_made.append(count)
+            rss.append(chrome_rss_bytes(driver))
+        return {
+            "pages": pages,
+            "load_ms_mean": round(statistics.mean(load_times), 1),
+            "load_ms_p50": round(statistics.median(load_times), 1),
+            "transfer_kb_mean": round(statistics.mean(transferred) / 1024, 1),
+            "requests_mean": round(statistics.mean(requests_made), 1),
+            "chrome_rss_mb_max": round(max(rss) / (1024 * 1024), 1) if psutil else None,
+        }
+    finally:
+        driver.quit()
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--username", default="Raushan2288")
+    parser.add_argument("--url", help="page to load instead of the LeetCode profile URL")
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    url = args.url or f"https://leetcode.com/u/{args.username}/"
+    results = {"url": url, "full": bench_mode("full", url, args.pages), "light": bench_mode("light", url, args.pages)}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"URL: {url}, {args.pages} page loads per mode")
+    for mode in ("full", "light"):
+        r = results[mode]
+        rss = f"{r['chrome_rss_mb_max']} MB" if r["chrome_rss_mb_max"] is not None else "n/a (install psutil)"
+        print(f"  {mode:<5} load {r['load_ms_mean']:8.1f} ms  transfer {r['transfer_kb_mean']:8.1f} KB  "
+              f"requests {r['requests_mean']:6.1f}  chrome RSS {rss}")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,90 @@
+"""
+Benchmark parse + extract time per profile page: the single-pass lxml engine in main.extract_from_html
+against the previous BeautifulSoup implementation.
+
+Usage:
+    python benchmarks/bench_extract.py [--page PATH] [--iterations N] [--json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+os.environ.setdefault("CACHE_DB_PATH", os.path.join(tempfile.gettempdir(), "leetcode-bench-cache.sqlite3"))
+os.environ.setdefault("HISTORY_ENABLED", "false")
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from main import extract_from_html  # noqa: E402
+from legacy_extract import legacy_extract_from_html  # noqa: E402
+
+DEFAULT_PAGE = os.path.join(BENCH_DIR, "fixtures", "profile.html")
+
+def run_legacy(html: bytes):
+    return legacy_extract_from_html(BeautifulSoup(html, 'html.parser'), "bench")
+
+def run_single_pass(html: bytes):
+    return extract_from_html(html, "bench")
+
+def measure(func, html: bytes, iterations: int) -> dict:
+    """Time func(html) and report per-page milliseconds"""
+    func(html)  # warm up
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func(html)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": round(statistics.mean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page", default=DEFAULT_PAGE, help="profile HTML page to parse")
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    with open(args.page, "rb") as f:
+        html = f.read()
+
+    legacy = run_legacy(html)
+    single_pass = run_single_pass(html)
+    results = {
+        "page": os.path.basename(args.page),
+        "page_bytes": len(html),
+        "legacy_bs4": measure(run_legacy, html, args.iterations),
+        "single_pass_lxml": measure(run_single_pass, html, args.iterations),
+        # Fields where the engines disagree (the lxml engine also reads difficulty counts whose
+        # label shares the value's CSS class, which the legacy parent.find() lookup missed)
+        "field_differences": sorted(
+            field for field in type(legacy).model_fields
+            if getattr(legacy, field) != getattr(single_pass, field)
+        ),
+    }
+    results["speedup"] = round(results["legacy_bs4"]["mean_ms"] / results["single_pass_lxml"]["mean_ms"], 2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Page: {results['page']} ({results['page_bytes']:,} bytes), {args.iterations} iterations")
+    for name in ("legacy_bs4", "single_pass_lxml"):
+        r = results[name]
+        print(f"  {name:<18} mean {r['mean_ms']:8.3f} ms  p50 {r['p50_ms']:8.3f} ms  p95 {r['p95_ms']:8.3f} ms")
+    print(f"  speedup: {results['speedup']}x")
+    if results["field_differences"]:
+        print(f"  fields that differ: {', '.join(results['field_differences'])}")
+
+if __name__ == "__main__":
+    main()
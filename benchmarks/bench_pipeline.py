@@ -0,0 +1,250 @@
+"""
+End-to-end benchmark of the scraping pipeline against a local stand-in for leetcode.com (fake_leetcode.py),
+so results are reproducible offline and comparable across commits.
+
+Measures:
+  - parser CPU for extract_from_html, extract_from_json_data, extract_from_graphql_data and the embedded
+    __NEXT_DATA__ fast path (find_embedded_state + extract_from_json_data) on the fixtures
+  - per-stage scrape latency (the /metrics stage histograms) for the GraphQL path, the HTML fallback
+    (Selenium when Chrome is available, otherwise the requests-only path) and the fallback on a page
+    that embeds the profile in __NEXT_DATA__
+  - throughput and latency percentiles for N concurrent clients against the FastAPI app, cold and cached
+  - Python memory allocated per request (tracemalloc) and process max RSS
+
+Usage:
+    python benchmarks/bench_pipeline.py [--clients N] [--requests N] [--latency-ms MS] [--json] [--output FILE]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from fake_leetcode import FIXTURES_DIR, FakeLeetCode, load_fixture, next_data_page  # noqa: E402
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=REPO_DIR, capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def bench_parsers(main, iterations: int) -> dict:
+    """Wall and CPU time per call for each extractor on the recorded fixtures"""
+    html = load_fixture("profile.html")
+    state = json.loads(load_fixture("initial_state.json"))
+    graphql_raw = load_fixture("graphql_profile.json")
+    next_data_html = next_data_page(html, graphql_raw.decode())
+    cases = {
+        "extract_from_html": lambda: main.extract_from_html(html, "bench"),
+        "extract_from_json_data": lambda: main.extract_from_json_data(state, "bench"),
+        "extract_from_graphql_data": lambda: main.extract_from_graphql_data(json.loads(graphql_raw)["data"], "bench"),
+        "embedded_next_data": lambda: main.extract_from_json_data(main.find_embedded_state(next_data_html), "bench"),
+    }
+    results = {}
+    for name, func in cases.items():
+        func()  # warm up
+        wall, cpu = [], []
+        for _ in range(iterations):
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            func()
+            wall.append((time.perf_counter() - wall_start) * 1000)
+            cpu.append((time.process_time() - cpu_start) * 1000)
+        results[name] = {
+            "iterations": iterations,
+            "wall_ms_mean": round(statistics.mean(wall), 4),
+            "wall_ms_p95": round(percentile(wall, 0.95), 4),
+            "cpu_ms_mean": round(statistics.mean(cpu), 4),
+        }
+    return results
+
+def bench_stages(main, fake: FakeLeetCode, scrapes: int) -> dict:
+    """Mean time per scrape stage, read back from the stage histograms the service exports"""
+    results = {}
+    for scenario, graphql_errors, next_data in (("graphql", False, False), ("html_fallback", True, False),
+                                                ("next_data", True, True)):
+        fake.graphql_errors = graphql_errors
+        fake.next_data = next_data
+        # Warm up connections (and a browser session) outside the measurement
+        try:
+            main.scrape_leetcode_profile(f"stage-{scenario}-warmup")
+        except main.HTTPException:
+            pass
+        stages_before = main.scrape_stage_seconds.totals()
+        scrapes_before = main.scrape_duration_seconds.totals()
+        start = time.perf_counter()
+        for i in range(scrapes):
+            try:
+                main.scrape_leetcode_profile(f"stage-{scenario}-{i}")
+            except main.HTTPException:
+                pass
+        elapsed = time.perf_counter() - start
+        stages = {}
+        for (stage,), (count, total) in main.scrape_stage_seconds.totals().items():
+            base_count, base_total = stages_before.get((stage,), (0, 0.0))
+            if count > base_count:
+                stages[stage] = {"count": count - base_count, "ms_mean": round((total - base_total) / (count - base_count) * 1000, 3)}
+        strategies = {}
+        for (strategy, outcome), (count, _) in main.scrape_duration_seconds.totals().items():
+            delta = count - scrapes_before.get((strategy, outcome), (0, 0.0))[0]
+            if delta:
+                strategies[f"{strategy}/{outcome}"] = delta
+        results[scenario] = {"scrapes": scrapes, "ms_per_scrape": round(elapsed / scrapes * 1000, 3), "stages": stages, "strategies": strategies}
+    fake.graphql_errors = False
+    fake.next_data = False
+    return results
+
+async def run_clients(app, usernames: list, clients: int) -> dict:
+    """Issue GET /scrape-profile/<username> for every username from `clients` concurrent connections"""
+    import httpx
+
+    pending = list(reversed(usernames))
+    latencies, statuses = [], {}
+
+    async def client_loop(client):
+        while pending:
+            username = pending.pop()
+            start = time.perf_counter()
+            response = await client.get(f"/scrape-profile/{username}")
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return {
+        "requests": len(usernames),
+        "clients": clients,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(usernames) / elapsed, 1),
+        "latency_ms_p50": round(percentile(latencies, 0.50), 2),
+        "latency_ms_p95": round(percentile(latencies, 0.95), 2),
+        "latency_ms_p99": round(percentile(latencies, 0.99), 2),
+        "statuses": statuses,
+    }
+
+async def bench_throughput(main, requests: int, clients: int) -> dict:
+    cold = [f"cold-{i}" for i in range(requests)]
+    # Cached: a small working set, primed once, then requested over and over
+    warm_set = [f"warm-{i}" for i in range(min(requests, 20))]
+    await run_clients(main.app, warm_set, clients)
+    return {
+        "cold": await run_clients(main.app, cold, clients),
+        "cached": await run_clients(main.app, [warm_set[i % len(warm_set)] for i in range(requests)], clients),
+    }
+
+async def bench_memory(main, requests: int, clients: int) -> dict:
+    """Python heap allocated per cold request, and what stays allocated afterwards (the cache, mostly)"""
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    await run_clients(main.app, [f"memory-{i}" for i in range(requests)], clients)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "requests": requests,
+        "peak_kb": round((peak - before) / 1024, 1),
+        "retained_kb_per_request": round((after - before) / requests / 1024, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8, help="concurrent HTTP clients")
+    parser.add_argument("--requests", type=int, default=200, help="requests per throughput scenario")
+    parser.add_argument("--scrapes", type=int, default=20, help="scrapes per stage-latency scenario")
+    parser.add_argument("--iterations", type=int, default=200, help="calls per parser benchmark")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated upstream latency per response")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    fake = FakeLeetCode(latency=args.latency_ms / 1000).start()
+    state_dir = tempfile.mkdtemp(prefix="leetcode-bench-")
+    # Configuration is read at import time, so point the service at the fake upstream first
+    os.environ["LEETCODE_BASE_URL"] = fake.base_url
+    os.environ["CACHE_DB_PATH"] = os.path.join(state_dir, "cache.sqlite3")
+    os.environ["HISTORY_DB_PATH"] = os.path.join(state_dir, "history.sqlite3")
+    os.environ["SINGLE_FLIGHT_LOCK_DIR"] = os.path.join(state_dir, "locks")
+    os.environ.setdefault("CHROMEDRIVER_DOWNLOAD", "false")
+    # Measure the pipeline, not the upstream request budget
+    os.environ.setdefault("UPSTREAM_RATE_LIMIT", "0")
+
+    # The service logs with print(); keep stdout clean for --json
+    with contextlib.redirect_stdout(sys.stderr):
+        import main
+
+    async def run_async_phases():
+        throughput = await bench_throughput(main, args.requests, args.clients)
+        memory = await bench_memory(main, args.requests, args.clients)
+        return throughput, memory
+
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            parsers = bench_parsers(main, args.iterations)
+            stages = bench_stages(main, fake, args.scrapes)
+            throughput, memory = asyncio.run(run_async_phases())
+    finally:
+        main.scrape_executor.shutdown()
+        main.driver_pool.close()
+        fake.stop()
+
+    results = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "chrome_available": main.resolve_chrome_binaries()["available"],
+        "config": {
+            "clients": args.clients,
+            "requests": args.requests,
+            "upstream_latency_ms": args.latency_ms,
+            "fixtures": sorted(os.listdir(FIXTURES_DIR)),
+        },
+        "parsers": parsers,
+        "stages": stages,
+        "throughput": throughput,
+        "memory": memory,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Revision {results['revision']['commit']}{' (dirty)' if results['revision']['dirty'] else ''}, "
+          f"upstream latency {args.latency_ms} ms, Chrome {'available' if results['chrome_available'] else 'unavailable'}")
+    print("Parsers (per call):")
+    for name, r in parsers.items():
+        print(f"  {name:<26} wall {r['wall_ms_mean']:8.3f} ms  p95 {r['wall_ms_p95']:8.3f} ms  cpu {r['cpu_ms_mean']:8.3f} ms")
+    print("Scrape stages (mean):")
+    for scenario, r in stages.items():
+        spans = "  ".join(f"{stage} {s['ms_mean']:.1f}" for stage, s in r["stages"].items())
+        print(f"  {scenario:<14} {r['ms_per_scrape']:8.1f} ms/scrape  [{spans}]  {r['strategies']}")
+    print(f"Throughput ({args.clients} clients):")
+    for scenario, r in throughput.items():
+        print(f"  {scenario:<7} {r['requests_per_second']:8.1f} req/s  p50 {r['latency_ms_p50']:8.1f} ms  "
+              f"p95 {r['latency_ms_p95']:8.1f} ms  p99 {r['latency_ms_p99']:8.1f} ms  {r['statuses']}")
+    print(f"Memory: peak {memory['peak_kb']} KB over {memory['requests']} cold requests, "
+          f"{memory['retained_kb_per_request']} KB retained per request, max RSS {memory['max_rss_mb']} MB")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,148 @@
+"""
+Local stand-in for leetcode.com that serves the recorded fixtures, so the whole pipeline (GraphQL, Selenium and
+requests fallbacks) can run offline.
+
+Usage:
+    python benchmarks/fake_leetcode.py [--port 8765] [--latency-ms 0] [--graphql-errors] [--next-data]
+    LEETCODE_BASE_URL=http://127.0.0.1:8765 uvicorn main:app
+
+Routes:
+    GET  /u/<username>/  fixtures/profile.html with the recorded username replaced; with --next-data its
+                         __NEXT_DATA__ also carries the GraphQL fixture as dehydrated queries, like leetcode.com
+    POST /graphql/       fixtures/graphql_profile.json for the requested username; usernames starting with
+                         "missing-" get LeetCode's "user does not exist" response
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RECORDED_USERNAME = "Raushan2288"
+MISSING_PREFIX = "missing-"
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+def next_data_page(profile_html: bytes, graphql_json: str) -> bytes:
+    """profile.html with the GraphQL fixture's data dehydrated into __NEXT_DATA__, one query per root field"""
+    open_tag = b'<script id="__NEXT_DATA__" type="application/json">'
+    start = profile_html.index(open_tag) + len(open_tag)
+    end = profile_html.index(b"</script>", start)
+    state = json.loads(profile_html[start:end])
+    queries = state["props"]["pageProps"]["dehydratedState"]["queries"]
+    for key, value in json.loads(graphql_json)["data"].items():
+        queries.append({"queryKey": [key, RECORDED_USERNAME], "state": {"data": {key: value}}})
+    return profile_html[:start] + json.dumps(state).encode() + profile_html[end:]
+
+class FakeLeetCode:
+    """Threaded HTTP server replaying the fixtures, with optional per-request latency"""
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, graphql_errors: bool = False,
+                 next_data: bool = False):
+        self.latency = latency
+        # When set, GraphQL answers with errors and no data, pushing scrapes onto the HTML fallbacks
+        self.graphql_errors = graphql_errors
+        # When set, profile pages embed the profile in __NEXT_DATA__ (otherwise only filler queries)
+        self.next_data = next_data
+        self.profile_html = load_fixture("profile.html")
+        self.graphql_json = load_fixture("graphql_profile.json").decode()
+        self.next_data_html = next_data_page(self.profile_html, self.graphql_json)
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, delayed ACKs add ~40 ms per response
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                with fake._lock:
+                    fake.requests_served += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = [part for part in self.path.split("?")[0].split("/") if part]
+                if len(parts) == 2 and parts[0] == "u" and not parts[1].startswith(MISSING_PREFIX):
+                    page = fake.next_data_html if fake.next_data else fake.profile_html
+                    body = page.replace(RECORDED_USERNAME.encode(), parts[1].encode())
+                    self._send(200, body, "text/html; charset=utf-8")
+                else:
+                    self._send(404, b"<html><body>Page not found</body></html>", "text/html; charset=utf-8")
+
+            def do_POST(self):
+                if self.path.split("?")[0].rstrip("/") != "/graphql":
+                    self._send(404, b"{}", "application/json")
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    username = json.loads(self.rfile.read(length))["variables"]["username"]
+                except (ValueError, KeyError, TypeError):
+                    self._send(400, b'{"errors": [{"message": "bad request"}]}', "application/json")
+                    return
+                if fake.graphql_errors:
+                    body = {"errors": [{"message": "Internal error"}]}
+                elif username.startswith(MISSING_PREFIX):
+                    body = {
+                        "data": {"matchedUser": None},
+                        "errors": [{"message": "That user does not exist.", "path": ["matchedUser"]}],
+                    }
+                else:
+                    body = json.loads(fake.graphql_json.replace(RECORDED_USERNAME, username))
+                self._send(200, json.dumps(body).encode(), "application/json")
+
+        return Handler
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self) -> "FakeLeetCode":
+        """Serve from a daemon thread (used by the benchmarks)"""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-leetcode", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every response")
+    parser.add_argument("--graphql-errors", action="store_true", help="fail GraphQL to exercise the HTML fallbacks")
+    parser.add_argument("--next-data", action="store_true", help="embed the profile in the page's __NEXT_DATA__")
+    args = parser.parse_args()
+
+    fake = FakeLeetCode(args.host, args.port, args.latency_ms / 1000, args.graphql_errors, args.next_data)
+    print(f"Serving fixtures on {fake.base_url} (set LEETCODE_BASE_URL to this)")
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+The BeautifulSoup/html.parser implementation of extract_from_html that the single-pass lxml
+engine replaced. Kept only as the baseline for benchmarks/bench_extract.py.
+"""
+from bs4 import BeautifulSoup
+
+from main import ProfileData
+
+def legacy_extract_from_html(soup: BeautifulSoup, username: str) -> ProfileData:
+    """Extract profile data from HTML elements (one find_all traversal per field)"""
+    profile_data = ProfileData(
+        name="",
+        username=username,
+        rank="",
+        avatar_url="",
+        skills=[],
+        contest_rating=None,
+        global_ranking=None,
+        contests_attended=None,
+        problems_solved=None,
+        acceptance_rate=None,
+        easy_problems=None,
+        medium_problems=None,
+        hard_problems=None,
+        problems_attempting=None,
+        submissions_past_year=None,
+        total_active_days=None,
+        max_streak=None
+    )
+    
+    try:
+        # Look for various possible selectors
+        selectors_to_try = [
+            {'name': 'div[class*="text-label-1"]', 'type': 'name'},
+            {'name': 'h1', 'type': 'name'},
+            {'name': 'img[alt*="Avatar"]', 'type': 'avatar'},
+            {'name': 'span[class*="rank"]', 'type': 'rank'},
+            {'name': 'div[class*="location"]', 'type': 'location'},
+            {'name': 'a[href*="github"]', 'type': 'github'},
+            {'name': 'a[href*="linkedin"]', 'type': 'linkedin'},
+        ]
+        
+        for selector in selectors_to_try:
+            elements = soup.select(selector['name'])
+            for element in elements:
+                if selector['type'] == 'name' and not profile_data.name:
+                    profile_data.name = element.get_text(strip=True)
+                elif selector['type'] == 'avatar' and not profile_data.avatar_url:
+                    profile_data.avatar_url = element.get('src', '')
+                elif selector['type'] == 'rank' and not profile_data.rank:
+                    text = element.get_text(strip=True)
+                    if text.replace(',', '').replace('.', '').isdigit():
+                        profile_data.rank = text
+                elif selector['type'] == 'location' and not profile_data.location:
+                    profile_data.location = element.get_text(strip=True)
+                elif selector['type'] == 'github' and not profile_data.github:
+                    href = element.get('href', '')
+                    if 'github.com' in href:
+                        profile_data.github = href.split('/')[-1]
+                elif selector['type'] == 'linkedin' and not profile_data.linkedin:
+                    href = element.get('href', '')
+                    if 'linkedin.com' in href:
+                        profile_data.linkedin = href.split('/')[-1]
+        
+        # Extract contest rating information from HTML
+        try:
+            # Look for contest rating in HTML
+            contest_rating_divs = soup.find_all('div', string=lambda text: text and 'Contest Rating' in text)
+            for div in contest_rating_divs:
+                parent = div.parent
+                if parent:
+                    rating_div = parent.find('div', class_='text-label-1')
+                    if rating_div and rating_div.get_text(strip=True).replace(',', '').isdigit():
+                        profile_data.contest_rating = rating_div.get_text(strip=True)
+                        break
+            
+            # Look for global ranking
+            global_ranking_divs = soup.find_all('div', string=lambda text: text and 'Global Ranking' in text)
+            for div in global_ranking_divs:
+                parent = div.parent
+                if parent:
+                    ranking_div = parent.find('div', class_='text-label-1')
+                    if ranking_div and '/' in ranking_div.get_text(strip=True):
+                        profile_data.global_ranking = ranking_div.get_text(strip=True)
+                        break
+            
+            # Look for contests attended
+            attended_divs = soup.find_all('div', string=lambda text: text and 'Attended' in text)
+            for div in attended_divs:
+                parent = div.parent
+                if parent:
+                    attended_div = parent.find('div', class_='text-label-1')
+                    if attended_div and attended_div.get_text(strip=True).isdigit():
+                        profile_data.contests_attended = attended_div.get_text(strip=True)
+                        break
+        except:
+            pass
+        
+        # Extract problem-solving statistics from HTML
+        try:
+            # Look for problems solved (format: "166/3671")
+            solved_spans = soup.find_all('span', string=lambda text: text and '/' in text and '3671' in text)
+            for span in solved_spans:
+                text = span.get_text(strip=True)
+                if text and '/' in text and not profile_data.problems_solved:
+                    profile_data.problems_solved = text
+                    break
+            
+            # Look for acceptance rate (format: "65.67%")
+            acceptance_spans = soup.find_all('span', string=lambda text: text and '%' in text and '.' in text)
+            for span in acceptance_spans:
+                text = span.get_text(strip=True)
+                if text and '%' in text and '.' in text and not profile_data.acceptance_rate:
+                    profile_data.acceptance_rate = text
+                    break
+            
+            # Look for Easy problems (format: "81/895")
+            easy_divs = soup.find_all('div', string=lambda text: text and 'Easy' in text)
+            for div in easy_divs:
+                parent = div.parent
+                if parent:
+                    easy_div = parent.find('div', class_='text-xs')
+                    if easy_div and '/' in easy_div.get_text(strip=True):
+                        profile_data.easy_problems = easy_div.get_text(strip=True)
+                        break
+            
+            # Look for Medium problems (format: "68/1911")
+            medium_divs = soup.find_all('div', string=lambda text: text and 'Med.' in text)
+            for div in medium_divs:
+                parent = div.parent
+                if parent:
+                    medium_div = parent.find('div', class_='text-xs')
+                    if medium_div and '/' in medium_div.get_text(strip=True):
+                        profile_data.medium_problems = medium_div.get_text(strip=True)
+                        break
+            
+            # Look for Hard problems (format: "17/865")
+            hard_divs = soup.find_all('div', string=lambda text: text and 'Hard' in text)
+            for div in hard_divs:
+                parent = div.parent
+                if parent:
+                    hard_div = parent.find('div', class_='text-xs')
+                    if hard_div and '/' in hard_div.get_text(strip=True):
+                        profile_data.hard_problems = hard_div.get_text(strip=True)
+                        break
+            
+            # Look for problems attempting (format: "6 Attempting")
+            attempting_spans = soup.find_all('span', string=lambda text: text and 'Attempting' in text)
+            for span in attempting_spans:
+                text = span.get_text(strip=True)
+                if text and 'Attempting' in text and not profile_data.problems_attempting:
+                    profile_data.problems_attempting = text
+                    break
+        except:
+            pass
+        
+        # Extract activity statistics from HTML
+        try:
+            # Look for submissions in past year (format: "89 submissions in the past one year")
+            submissions_spans = soup.find_all('span', string=lambda text: text and 'submissions in the past one year' in text)
+            for span in submissions_spans:
+                text = span.get_text(strip=True)
+                if text and 'submissions in the past one year' in text and not profile_data.submissions_past_year:
+                    # Extract the number before "submissions"
+                    parts = text.split(' ')
+                    if len(parts) > 0 and parts[0].isdigit():
+                        profile_data.submissions_past_year = parts[0]
+                        break
+            
+            # Look for total active days (format: "Total active days: 22")
+            active_days_spans = soup.find_all('span', string=lambda text: text and 'Total active days:' in text)
+            for span in active_days_spans:
+                text = span.get_text(strip=True)
+                if text and 'Total active days:' in text and not profile_data.total_active_days:
+                    # Extract the number after the colon
+                    parts = text.split(':')
+                    if len(parts) > 1:
+                        number = parts[1].strip()
+                        if number.isdigit():
+                            profile_data.total_active_days = number
+                            break
+            
+            # Look for max streak (format: "Max streak: 5")
+            streak_spans = soup.find_all('span', string=lambda text: text and 'Max streak:' in text)
+            for span in streak_spans:
+                text = span.get_text(strip=True)
+                if text and 'Max streak:' in text and not profile_data.max_streak:
+                    # Extract the number after the colon
+                    parts = text.split(':')
+                    if len(parts) > 1:
+                        number = parts[1].strip()
+                        if number.isdigit():
+                            profile_data.max_streak = number
+                            break
+        except:
+            pass
+        
+        # Extract skills from various possible locations
+        skill_keywords = ['python', 'java', 'javascript', 'c++', 'sql', 'dsa', 'dbms', 'aida']
+        all_text = soup.get_text().lower()
+        for keyword in skill_keywords:
+            if keyword in all_text and keyword not in profile_data.skills:
+                profile_data.skills.append(keyword)
+                
+    except Exception:
+        pass
+    
+    return profile_data
@@ -1,19 +1,64 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import requests
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field, create_model
+from starlette.datastructures import MutableHeaders
+import httpx
 from bs4 import BeautifulSoup
+import lxml.html
+import numpy as np
 import re
 import json
-from typing import Optional, List
+from typing import Literal, Optional, List, Union
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import (
+    InvalidSessionIdException, JavascriptException, NoSuchWindowException, WebDriverException
+)
 from webdriver_manager.chrome import ChromeDriverManager
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
+import asyncio
+import glob
+import hashlib
+import os
+import queue
+import random
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import warnings
 import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays per-process
+    fcntl = None
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import orjson
+except ImportError:  # v2 responses fall back to the standard json encoder
+    orjson = None
 
 app = FastAPI(title="LeetCode Profile Scraper", version="1.0.0")
 
@@ -49,308 +94,2957 @@ class ProfileData(BaseModel):
     total_active_days: Optional[str] = None
     max_streak: Optional[str] = None
 
+BrowserMode = Literal["full", "light"]
+
+# Every ProfileData field a scrape can fill in (username is always known)
+PROFILE_FIELDS = tuple(field for field in ProfileData.model_fields if field != "username")
+
+# OpenAPI schema of a fields= projection: username plus only the requested fields
+ProfileProjection = create_model(
+    "ProfileProjection",
+    __doc__="A fields= projection of ProfileData: username and only the requested fields",
+    username=(str, ...),
+    **{field: (Optional[ProfileData.model_fields[field].annotation], None) for field in PROFILE_FIELDS},
+)
+
+FIELDS_DESCRIPTION = "Only scrape and return these ProfileData fields (plus username); all of them when omitted"
+FIELDS_QUERY_DESCRIPTION = (
+    "Comma-separated ProfileData fields to scrape and return (plus username); all of them when omitted"
+)
+PROFILE_RESPONSES = {200: {
+    "model": Union[ProfileData, ProfileProjection],
+    "description": "The full profile, or a ProfileProjection when fields is given",
+}}
+
+# Fields fetched, extracted and cached together; a fields= projection is planned at this granularity
+FIELD_GROUPS = {
+    "identity": ("name", "rank", "avatar_url", "location", "university", "github", "linkedin"),
+    "skills": ("skills",),
+    "contest": ("contest_rating", "global_ranking", "contests_attended"),
+    "problems": ("problems_solved", "acceptance_rate", "easy_problems", "medium_problems", "hard_problems"),
+    "progress": ("problems_attempting",),
+    "activity": ("submissions_past_year", "total_active_days", "max_streak"),
+}
+FIELD_GROUP_OF = {field: group for group, fields in FIELD_GROUPS.items() for field in fields}
+
+def empty_profile(username: str) -> ProfileData:
+    return ProfileData(name="", username=username, rank="", avatar_url="", skills=[])
+
+def parse_fields(fields) -> Optional[frozenset]:
+    """Validate a fields= projection (list or comma-separated string); None means the whole profile"""
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    names = {field.strip() for field in fields if field.strip()} - {"username"}
+    unknown = sorted(names - set(PROFILE_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)} (available: username, {', '.join(PROFILE_FIELDS)})",
+        )
+    if not names:
+        raise HTTPException(status_code=400, detail="fields must name at least one profile field besides username")
+    return None if len(names) == len(PROFILE_FIELDS) else frozenset(names)
+
+def field_groups(fields: frozenset) -> tuple:
+    """The groups covering a projection, in FIELD_GROUPS order"""
+    return tuple(group for group in FIELD_GROUPS if any(FIELD_GROUP_OF[field] == group for field in fields))
+
+def group_fields(groups: tuple) -> frozenset:
+    return frozenset(field for group in groups for field in FIELD_GROUPS[group])
+
+def project_profile(profile: ProfileData, fields: frozenset) -> dict:
+    """The requested fields of a profile (plus username), in ProfileData order"""
+    projected = {"username": profile.username}
+    projected.update((field, getattr(profile, field)) for field in PROFILE_FIELDS if field in fields)
+    return projected
+
+def _parse_count(value: Optional[str]) -> Optional[int]:
+    """'8,06,824' -> 806824, '6 Attempting' -> 6"""
+    if not value:
+        return None
+    digits = value.strip().split()[0].replace(",", "")
+    return int(digits) if digits.isdigit() else None
+
+def _parse_fraction(value: Optional[str]):
+    """'81/3363' -> (81, 3363); either side is None when missing or malformed"""
+    if not value:
+        return None, None
+    numerator, _, denominator = value.partition("/")
+    return _parse_count(numerator), _parse_count(denominator)
+
+def _parse_rate(value: Optional[str]) -> Optional[float]:
+    """'65.67%' -> 65.67, '1,433' -> 1433.0"""
+    if not value:
+        return None
+    try:
+        return float(value.strip().rstrip("%").replace(",", ""))
+    except ValueError:
+        return None
+
+class ProfileStats:
+    """Compact parsed form of ProfileData: numbers instead of display strings (the v2 response body)"""
+    __slots__ = (
+        "username", "name", "avatar_url", "location", "university", "github", "linkedin", "skills",
+        "ranking", "contest_rating", "contest_global_ranking", "contest_participants", "contests_attended",
+        "problems_solved", "problems_total", "easy_solved", "easy_total", "medium_solved", "medium_total",
+        "hard_solved", "hard_total", "acceptance_rate", "problems_attempting",
+        "submissions_past_year", "total_active_days", "max_streak",
+    )
+
+    @classmethod
+    def from_profile(cls, profile: "ProfileData") -> "ProfileStats":
+        stats = cls()
+        stats.username = profile.username
+        stats.name = profile.name
+        stats.avatar_url = profile.avatar_url
+        stats.location = profile.location
+        stats.university = profile.university
+        stats.github = profile.github
+        stats.linkedin = profile.linkedin
+        stats.skills = list(profile.skills)
+        stats.ranking = _parse_count(profile.rank)
+        stats.contest_rating = _parse_rate(profile.contest_rating)
+        stats.contest_global_ranking, stats.contest_participants = _parse_fraction(profile.global_ranking)
+        stats.contests_attended = _parse_count(profile.contests_attended)
+        stats.problems_solved, stats.problems_total = _parse_fraction(profile.problems_solved)
+        stats.easy_solved, stats.easy_total = _parse_fraction(profile.easy_problems)
+        stats.medium_solved, stats.medium_total = _parse_fraction(profile.medium_problems)
+        stats.hard_solved, stats.hard_total = _parse_fraction(profile.hard_problems)
+        stats.acceptance_rate = _parse_rate(profile.acceptance_rate)
+        stats.problems_attempting = _parse_count(profile.problems_attempting)
+        stats.submissions_past_year = _parse_count(profile.submissions_past_year)
+        stats.total_active_days = _parse_count(profile.total_active_days)
+        stats.max_streak = _parse_count(profile.max_streak)
+        return stats
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+class ProfileDataV2(BaseModel):
+    """OpenAPI schema of the v2 response (responses are built from ProfileStats, not validated through this)"""
+    username: str
+    name: str
+    avatar_url: str
+    location: Optional[str] = None
+    university: Optional[str] = None
+    github: Optional[str] = None
+    linkedin: Optional[str] = None
+    skills: List[str] = []
+    ranking: Optional[int] = None
+    contest_rating: Optional[float] = None
+    contest_global_ranking: Optional[int] = None
+    contest_participants: Optional[int] = None
+    contests_attended: Optional[int] = None
+    problems_solved: Optional[int] = None
+    problems_total: Optional[int] = None
+    easy_solved: Optional[int] = None
+    easy_total: Optional[int] = None
+    medium_solved: Optional[int] = None
+    medium_total: Optional[int] = None
+    hard_solved: Optional[int] = None
+    hard_total: Optional[int] = None
+    acceptance_rate: Optional[float] = None
+    problems_attempting: Optional[int] = None
+    submissions_past_year: Optional[int] = None
+    total_active_days: Optional[int] = None
+    max_streak: Optional[int] = None
+
+def dumps_json(content) -> bytes:
+    """orjson when installed (several times faster for large payloads), else the standard library"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":")).encode()
+
+def loads_json(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 class ScrapeRequest(BaseModel):
     username: str
+    browser_mode: Optional[BrowserMode] = None
+    fields: Optional[List[str]] = Field(None, description=FIELDS_DESCRIPTION)
+
+class BulkScrapeRequest(BaseModel):
+    usernames: List[str]
+    concurrency: Optional[int] = None
+
+class WatchlistRequest(BaseModel):
+    usernames: List[str]
+
+class LeaderboardRequest(BaseModel):
+    usernames: List[str]
+    sort: str = "contest_rating"
+    order: Optional[Literal["asc", "desc"]] = None
+    limit: int = 100
+    offset: int = 0
+    fetch_missing: bool = True
+
+# Upstream site; point it at a local stand-in (see benchmarks/fake_leetcode.py) for offline runs
+LEETCODE_BASE_URL = os.getenv("LEETCODE_BASE_URL", "https://leetcode.com").rstrip("/")
+
+# Driver pool configuration
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "2"))
+DRIVER_MAX_PAGES = int(os.getenv("DRIVER_MAX_PAGES", "50"))
+DRIVER_CHECKOUT_TIMEOUT = float(os.getenv("DRIVER_CHECKOUT_TIMEOUT", "30"))
+# "session": one Chrome per concurrent scrape; "tabs": a few Chromes serving scrapes as isolated tabs
+DRIVER_POOL_MODE = os.getenv("DRIVER_POOL_MODE", "session")
+TAB_BROWSERS = int(os.getenv("TAB_BROWSERS", "2"))
+TABS_PER_BROWSER = int(os.getenv("TABS_PER_BROWSER", "4"))
+
+# Chrome binary resolution configuration
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")
+CHROME_BINARY = os.getenv("CHROME_BINARY")
+CHROMEDRIVER_CACHE_DIR = os.getenv("CHROMEDRIVER_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".wdm"))
+CHROMEDRIVER_DOWNLOAD = os.getenv("CHROMEDRIVER_DOWNLOAD", "true").lower() == "true"
+CHROMEDRIVER_REQUIRED = os.getenv("CHROMEDRIVER_REQUIRED", "false").lower() == "true"
+
+# Browser mode: "light" blocks images, fonts, stylesheets and third-party scripts; "full" loads everything
+BROWSER_MODE = os.getenv("BROWSER_MODE", "light")
+
+# Scrape execution configuration
+SCRAPE_WORKERS = int(os.getenv(
+    "SCRAPE_WORKERS", str((TAB_BROWSERS * TABS_PER_BROWSER if DRIVER_POOL_MODE == "tabs" else DRIVER_POOL_SIZE) * 2)
+))
+SCRAPE_QUEUE_SIZE = int(os.getenv("SCRAPE_QUEUE_SIZE", "32"))
+SCRAPE_TIMEOUT = float(os.getenv("SCRAPE_TIMEOUT", "60"))
+SCRAPE_RETRY_AFTER = int(os.getenv("SCRAPE_RETRY_AFTER", "5"))
+# Cheap strategies, in order, each hedging the one before after STRATEGY_STAGGER seconds (0 races them all);
+# the browser is launched as a hedge after BROWSER_HEDGE_DELAY
+SCRAPE_STRATEGIES = [name.strip() for name in os.getenv("SCRAPE_STRATEGIES", "graphql,requests").split(",") if name.strip()]
+STRATEGY_STAGGER = float(os.getenv("STRATEGY_STAGGER", "0.5"))
+BROWSER_HEDGE_DELAY = float(os.getenv("BROWSER_HEDGE_DELAY", "2.0"))
+BROWSER_HEDGE_ENABLED = os.getenv("BROWSER_HEDGE_ENABLED", "true").lower() in ("1", "true", "yes")
+STRATEGY_WORKERS = int(os.getenv("STRATEGY_WORKERS", str(SCRAPE_WORKERS * (len(SCRAPE_STRATEGIES) + 1))))
+
+# Profile cache configuration
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))
+CACHE_STALE_TTL = float(os.getenv("CACHE_STALE_TTL", "3600"))
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "profile_cache.sqlite3")
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", "300"))
+# Upstream HTTP client configuration
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true" and HTTP2_AVAILABLE
+
+# Upstream governor: rate, adaptive concurrency and circuit breaker for everything sent to leetcode.com
+UPSTREAM_RATE_LIMIT = float(os.getenv("UPSTREAM_RATE_LIMIT", "10"))
+UPSTREAM_BURST = int(os.getenv("UPSTREAM_BURST", "20"))
+UPSTREAM_MIN_CONCURRENCY = int(os.getenv("UPSTREAM_MIN_CONCURRENCY", "1"))
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "16"))
+UPSTREAM_LATENCY_TARGET = float(os.getenv("UPSTREAM_LATENCY_TARGET", "2.0"))
+UPSTREAM_ACQUIRE_TIMEOUT = float(os.getenv("UPSTREAM_ACQUIRE_TIMEOUT", "10"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", "600"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+# Selenium page readiness configuration
+READINESS_STRATEGY = os.getenv("READINESS_STRATEGY", "selectors")
+READINESS_TIMEOUT = float(os.getenv("READINESS_TIMEOUT", "10"))
+READINESS_POLL_INTERVAL = float(os.getenv("READINESS_POLL_INTERVAL", "0.1"))
+READINESS_IDLE_WINDOW = float(os.getenv("READINESS_IDLE_WINDOW", "0.5"))
+
+# Selenium extraction configuration: "batch" (one execute_script call) or "webdriver" (a call per lookup)
+SELENIUM_EXTRACTION_MODE = os.getenv("SELENIUM_EXTRACTION_MODE", "batch")
+SELENIUM_BATCH_ELEMENT_LIMIT = int(os.getenv("SELENIUM_BATCH_ELEMENT_LIMIT", "50"))
+
+# Bulk scraping configuration
+BULK_MAX_USERNAMES = int(os.getenv("BULK_MAX_USERNAMES", "5000"))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "8"))
+BULK_MAX_CONCURRENCY = int(os.getenv("BULK_MAX_CONCURRENCY", "32"))
+BULK_RATE_LIMIT = float(os.getenv("BULK_RATE_LIMIT", "5"))
+BULK_RETRIES = int(os.getenv("BULK_RETRIES", "3"))
+
+SINGLE_FLIGHT_LOCK_DIR = os.getenv(
+    "SINGLE_FLIGHT_LOCK_DIR", os.path.join(tempfile.gettempdir(), "leetcode-scraper-locks")
+)
+
+# Profile history (one delta-encoded snapshot per changed scrape)
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "true").lower() in ("1", "true", "yes")
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "profile_history.sqlite3")
+HISTORY_KEYFRAME_INTERVAL = int(os.getenv("HISTORY_KEYFRAME_INTERVAL", "50"))
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", "1000"))
+
+# Leaderboards over cached profiles
+LEADERBOARD_MAX_USERNAMES = int(os.getenv("LEADERBOARD_MAX_USERNAMES", "50000"))
+LEADERBOARD_FETCH_LIMIT = int(os.getenv("LEADERBOARD_FETCH_LIMIT", "200"))
+LEADERBOARD_FETCH_TIMEOUT = float(os.getenv("LEADERBOARD_FETCH_TIMEOUT", "15"))
+LEADERBOARD_MAX_PAGE = int(os.getenv("LEADERBOARD_MAX_PAGE", "1000"))
+LEADERBOARD_INDEX_SIZE = int(os.getenv("LEADERBOARD_INDEX_SIZE", "500000"))
+
+# Background refresh of a watched set of usernames
+REFRESH_ENABLED = os.getenv("REFRESH_ENABLED", "false").lower() in ("1", "true", "yes")
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", "900"))
+REFRESH_JITTER = float(os.getenv("REFRESH_JITTER", "0.1"))
+REFRESH_RATE_LIMIT = float(os.getenv("REFRESH_RATE_LIMIT", "1"))
+REFRESH_CONCURRENCY = int(os.getenv("REFRESH_CONCURRENCY", "2"))
+REFRESH_WATCHLIST = os.getenv("REFRESH_WATCHLIST", "")
+REFRESH_WATCHLIST_FILE = os.getenv("REFRESH_WATCHLIST_FILE", "")
+REFRESH_AUTO_WATCH = os.getenv("REFRESH_AUTO_WATCH", "false").lower() in ("1", "true", "yes")
+REFRESH_MAX_WATCHED = int(os.getenv("REFRESH_MAX_WATCHED", "5000"))
+REFRESH_SCORE_HALF_LIFE = float(os.getenv("REFRESH_SCORE_HALF_LIFE", "3600"))
+REFRESH_SYNC_INTERVAL = float(os.getenv("REFRESH_SYNC_INTERVAL", "5"))
+
+# HTTP caching of profile responses; by default downstream caches follow the server-side profile cache
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", str(int(CACHE_TTL))))
+HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", str(int(CACHE_STALE_TTL))))
+HTTP_CACHE_STALE_IF_ERROR = int(os.getenv("HTTP_CACHE_STALE_IF_ERROR", "86400"))
+
+# Compression of API responses
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() in ("1", "true", "yes")
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "500"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "2"))
+
+CHROME_BROWSER_NAMES = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"]
+
+_chrome_binaries = None
+_chrome_binaries_lock = threading.Lock()
+
+def _binary_version(path: Optional[str]) -> Optional[str]:
+    """Run `<binary> --version` and return its output, or None if it cannot be run"""
+    if not path:
+        return None
+    try:
+        result = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _is_chromedriver(path: str) -> bool:
+    name = os.path.basename(path)
+    return (name == "chromedriver" or (name.startswith("chromedriver") and name.endswith(".exe"))) and os.path.isfile(path)
+
+def _cached_chromedriver() -> Optional[str]:
+    """Newest chromedriver already present in the local webdriver-manager cache (no network)"""
+    candidates = [
+        path for path in glob.glob(os.path.join(CHROMEDRIVER_CACHE_DIR, "**", "chromedriver*"), recursive=True)
+        if _is_chromedriver(path)
+    ]
+    return max(candidates, key=os.path.getmtime) if candidates else None
+
+def _download_chromedriver() -> Optional[str]:
+    """Install chromedriver with webdriver-manager (may hit the network)"""
+    driver_path = ChromeDriverManager().install()
+    
+    # Fix the path if it points to the wrong file
+    if "THIRD_PARTY_NOTICES" in driver_path:
+        # Find the actual chromedriver binary in the same directory
+        driver_dir = os.path.dirname(driver_path)
+        for file in os.listdir(driver_dir):
+            if _is_chromedriver(os.path.join(driver_dir, file)):
+                driver_path = os.path.join(driver_dir, file)
+                break
+    return driver_path
+
+def resolve_chrome_binaries() -> dict:
+    """
+    Resolve chromedriver and Chrome once per process: CHROMEDRIVER_PATH, then PATH, then the local
+    webdriver-manager cache, and only then a webdriver-manager download (if CHROMEDRIVER_DOWNLOAD).
+    """
+    global _chrome_binaries
+    with _chrome_binaries_lock:
+        if _chrome_binaries is not None:
+            return _chrome_binaries
+        
+        driver_path, source, error = None, None, None
+        try:
+            if CHROMEDRIVER_PATH:
+                if not os.path.isfile(CHROMEDRIVER_PATH):
+                    raise FileNotFoundError(f"CHROMEDRIVER_PATH does not exist: {CHROMEDRIVER_PATH}")
+                driver_path, source = CHROMEDRIVER_PATH, "configured"
+            else:
+                # Each lookup runs at most once; the cache scan walks the webdriver-manager directory
+                on_path = shutil.which("chromedriver")
+                cached = None if on_path else _cached_chromedriver()
+                if on_path:
+                    driver_path, source = on_path, "path"
+                elif cached:
+                    driver_path, source = cached, "cache"
+                elif CHROMEDRIVER_DOWNLOAD:
+                    driver_path, source = _download_chromedriver(), "download"
+                else:
+                    raise FileNotFoundError("No chromedriver found offline and CHROMEDRIVER_DOWNLOAD is disabled")
+        except Exception as e:
+            error = str(e)
+            print(f"Chrome driver not available: {e}")
+        
+        browser_path = CHROME_BINARY or next(filter(None, map(shutil.which, CHROME_BROWSER_NAMES)), None)
+        _chrome_binaries = {
+            "available": driver_path is not None,
+            "driver_path": driver_path,
+            "driver_version": _binary_version(driver_path),
+            "driver_source": source,
+            "browser_path": browser_path,
+            "browser_version": _binary_version(browser_path),
+            "error": error,
+        }
+        if driver_path:
+            print(f"Chrome driver path: {driver_path} ({source})")
+        return _chrome_binaries
+
+# Resources the extractors never read: we only need page text and the avatar's src attribute
+LIGHT_MODE_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css",
+    "*.mp4", "*.webm",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*facebook.net*", "*hotjar.com*", "*sentry.io*", "*segment.io*", "*cdn.segment.com*", "*stripe.com*",
+]
+
+def apply_browser_mode(driver, mode: Optional[str] = None):
+    """Switch request blocking for a session via CDP, so a pooled browser can serve either mode"""
+    mode = mode or BROWSER_MODE
+    if getattr(driver, "_scraper_browser_mode", None) == mode:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LIGHT_MODE_BLOCKED_URLS if mode == "light" else []})
+        driver._scraper_browser_mode = mode
+    except (InvalidSessionIdException, NoSuchWindowException):
+        # The session (or tab) is gone: let the pool retire it
+        raise
+    except Exception as e:
+        # e.g. a Chrome build without Network.setBlockedURLs: scrape in full mode rather than fail
+        print(f"Could not apply {mode} browser mode: {e}")
 
-def get_chrome_driver():
+def get_chrome_driver(page_load_strategy: Optional[str] = None):
     """Create and configure Chrome WebDriver with fallback handling"""
+    binaries = resolve_chrome_binaries()
+    if not binaries["available"]:
+        return None
     try:
         chrome_options = Options()
         chrome_options.add_argument("--headless")  # Run in background
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
         chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
+        if BROWSER_MODE == "light":
+            # Small viewport and a reduced process model keep per-session RSS down
+            chrome_options.add_argument("--window-size=800,600")
+            chrome_options.add_argument("--renderer-process-limit=2")
+            chrome_options.add_argument("--disable-features=site-per-process,IsolateOrigins,Translate")
+            chrome_options.add_argument("--disable-extensions")
+            chrome_options.add_argument("--disable-background-networking")
+            chrome_options.add_argument("--mute-audio")
+        else:
+            chrome_options.add_argument("--window-size=1920,1080")
         chrome_options.add_argument("--disable-blink-features=AutomationControlled")
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
         chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+        if CHROME_BINARY:
+            chrome_options.binary_location = CHROME_BINARY
+        if page_load_strategy:
+            chrome_options.page_load_strategy = page_load_strategy
         
-        # Try to install Chrome driver
-        driver_path = ChromeDriverManager().install()
-        print(f"Chrome driver path: {driver_path}")
-        
-        # Fix the path if it points to the wrong file
-        if "THIRD_PARTY_NOTICES" in driver_path:
-            # Find the actual chromedriver.exe in the same directory
-            import os
-            driver_dir = os.path.dirname(driver_path)
-            for file in os.listdir(driver_dir):
-                if file.startswith("chromedriver") and file.endswith(".exe"):
-                    driver_path = os.path.join(driver_dir, file)
-                    break
-        
-        print(f"Corrected driver path: {driver_path}")
-        service = Service(driver_path)
+        # Each session owns its chromedriver process, but the binary was resolved once at startup
+        service = Service(binaries["driver_path"])
         driver = webdriver.Chrome(service=service, options=chrome_options)
         
         # Execute script to remove webdriver property
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
         
+        # Count the page's own GraphQL calls on every navigation (used by the "graphql" readiness strategy)
+        try:
+            driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": GRAPHQL_HOOK_JS})
+        except Exception as e:
+            print(f"GraphQL readiness hook not installed: {e}")
+        
         return driver
     except Exception as e:
         print(f"Chrome driver not available: {e}")
         print("Falling back to requests-only scraping...")
         return None
 
-def scrape_leetcode_profile(username: str) -> ProfileData:
-    """
-    Scrape LeetCode profile data using Selenium for dynamic content with fallback to requests
-    """
-    profile_data = ProfileData(
-        name="",
-        username=username,
-        rank="",
-        avatar_url="",
-        skills=[],
-        contest_rating=None,
-        global_ranking=None,
-        contests_attended=None,
-        problems_solved=None,
-        acceptance_rate=None,
-        easy_problems=None,
-        medium_problems=None,
-        hard_problems=None,
-        problems_attempting=None,
-        submissions_past_year=None,
-        total_active_days=None,
-        max_streak=None
-    )
-    
-    driver = None
-    try:
-        # Try to initialize Chrome driver
-        driver = get_chrome_driver()
-        
-        if driver:
-            # Use Selenium for dynamic content
-            url = f"https://leetcode.com/u/{username}/"
-            driver.get(url)
-            
-            # Wait for page to load
-            wait = WebDriverWait(driver, 10)
-            
-            # Wait for profile content to load
+class PooledDriver:
+    """A Chrome session owned by the driver pool"""
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.time()
+
+class DriverPool:
+    """Bounded pool of long-lived headless Chrome sessions shared by all scrape endpoints"""
+    def __init__(self, size: int, max_pages: int, checkout_timeout: float):
+        self.size = size
+        self.max_pages = max_pages
+        self.checkout_timeout = checkout_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._created = 0
+        self._recycled = 0
+        self._crashed = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._closed = False
+
+    def _is_healthy(self, pooled: PooledDriver) -> bool:
+        """Check that the browser behind a pooled session still responds"""
+        try:
+            pooled.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, pooled: PooledDriver):
+        """Quit a session and drop it from the pool"""
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def _acquire(self) -> Optional[PooledDriver]:
+        """Take a healthy idle session or start a new one"""
+        while True:
             try:
-                wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                time.sleep(3)  # Additional wait for dynamic content
-            except:
-                pass
-            
-            # Get page source and parse with BeautifulSoup
-            page_source = driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            # Extract profile data using Selenium selectors
-            profile_data = extract_profile_with_selenium(driver, soup, username)
-            
-            # If we didn't get data with Selenium, try BeautifulSoup parsing
-            if not profile_data.name and not profile_data.rank:
-                profile_data = extract_from_html(soup, username)
-        else:
-            # Fallback to requests-only approach
-            print("Using requests-only scraping approach...")
-            profile_data = scrape_with_requests_only(username)
-        
-        # If still no data, try GraphQL API
-        if not profile_data.name and not profile_data.rank:
-            profile_data = try_graphql_api(username, {})
-        
-        if profile_data.name or profile_data.rank:
-            return profile_data
-        else:
-            raise HTTPException(status_code=404, detail="Profile not found or data not accessible")
-            
-    except Exception as e:
-        print(f"Detailed error: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error scraping profile: {str(e)}")
-    finally:
-        if driver:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_healthy(pooled):
+                return pooled
+            print("Discarding unhealthy Chrome session from pool")
+            with self._lock:
+                self._crashed += 1
+            self._discard(pooled)
+
+        driver = get_chrome_driver()
+        if driver is None:
+            return None
+        with self._lock:
+            self._created += 1
+        return PooledDriver(driver)
+
+    def _release(self, pooled: PooledDriver, broken: bool):
+        """Return a session to the pool, recycling it if it is worn out or crashed"""
+        if broken:
+            with self._lock:
+                self._crashed += 1
+            self._discard(pooled)
+            return
+        if self._closed or pooled.pages >= self.max_pages:
+            with self._lock:
+                self._recycled += 1
+            self._discard(pooled)
+            return
+        try:
+            # Reset state so nothing leaks into the next checkout
+            pooled.driver.delete_all_cookies()
+            pooled.driver.get("about:blank")
+        except Exception:
+            with self._lock:
+                self._crashed += 1
+            self._discard(pooled)
+            return
+        self._idle.put(pooled)
+
+    @contextmanager
+    def checkout(self):
+        """Borrow a driver for the duration of a block; yields None when Chrome is unavailable"""
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise TimeoutError("Timed out waiting for a free Chrome session")
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        pooled = None
+        broken = False
+        try:
+            pooled = self._acquire()
+            yield pooled.driver if pooled else None
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            if pooled:
+                pooled.pages += 1
+                self._release(pooled, broken)
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def close(self):
+        """Quit every idle session; sessions in use are quit when checked back in"""
+        self._closed = True
+        while True:
             try:
-                driver.quit()
-            except:
-                pass
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(pooled)
 
-def scrape_with_requests_only(username: str) -> ProfileData:
-    """Scrape LeetCode profile using only requests and BeautifulSoup (fallback method)"""
-    profile_data = ProfileData(
-        name="",
-        username=username,
-        rank="",
-        avatar_url="",
-        skills=[],
-        contest_rating=None,
-        global_ranking=None,
-        contests_attended=None,
-        problems_solved=None,
-        acceptance_rate=None,
-        easy_problems=None,
-        medium_problems=None,
-        hard_problems=None,
-        problems_attempting=None,
-        submissions_past_year=None,
-        total_active_days=None,
-        max_streak=None
-    )
-    
-    try:
-        # Headers to mimic a real browser
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        # Try to get the profile page
-        url = f"https://leetcode.com/u/{username}/"
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # Parse with BeautifulSoup
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Extract profile data from HTML
-        profile_data = extract_from_html(soup, username)
+    def stats(self) -> dict:
+        """Pool wait time and utilization metrics"""
+        with self._lock:
+            return {
+                "mode": "session",
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": self._idle.qsize(),
+                "utilization": self._in_use / self.size if self.size else 0.0,
+                "created": self._created,
+                "recycled": self._recycled,
+                "crashed": self._crashed,
+                "checkouts": self._checkouts,
+                "checkout_timeouts": self._timeouts,
+                "wait_seconds_total": round(self._wait_total, 6),
+                "wait_seconds_avg": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "wait_seconds_max": round(self._wait_max, 6),
+            }
+
+
+class SharedBrowser:
+    """A long-lived Chrome whose tabs are handed out to concurrent scrapes"""
+    def __init__(self, driver):
+        self.driver = driver
+        # WebDriver commands target the session's current window, so tabs take turns issuing them
+        self.lock = threading.RLock()
+        self.anchor = driver.current_window_handle
+        self.current = self.anchor
+        self.active_tabs = 0
+        self.pages = 0
+        self.broken = False
+
+class TabDriver:
+    """Driver proxy bound to one tab: every WebDriver call switches to the tab under the browser lock"""
+    def __init__(self, browser: SharedBrowser, handle: str):
+        self._browser = browser
+        self._handle = handle
+
+    def _activate(self):
+        if self._browser.current != self._handle:
+            self._browser.driver.switch_to.window(self._handle)
+            self._browser.current = self._handle
+
+    def __getattr__(self, name):
+        if name.startswith("_scraper"):
+            # Per-tab state (e.g. the applied browser mode) lives on the proxy, never on the shared driver
+            raise AttributeError(name)
+        browser = self._browser
+        with browser.lock:
+            self._activate()
+            value = getattr(browser.driver, name)
+        if not callable(value):
+            return value
         
-        # If we still don't have data, try to find JSON data in script tags
-        if not profile_data.name and not profile_data.rank:
-            script_tags = soup.find_all('script')
-            for script in script_tags:
-                if script.string and 'profile' in script.string.lower():
+        def call(*args, **kwargs):
+            with browser.lock:
+                self._activate()
+                return value(*args, **kwargs)
+        return call
+
+class TabPool:
+    """
+    Serves scrapes as tabs of a few persistent Chrome instances. Each tab gets its own CDP browser
+    context, so cookies and storage are discarded with the tab and never shared between users.
+    Browsers are started with page_load_strategy "none": navigation returns immediately and the
+    readiness wait polls in short locked calls, letting several tabs load at once.
+    """
+    def __init__(self, browsers: int, tabs_per_browser: int, max_pages: int, checkout_timeout: float):
+        self.max_browsers = browsers
+        self.tabs_per_browser = tabs_per_browser
+        self.size = browsers * tabs_per_browser
+        self.max_pages = max_pages * tabs_per_browser
+        self.checkout_timeout = checkout_timeout
+        self._browsers = []
+        self._launching = 0
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._created = 0
+        self._recycled = 0
+        self._crashed = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._isolated_tabs = 0
+        self._shared_tabs = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._closed = False
+
+    def _reserve_browser(self) -> Optional[SharedBrowser]:
+        """Fill existing browsers before starting new ones, to maximise profiles per GB of RAM"""
+        with self._lock:
+            usable = [browser for browser in self._browsers if not browser.broken and browser.pages < self.max_pages]
+            for browser in usable:
+                if browser.active_tabs < self.tabs_per_browser:
+                    browser.active_tabs += 1
+                    return browser
+            # Browsers being retired still finish their open tabs but no longer count against the limit
+            if len(usable) + self._launching >= self.max_browsers:
+                return None
+            self._launching += 1
+        try:
+            driver = get_chrome_driver(page_load_strategy="none")
+        finally:
+            with self._lock:
+                self._launching -= 1
+        if driver is None:
+            return None
+        browser = SharedBrowser(driver)
+        browser.active_tabs = 1
+        with self._lock:
+            self._browsers.append(browser)
+            self._created += 1
+        return browser
+
+    def _open_tab(self, browser: SharedBrowser):
+        """Open a tab in a fresh browser context; fall back to a plain tab if chromedriver cannot see it"""
+        driver = browser.driver
+        with browser.lock:
+            context_id = None
+            try:
+                context_id = driver.execute_cdp_cmd("Target.createBrowserContext", {})["browserContextId"]
+                target = driver.execute_cdp_cmd("Target.createTarget", {"url": "about:blank", "browserContextId": context_id})
+                if target["targetId"] not in driver.window_handles:
+                    raise RuntimeError("isolated tab is not visible to chromedriver")
+                with self._lock:
+                    self._isolated_tabs += 1
+                return target["targetId"], context_id
+            except WebDriverException:
+                raise
+            except Exception as e:
+                print(f"Isolated browser context unavailable, using a plain tab: {e}")
+                if context_id:
                     try:
-                        # Try to extract JSON data from script tags
-                        script_content = script.string
-                        if 'window.__INITIAL_STATE__' in script_content:
-                            # Extract JSON data
-                            start = script_content.find('{')
-                            end = script_content.rfind('}') + 1
-                            if start != -1 and end != -1:
-                                json_str = script_content[start:end]
-                                data = json.loads(json_str)
-                                profile_data = extract_from_json_data(data, username)
-                                if profile_data.name or profile_data.rank:
-                                    break
-                    except (json.JSONDecodeError, KeyError, TypeError):
-                        continue
-        
-    except Exception as e:
-        print(f"Error in requests-only scraping: {e}")
-    
-    return profile_data
+                        driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context_id})
+                    except Exception:
+                        pass
+            driver.switch_to.new_window("tab")
+            browser.current = driver.current_window_handle
+            with self._lock:
+                self._shared_tabs += 1
+            return browser.current, None
 
-def extract_profile_with_selenium(driver, soup, username):
-    """Extract profile data using Selenium WebDriver"""
-    profile_data = ProfileData(
-        name="",
-        username=username,
-        rank="",
-        avatar_url="",
-        skills=[],
-        contest_rating=None,
-        global_ranking=None,
-        contests_attended=None,
-        problems_solved=None,
-        acceptance_rate=None,
-        easy_problems=None,
-        medium_problems=None,
-        hard_problems=None,
-        problems_attempting=None,
-        submissions_past_year=None,
-        total_active_days=None,
-        max_streak=None
-    )
-    
-    try:
-        # Try to find profile elements using Selenium
-        selectors = {
-            'name': [
-                'div[class*="text-label-1"]',
-                'h1',
-                '.text-label-1',
-                '[data-testid="profile-name"]'
-            ],
-            'avatar': [
-                'img[alt*="Avatar"]',
-                'img[alt*="avatar"]',
-                '.avatar img',
-                'img[src*="avatar"]'
-            ],
-            'rank': [
-                'span[class*="rank"]',
-                '.ranking',
-                '[data-testid="ranking"]'
-            ],
-            'location': [
-                'div[class*="location"]',
-                '.location',
-                '[data-testid="location"]'
-            ],
-            'github': [
-                'a[href*="github.com"]',
-                '.github-link'
-            ],
-            'linkedin': [
-                'a[href*="linkedin.com"]',
-                '.linkedin-link'
-            ]
-        }
-        
-        # Extract name - be more specific
-        name_selectors = [
-            'div[class*="text-label-1"]:not([class*="text-label-2"]):not([class*="text-label-3"])',
-            'h1:not([class*="text-label-2"])',
-            '.text-label-1:not(.text-label-2):not(.text-label-3)',
-            '[data-testid="profile-name"]'
-        ]
-        
-        for selector in name_selectors:
+    def _close_tab(self, browser: SharedBrowser, handle: str, context_id: Optional[str]):
+        """Close a tab and wipe everything it stored"""
+        driver = browser.driver
+        with browser.lock:
             try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                for element in elements:
-                    text = element.text.strip()
-                    # Filter out very long text (likely page content)
-                    if text and len(text) < 100 and not profile_data.name:
-                        # Additional check to ensure it's a name-like text
-                        if not any(word in text.lower() for word in ['problems', 'contest', 'discuss', 'interview', 'store', 'register', 'log', 'premium']):
-                            profile_data.name = text
-                            break
-                if profile_data.name:
-                    break
-            except:
-                continue
-        
-        # Extract avatar
-        for selector in selectors['avatar']:
+                if context_id:
+                    driver.execute_cdp_cmd("Target.closeTarget", {"targetId": handle})
+                    driver.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context_id})
+                else:
+                    driver.switch_to.window(handle)
+                    driver.delete_all_cookies()
+                    driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+                    driver.close()
+            finally:
+                driver.switch_to.window(browser.anchor)
+                browser.current = browser.anchor
+
+    def _release_browser(self, browser: SharedBrowser):
+        """Drop a tab's claim on its browser, quitting the browser once it is worn out or broken and idle"""
+        with self._lock:
+            browser.active_tabs -= 1
+            retire = browser.active_tabs == 0 and (browser.broken or browser.pages >= self.max_pages or self._closed)
+            if retire:
+                self._browsers.remove(browser)
+                if browser.broken:
+                    self._crashed += 1
+                else:
+                    self._recycled += 1
+        if retire:
             try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                for element in elements:
-                    src = element.get_attribute('src')
-                    if src and not profile_data.avatar_url:
-                        profile_data.avatar_url = src
-                        break
-                if profile_data.avatar_url:
-                    break
-            except:
-                continue
-        
-        # Extract rank - look for numbers after "Rank"
+                browser.driver.quit()
+            except Exception:
+                pass
+
+    @contextmanager
+    def checkout(self):
+        """Borrow an isolated tab for the duration of a block; yields None when Chrome is unavailable"""
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise TimeoutError("Timed out waiting for a free browser tab")
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        browser = None
+        tab = None
         try:
-            # Look for elements containing "Rank" followed by a number
-            rank_elements = driver.find_elements(By.XPATH, "//*[contains(text(), 'Rank')]/following-sibling::*[1]")
-            for element in rank_elements:
-                text = element.text.strip()
-                if text and text.replace(',', '').replace('.', '').isdigit() and not profile_data.rank:
-                    profile_data.rank = text
-                    break
+            browser = self._reserve_browser()
+            if browser is None:
+                yield None
+                return
+            tab = self._open_tab(browser)
+            tab_driver = TabDriver(browser, tab[0])
+            try:
+                tab_driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": GRAPHQL_HOOK_JS})
+            except WebDriverException:
+                pass
+            yield tab_driver
+        except WebDriverException:
+            if browser:
+                browser.broken = True
+            raise
+        finally:
+            if browser:
+                browser.pages += 1
+                if tab:
+                    try:
+                        self._close_tab(browser, *tab)
+                    except Exception as e:
+                        print(f"Failed to close browser tab: {e}")
+                        browser.broken = True
+                self._release_browser(browser)
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def close(self):
+        """Quit idle browsers; busy ones are quit when their last tab is released"""
+        self._closed = True
+        with self._lock:
+            idle = [browser for browser in self._browsers if browser.active_tabs == 0]
+            for browser in idle:
+                self._browsers.remove(browser)
+        for browser in idle:
+            try:
+                browser.driver.quit()
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        """Tab wait time and utilization metrics"""
+        with self._lock:
+            return {
+                "mode": "tabs",
+                "size": self.size,
+                "browsers": len(self._browsers),
+                "max_browsers": self.max_browsers,
+                "tabs_per_browser": self.tabs_per_browser,
+                "in_use": self._in_use,
+                "utilization": self._in_use / self.size if self.size else 0.0,
+                "created": self._created,
+                "recycled": self._recycled,
+                "crashed": self._crashed,
+                "checkouts": self._checkouts,
+                "checkout_timeouts": self._timeouts,
+                "isolated_tabs": self._isolated_tabs,
+                "shared_context_tabs": self._shared_tabs,
+                "wait_seconds_total": round(self._wait_total, 6),
+                "wait_seconds_avg": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "wait_seconds_max": round(self._wait_max, 6),
+            }
+
+if DRIVER_POOL_MODE == "tabs":
+    driver_pool = TabPool(TAB_BROWSERS, TABS_PER_BROWSER, DRIVER_MAX_PAGES, DRIVER_CHECKOUT_TIMEOUT)
+else:
+    driver_pool = DriverPool(DRIVER_POOL_SIZE, DRIVER_MAX_PAGES, DRIVER_CHECKOUT_TIMEOUT)
+
+class ScrapeExecutor:
+    """Runs blocking scrapes on a bounded thread pool so they never stall the event loop"""
+    def __init__(self, workers: int, queue_size: int, timeout: float, retry_after: int):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._completed = 0
+
+    def _admit(self) -> bool:
+        """Reserve a place in the admission queue, or refuse if it is full"""
+        with self._lock:
+            if self._admitted >= self.capacity:
+                self._rejected += 1
+                return False
+            self._admitted += 1
+            return True
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._admitted -= 1
+            self._completed += 1
+
+    async def run(self, func, *args):
+        """Run func(*args) on the pool; 503 when saturated, 504 when it exceeds the timeout"""
+        if not self._admit():
+            raise HTTPException(
+                status_code=503,
+                detail="Scraper is at capacity, try again later",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        future = self._executor.submit(func, *args)
+        # The slot is only freed once the work really finishes (or is cancelled before starting)
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            raise HTTPException(status_code=504, detail=f"Scrape timed out after {self.timeout:g}s")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "admitted": self._admitted,
+                "queued": max(self._admitted - self.workers, 0),
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "completed": self._completed,
+            }
+
+scrape_executor = ScrapeExecutor(SCRAPE_WORKERS, SCRAPE_QUEUE_SIZE, SCRAPE_TIMEOUT, SCRAPE_RETRY_AFTER)
+
+class MemoryProfileCache:
+    """In-process LRU tier of the profile cache"""
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, profile: ProfileData, fetched_at: float):
+        with self._lock:
+            self._entries[key] = (profile, fetched_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: str):
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+class SqliteProfileStore:
+    """Persistent tier of the profile cache, shared by every worker process on the host"""
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS profiles ("
+                "username TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS profiles_fetched_at ON profiles (fetched_at, username)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS missing_profiles ("
+                "username TEXT PRIMARY KEY, recorded_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS watched_profiles ("
+                "username TEXT PRIMARY KEY, requested_name TEXT NOT NULL, "
+                "score REAL NOT NULL DEFAULT 0, score_updated REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets several gunicorn workers read while one writes"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        row = self._connect().execute(
+            "SELECT data, fetched_at FROM profiles WHERE username = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return ProfileData.model_validate_json(row[0]), row[1]
+
+    def set(self, key: str, profile: ProfileData, fetched_at: float):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO profiles (username, data, fetched_at) VALUES (?, ?, ?)",
+                (key, profile.model_dump_json(), fetched_at),
+            )
+            conn.execute("DELETE FROM missing_profiles WHERE username = ?", (key,))
+
+    def set_groups(self, key: str, entries: dict, fetched_at: float):
+        """Store {group key: partial profile} for one username in a single transaction"""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO profiles (username, data, fetched_at) VALUES (?, ?, ?)",
+                [(group_key, profile.model_dump_json(), fetched_at) for group_key, profile in entries.items()],
+            )
+            conn.execute("DELETE FROM missing_profiles WHERE username = ?", (key,))
+
+    def changed_since(self, since: float, limit: int) -> list:
+        """[(key, fetched_at)] saved after `since` by any worker, newest `limit` rows (read from the index only)"""
+        return self._connect().execute(
+            "SELECT username, fetched_at FROM profiles WHERE fetched_at > ? ORDER BY fetched_at DESC LIMIT ?",
+            (since, limit),
+        ).fetchall()
+
+    def get_many(self, keys: List[str]) -> list:
+        """[(key, data, fetched_at)] for the stored keys"""
+        conn = self._connect()
+        rows = []
+        for start in range(0, len(keys), 900):
+            chunk = keys[start:start + 900]
+            rows.extend(conn.execute(
+                f"SELECT username, data, fetched_at FROM profiles WHERE username IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall())
+        return rows
+
+    def get_missing(self, key: str) -> Optional[float]:
+        row = self._connect().execute(
+            "SELECT recorded_at FROM missing_profiles WHERE username = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_missing(self, key: str, recorded_at: float):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO missing_profiles (username, recorded_at) VALUES (?, ?)",
+                (key, recorded_at),
+            )
+
+    def watched(self) -> list:
+        return self._connect().execute(
+            "SELECT username, requested_name, score, score_updated FROM watched_profiles"
+        ).fetchall()
+
+    def watch(self, names: dict, now: float):
+        """Add {key: requested name} to the watchlist, keeping existing scores"""
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO watched_profiles (username, requested_name, score, score_updated) VALUES (?, ?, 0, ?)",
+                [(key, name, now) for key, name in names.items()],
+            )
+
+    def unwatch(self, key: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM watched_profiles WHERE username = ?", (key,))
+
+    def add_watch_hits(self, hits: dict, now: float, half_life: float):
+        """Fold access counts into each watched profile's exponentially decayed score"""
+        with self._connect() as conn:
+            for key, count in hits.items():
+                row = conn.execute(
+                    "SELECT score, score_updated FROM watched_profiles WHERE username = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    score = row[0] * 0.5 ** ((now - row[1]) / half_life) + count
+                    conn.execute(
+                        "UPDATE watched_profiles SET score = ?, score_updated = ? WHERE username = ?",
+                        (score, now, key),
+                    )
+
+class ProfileCache:
+    """Two-tier (memory LRU + SQLite) ProfileData cache with stale-while-revalidate
+
+    Full profiles live under the username. A fields= scrape only fetches some FIELD_GROUPS and stores each one
+    under "<username>#<group>", so later projections covered by those groups are served without a scrape.
+    """
+    GROUP_SEPARATOR = "#"
+
+    def __init__(self, max_entries: int, ttl: float, stale_ttl: float, db_path: str, negative_ttl: float):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.memory = MemoryProfileCache(max_entries)
+        # Negative tier: usernames known not to exist, stored with a None profile
+        self.missing = MemoryProfileCache(max_entries)
+        self.store = None
+        try:
+            self.store = SqliteProfileStore(db_path)
+        except sqlite3.Error as e:
+            print(f"Persistent profile cache disabled: {e}")
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "negative_hits": 0,
+                          "fallback_hits": 0, "partial_hits": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def key(username: str) -> str:
+        return username.strip().lower()
+
+    @classmethod
+    def group_key(cls, key: str, group: str) -> str:
+        return f"{key}{cls.GROUP_SEPARATOR}{group}"
+
+    def _read_store(self, key: str):
+        if not self.store:
+            return None
+        try:
+            return self.store.get(key)
+        except sqlite3.Error as e:
+            print(f"Profile cache read failed: {e}")
+            return None
+
+    def _entry(self, key: str, now: float):
+        """(entry, tier) for a cache key, preferring a fresher copy another worker stored on disk"""
+        entry = self.memory.get(key)
+        tier = "memory_hits"
+        if entry is None or now - entry[1] > self.ttl:
+            stored = self._read_store(key)
+            if stored is not None and (entry is None or stored[1] > entry[1]):
+                self.memory.set(key, *stored)
+                entry = stored
+                tier = "disk_hits"
+        return entry, tier
+
+    def _group_entries(self, username: str, groups: tuple, read):
+        """(merged profile, oldest fetched_at) when every group has an entry, else None"""
+        key = self.key(username)
+        merged = empty_profile(username)
+        oldest = None
+        for group in groups:
+            entry = read(self.group_key(key, group))
+            if entry is None:
+                return None
+            for field in FIELD_GROUPS[group]:
+                setattr(merged, field, getattr(entry[0], field))
+            oldest = entry[1] if oldest is None else min(oldest, entry[1])
+        return merged, oldest
+
+    def lookup(self, username: str, groups: Optional[tuple] = None):
+        """Return (profile, status, age) where status is 'hit', 'stale' or 'miss'
+
+        With `groups`, a fresh full profile or fresh entries for every group count as a hit; the profile then
+        only carries those groups' fields.
+        """
+        key = self.key(username)
+        now = time.time()
+        entry, tier = self._entry(key, now)
+        partial = None
+        if groups and (entry is None or now - entry[1] > self.ttl):
+            partial = self._group_entries(username, groups, lambda group_key: self._entry(group_key, now)[0])
+            if partial is not None and now - partial[1] <= self.ttl:
+                self._count("partial_hits")
+                return partial[0], "hit", now - partial[1]
+        for candidate in (entry, partial):
+            if candidate is None:
+                continue
+            profile, fetched_at = candidate
+            age = now - fetched_at
+            if age <= self.ttl:
+                self._count(tier)
+                return profile, "hit", age
+            if age <= self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                return profile, "stale", age
+        self._count("misses")
+        return None, "miss", None
+
+    def fetched_since(self, username: str, since: float, groups: Optional[tuple] = None) -> Optional[ProfileData]:
+        """Return the stored profile (or just `groups`) if any worker saved it at or after `since`"""
+        def read(key):
+            entry = self._read_store(key) if self.store else self.memory.get(key)
+            if entry is not None and entry[1] >= since:
+                self.memory.set(key, *entry)
+                return entry
+            return None
+        entry = read(self.key(username))
+        if entry is None and groups:
+            entry = self._group_entries(username, groups, read)
+        return entry[0] if entry is not None else None
+
+    def fetched_at(self, username: str) -> Optional[float]:
+        """When the newest cached copy (any tier, any worker) was scraped, without touching the hit counters"""
+        key = self.key(username)
+        entry = self.memory.get(key)
+        stored = self._read_store(key)
+        times = [item[1] for item in (entry, stored) if item is not None]
+        return max(times) if times else None
+
+    def fallback(self, username: str, groups: Optional[tuple] = None):
+        """(profile, fetched_at) of the newest copy at any age, for serving while leetcode.com is unavailable"""
+        def read(key):
+            entry = self.memory.get(key)
+            stored = self._read_store(key)
+            if stored is not None and (entry is None or stored[1] > entry[1]):
+                entry = stored
+            return entry
+        entry = read(self.key(username))
+        if entry is None and groups:
+            entry = self._group_entries(username, groups, read)
+        if entry is not None:
+            self._count("fallback_hits")
+        return entry
+
+    def mark_refresh(self):
+        self._count("refreshes")
+
+    def save(self, username: str, profile: ProfileData):
+        key = self.key(username)
+        fetched_at = time.time()
+        self.memory.set(key, profile, fetched_at)
+        self.missing.pop(key)
+        if self.store:
+            try:
+                self.store.set(key, profile, fetched_at)
+            except sqlite3.Error as e:
+                print(f"Profile cache write failed: {e}")
+
+    def save_groups(self, username: str, profile: ProfileData, groups: tuple):
+        """Cache the fields of `groups` from a projected scrape, one entry per group"""
+        key = self.key(username)
+        fetched_at = time.time()
+        entries = {}
+        for group in groups:
+            partial = empty_profile(profile.username)
+            for field in FIELD_GROUPS[group]:
+                setattr(partial, field, getattr(profile, field))
+            entries[self.group_key(key, group)] = partial
+            self.memory.set(self.group_key(key, group), partial, fetched_at)
+        self.missing.pop(key)
+        if self.store:
+            try:
+                self.store.set_groups(key, entries, fetched_at)
+            except sqlite3.Error as e:
+                print(f"Profile cache write failed: {e}")
+
+    def _known_to_exist(self, key: str) -> bool:
+        """True if this worker's memory tier holds a fresh copy of the profile, or of any group of it"""
+        now = time.time()
+        for entry_key in (key, *(self.group_key(key, group) for group in FIELD_GROUPS)):
+            entry = self.memory.get(entry_key)
+            if entry is not None and now - entry[1] <= self.ttl:
+                return True
+        return False
+
+    def is_missing(self, username: str) -> bool:
+        """True if the username was recently confirmed not to exist (by any worker)"""
+        key = self.key(username)
+        now = time.time()
+        entry = self.missing.get(key)
+        if entry is None and self._known_to_exist(key):
+            # A profile we hold was scraped after any negative result; skip the store read on the hot path
+            return False
+        recorded_at = entry[1] if entry else None
+        if (recorded_at is None or now - recorded_at > self.negative_ttl) and self.store:
+            try:
+                recorded_at = self.store.get_missing(key)
+            except sqlite3.Error as e:
+                print(f"Profile cache read failed: {e}")
+            if recorded_at is not None:
+                self.missing.set(key, None, recorded_at)
+        if recorded_at is not None and now - recorded_at <= self.negative_ttl:
+            self._count("negative_hits")
+            return True
+        return False
+
+    def save_missing(self, username: str):
+        key = self.key(username)
+        recorded_at = time.time()
+        self.missing.set(key, None, recorded_at)
+        self.memory.pop(key)
+        for group in FIELD_GROUPS:
+            self.memory.pop(self.group_key(key, group))
+        if self.store:
+            try:
+                self.store.set_missing(key, recorded_at)
+            except sqlite3.Error as e:
+                print(f"Profile cache write failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = (counters["memory_hits"] + counters["disk_hits"] + counters["partial_hits"] + counters["stale_hits"]
+                   + counters["misses"])
+        counters["memory_entries"] = len(self.memory)
+        counters["hit_rate"] = round((lookups - counters["misses"]) / lookups, 4) if lookups else 0.0
+        return counters
+
+profile_cache = ProfileCache(CACHE_MAX_ENTRIES, CACHE_TTL, CACHE_STALE_TTL, CACHE_DB_PATH, NEGATIVE_CACHE_TTL)
+
+# Snapshot encoding: deltas are keyed by position in this tuple, so only ever append to it
+HISTORY_FIELDS = (
+    "name", "rank", "avatar_url", "location", "university", "github", "linkedin", "skills",
+    "contest_rating", "global_ranking", "contests_attended", "problems_solved", "acceptance_rate",
+    "easy_problems", "medium_problems", "hard_problems", "problems_attempting",
+    "submissions_past_year", "total_active_days", "max_streak",
+)
+
+# Fields /history/{username}/series can chart, parsed from their display format ("81/3363" -> 81)
+HISTORY_SERIES_FIELDS = (
+    "rank", "contest_rating", "global_ranking", "contests_attended", "problems_solved", "acceptance_rate",
+    "easy_problems", "medium_problems", "hard_problems", "problems_attempting",
+    "submissions_past_year", "total_active_days", "max_streak",
+)
+
+def history_number(value) -> Optional[float]:
+    """Numeric value of a display-formatted stat ("1,433", "81/3363", "65.67%", "6 Attempting")"""
+    if not value or not isinstance(value, str):
+        return None
+    text = value.split("/")[0].replace(",", "").replace("%", "").strip()
+    try:
+        return float(text.split()[0])
+    except (ValueError, IndexError):
+        return None
+
+class ProfileHistory:
+    """Append-only SQLite store of profile snapshots
+    
+    A snapshot is only written when a scrape differs from the previous one, and holds just the changed fields;
+    every HISTORY_KEYFRAME_INTERVAL-th snapshot per user is a compressed full copy, so reading any point
+    replays at most that many deltas. Rows are clustered by (user, time), so a user's history is a range scan.
+    """
+    def __init__(self, path: str, keyframe_interval: int):
+        self.path = path
+        self.keyframe_interval = max(1, keyframe_interval)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counters = {"recorded": 0, "unchanged": 0, "errors": 0}
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history_users ("
+                "id INTEGER PRIMARY KEY, username TEXT NOT NULL UNIQUE, last_state TEXT NOT NULL, "
+                "last_taken_at INTEGER NOT NULL, last_seen INTEGER NOT NULL, snapshots INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history_snapshots ("
+                "user_id INTEGER NOT NULL, taken_at INTEGER NOT NULL, keyframe INTEGER NOT NULL, data BLOB NOT NULL, "
+                "PRIMARY KEY (user_id, taken_at)) WITHOUT ROWID"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def _state(profile: ProfileData) -> list:
+        return [getattr(profile, field) for field in HISTORY_FIELDS]
+
+    @staticmethod
+    def _encode_keyframe(state: list) -> bytes:
+        return zlib.compress(json.dumps(state, separators=(",", ":")).encode())
+
+    @staticmethod
+    def _encode_delta(previous: list, state: list) -> bytes:
+        changes = {str(i): value for i, value in enumerate(state) if i >= len(previous) or previous[i] != value}
+        return json.dumps(changes, separators=(",", ":")).encode() if changes else b""
+
+    @staticmethod
+    def _apply(state: list, keyframe: int, data: bytes) -> list:
+        if keyframe:
+            decoded = json.loads(zlib.decompress(data))
+            return decoded + [None] * (len(HISTORY_FIELDS) - len(decoded))
+        state = list(state)
+        for index, value in json.loads(data).items():
+            if int(index) < len(state):
+                state[int(index)] = value
+        return state
+
+    def record(self, username: str, profile: ProfileData):
+        """Store a snapshot if the profile changed since the last one (called after every successful scrape)"""
+        key = profile_cache.key(username)
+        state = self._state(profile)
+        now_ms = int(time.time() * 1000)
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT id, last_state, last_taken_at, snapshots FROM history_users WHERE username = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    user_id = conn.execute(
+                        "INSERT INTO history_users (username, last_state, last_taken_at, last_seen, snapshots) "
+                        "VALUES (?, ?, 0, ?, 0)",
+                        (key, "[]", now_ms),
+                    ).lastrowid
+                    previous, last_taken_at, snapshots = None, 0, 0
+                else:
+                    user_id, last_state, last_taken_at, snapshots = row
+                    previous = json.loads(last_state)
+                delta = b"" if previous is None else self._encode_delta(previous, state)
+                if previous is not None and not delta:
+                    conn.execute("UPDATE history_users SET last_seen = ? WHERE id = ?", (now_ms, user_id))
+                    conn.execute("COMMIT")
+                    self._count("unchanged")
+                    return
+                keyframe = previous is None or snapshots % self.keyframe_interval == 0
+                taken_at = max(now_ms, last_taken_at + 1)
+                conn.execute(
+                    "INSERT INTO history_snapshots (user_id, taken_at, keyframe, data) VALUES (?, ?, ?, ?)",
+                    (user_id, taken_at, int(keyframe), self._encode_keyframe(state) if keyframe else delta),
+                )
+                conn.execute(
+                    "UPDATE history_users SET last_state = ?, last_taken_at = ?, last_seen = ?, snapshots = ? WHERE id = ?",
+                    (json.dumps(state, separators=(",", ":")), taken_at, now_ms, snapshots + 1, user_id),
+                )
+                conn.execute("COMMIT")
+                self._count("recorded")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._count("errors")
+            print(f"Profile history write failed: {e}")
+
+    def summary(self, username: str) -> Optional[dict]:
+        row = self._connect().execute(
+            "SELECT snapshots, last_seen FROM history_users WHERE username = ?", (profile_cache.key(username),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"snapshots": row[0], "last_seen": row[1] / 1000}
+
+    def snapshots(self, username: str, since: Optional[float] = None, until: Optional[float] = None,
+                  limit: int = HISTORY_MAX_POINTS) -> Optional[List[tuple]]:
+        """[(taken_at seconds, state list)] in time order within [since, until], keeping the newest `limit`"""
+        conn = self._connect()
+        row = conn.execute("SELECT id FROM history_users WHERE username = ?", (profile_cache.key(username),)).fetchone()
+        if row is None:
+            return None
+        user_id = row[0]
+        since_ms = int(since * 1000) if since is not None else 0
+        until_ms = int(until * 1000) if until is not None else 2 ** 62
+        limit = max(1, limit)
+        # Only the newest `limit` points are returned, so the window starts no earlier than the limit-th newest
+        oldest = conn.execute(
+            "SELECT taken_at FROM history_snapshots WHERE user_id = ? AND taken_at <= ? "
+            "ORDER BY taken_at DESC LIMIT 1 OFFSET ?",
+            (user_id, until_ms, limit - 1),
+        ).fetchone()
+        if oldest is not None:
+            since_ms = max(since_ms, oldest[0])
+        # Replay from the last keyframe at or before the window start
+        start = conn.execute(
+            "SELECT MAX(taken_at) FROM history_snapshots WHERE user_id = ? AND keyframe = 1 AND taken_at <= ?",
+            (user_id, max(since_ms, 0)),
+        ).fetchone()[0] or 0
+        rows = conn.execute(
+            "SELECT taken_at, keyframe, data FROM history_snapshots WHERE user_id = ? AND taken_at >= ? AND taken_at <= ? "
+            "ORDER BY taken_at",
+            (user_id, start, until_ms),
+        )
+        window = deque(maxlen=limit)
+        state = [None] * len(HISTORY_FIELDS)
+        for taken_at, keyframe, data in rows:
+            state = self._apply(state, keyframe, data)
+            if taken_at >= since_ms:
+                window.append((taken_at / 1000, state))
+        return list(window)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        try:
+            users, snapshots = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(snapshots), 0) FROM history_users"
+            ).fetchone()
+            counters.update(users=users, snapshots=snapshots)
+        except sqlite3.Error:
+            pass
+        return counters
+
+# Numeric ProfileStats fields held in the leaderboard's columnar table
+LEADERBOARD_COLUMNS = (
+    "ranking", "contest_rating", "contest_global_ranking", "contest_participants", "contests_attended",
+    "problems_solved", "problems_total", "easy_solved", "easy_total", "medium_solved", "medium_total",
+    "hard_solved", "hard_total", "acceptance_rate", "problems_attempting",
+    "submissions_past_year", "total_active_days", "max_streak",
+)
+# Lower is better for these; everything else ranks highest first
+LEADERBOARD_ASCENDING = {"ranking", "contest_global_ranking"}
+LEADERBOARD_PERCENTILES = (25, 50, 75, 90, 99)
+
+class LeaderboardIndex:
+    """Columnar float64 table (one row per cached profile, NaN for missing stats) for vectorized ranking
+    
+    The table holds the profiles leaderboards have asked for. Each sync loads members it does not hold yet and
+    re-parses held rows that any worker saved since the previous sync, so a leaderboard over cached profiles is
+    dict lookups plus numpy, with no JSON decoding and no work proportional to the whole cache.
+    """
+    # Re-read this many seconds before the watermark, in case a worker committed an older fetched_at late
+    SYNC_OVERLAP = 30.0
+
+    def __init__(self, max_rows: int):
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        # Profiles saved before this worker started are loaded on demand, not replayed
+        self._watermark = time.time()
+        self._rows = {}
+        self._names = []
+        self._fetched = np.zeros(1024)
+        self._values = np.full((1024, len(LEADERBOARD_COLUMNS)), np.nan)
+
+    def _clear(self):
+        self._rows.clear()
+        self._names.clear()
+
+    def _row_for(self, key: str) -> int:
+        row = self._rows.get(key)
+        if row is None:
+            row = len(self._rows)
+            if row >= len(self._fetched):
+                size = len(self._fetched) * 2
+                self._fetched = np.resize(self._fetched, size)
+                values = np.full((size, len(LEADERBOARD_COLUMNS)), np.nan)
+                values[:row] = self._values[:row]
+                self._values = values
+            self._rows[key] = row
+            self._names.append(None)
+        return row
+
+    def _store(self, key: str, profile: ProfileData, fetched_at: float):
+        row = self._rows.get(key)
+        if row is not None and self._fetched[row] >= fetched_at:
+            return
+        stats = ProfileStats.from_profile(profile)
+        row = self._row_for(key)
+        self._values[row] = [np.nan if getattr(stats, column) is None else getattr(stats, column)
+                             for column in LEADERBOARD_COLUMNS]
+        self._fetched[row] = fetched_at
+        self._names[row] = (profile.username, profile.name)
+
+    def _sync(self, keys: List[str]):
+        if profile_cache.store is None:
+            # No shared store: read this worker's memory tier
+            for key in keys:
+                entry = profile_cache.memory.get(key)
+                if entry is not None:
+                    self._store(key, *entry)
+            return
+        try:
+            changed = profile_cache.store.changed_since(self._watermark - self.SYNC_OVERLAP, self.max_rows)
+            if len(changed) >= self.max_rows:
+                # Older changes were cut off, so held rows may be outdated: drop them and reload on demand
+                self._clear()
+            outdated = [
+                key for key, fetched_at in changed
+                if key in self._rows and self._fetched[self._rows[key]] < fetched_at
+            ]
+            absent = [key for key in dict.fromkeys(keys) if key not in self._rows]
+            if len(self._rows) + len(absent) > self.max_rows:
+                # Full: start over from this cohort rather than track recency per row
+                self._clear()
+                outdated, absent = [], list(dict.fromkeys(keys))
+            wanted = outdated + absent
+            rows = profile_cache.store.get_many(wanted) if wanted else []
+        except sqlite3.Error as e:
+            print(f"Leaderboard sync failed: {e}")
+            return
+        for key, data, fetched_at in sorted(rows, key=lambda row: row[2]):
+            self._store(key, ProfileData.model_validate_json(data), fetched_at)
+        if changed:
+            self._watermark = max(self._watermark, changed[0][1])
+
+    def freshness(self, keys: List[str]):
+        """(keys with no cached profile, keys whose cached profile is past CACHE_TTL)"""
+        with self._lock:
+            self._sync(keys)
+            missing = [key for key in keys if key not in self._rows]
+            present = [key for key in keys if key in self._rows]
+            rows = np.fromiter((self._rows[key] for key in present), dtype=np.int64, count=len(present))
+            ages = time.time() - self._fetched[rows]
+        return missing, [present[i] for i in np.flatnonzero(ages > profile_cache.ttl)]
+
+    def table(self, keys: List[str]):
+        """(present keys, values matrix, fetched_at, (username, name) per row) for the cached members of `keys`"""
+        with self._lock:
+            self._sync(keys)
+            present = [key for key in keys if key in self._rows]
+            rows = np.fromiter((self._rows[key] for key in present), dtype=np.int64, count=len(present))
+            return present, self._values[rows], self._fetched[rows], [self._names[row] for row in rows]
+
+    def __len__(self):
+        return len(self._rows)
+
+leaderboard_index = LeaderboardIndex(LEADERBOARD_INDEX_SIZE)
+
+def _finite(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else (int(value) if value.is_integer() else round(value, 4))
+
+def leaderboard_summary(values: np.ndarray) -> dict:
+    """Per-column count, mean, min/max and percentiles over the cohort, computed for all columns at once"""
+    counts = np.count_nonzero(~np.isnan(values), axis=0)
+    summary = {}
+    if len(values):
+        with np.errstate(all="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            means = np.nanmean(values, axis=0)
+            minimums = np.nanmin(values, axis=0)
+            maximums = np.nanmax(values, axis=0)
+            percentiles = np.nanpercentile(values, LEADERBOARD_PERCENTILES, axis=0)
+    for i, column in enumerate(LEADERBOARD_COLUMNS):
+        if not counts[i]:
+            summary[column] = {"count": 0}
+            continue
+        summary[column] = {
+            "count": int(counts[i]),
+            "mean": _finite(means[i]),
+            "min": _finite(minimums[i]),
+            "max": _finite(maximums[i]),
+            **{f"p{p}": _finite(percentiles[j, i]) for j, p in enumerate(LEADERBOARD_PERCENTILES)},
+        }
+    return summary
+
+def difficulty_distribution(values: np.ndarray) -> dict:
+    """Cohort-wide solved counts per difficulty and their share of all solved problems"""
+    solved = {
+        difficulty: float(np.nansum(values[:, LEADERBOARD_COLUMNS.index(f"{difficulty}_solved")]))
+        for difficulty in ("easy", "medium", "hard")
+    }
+    total = sum(solved.values())
+    return {
+        difficulty: {"solved": int(count), "share": round(count / total, 4) if total else None}
+        for difficulty, count in solved.items()
+    }
+
+def rank_cohort(keys: List[str], sort: str, order: str, offset: int, limit: int) -> dict:
+    """Rank cached profiles by one column and summarize the cohort (runs off the event loop)"""
+    present, values, fetched_at, names = leaderboard_index.table(keys)
+    column = values[:, LEADERBOARD_COLUMNS.index(sort)] if len(present) else np.empty(0)
+    # NaN sorts last in both directions
+    unranked = np.isnan(column)
+    sort_keys = column if order == "asc" else -column
+    ordering = np.lexsort((sort_keys, unranked))
+    page = ordering[offset:offset + limit]
+    now = time.time()
+    entries = []
+    for position, row in zip(range(offset + 1, offset + 1 + len(page)), page):
+        username, name = names[row]
+        entry = {"position": position, "username": username, "name": name, "value": _finite(column[row])}
+        entry.update(zip(LEADERBOARD_COLUMNS, map(_finite, values[row])))
+        entry["age"] = int(now - fetched_at[row])
+        entries.append(entry)
+    return {
+        "present": set(present),
+        "ranked": int(len(present) - np.count_nonzero(unranked)),
+        "summary": leaderboard_summary(values),
+        "difficulty_distribution": difficulty_distribution(values) if len(present) else {},
+        "entries": entries,
+    }
+
+profile_history = None
+if HISTORY_ENABLED:
+    try:
+        profile_history = ProfileHistory(HISTORY_DB_PATH, HISTORY_KEYFRAME_INTERVAL)
+    except sqlite3.Error as e:
+        print(f"Profile history disabled: {e}")
+
+class SingleFlight:
+    """Coalesces concurrent scrapes of the same username, within this process and across workers"""
+    def __init__(self, lock_dir: str):
+        self.lock_dir = lock_dir
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._counters = {"leaders": 0, "coalesced": 0, "cross_process_hits": 0}
+        if fcntl:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    @contextmanager
+    def _host_lock(self, key: str, timeout: float):
+        """Exclusive per-username lock file so only one worker on the host scrapes a profile"""
+        if fcntl is None:
+            yield
+            return
+        path = os.path.join(self.lock_dir, hashlib.sha1(key.encode()).hexdigest() + ".lock")
+        with open(path, "a") as lock_file:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError("Timed out waiting for another worker scraping the same profile")
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def flight_key(username: str, groups: Optional[tuple] = None) -> str:
+        key = profile_cache.key(username)
+        return key + ProfileCache.GROUP_SEPARATOR + ",".join(groups) if groups else key
+
+    def _scrape(self, username: str, browser_mode: Optional[str] = None, groups: Optional[tuple] = None) -> ProfileData:
+        """Scrape under the host lock, reusing a result another worker stored while we waited"""
+        started = time.time()
+        with self._host_lock(self.flight_key(username, groups), SCRAPE_TIMEOUT):
+            profile_data = profile_cache.fetched_since(username, started, groups)
+            if profile_data is not None:
+                self._count("cross_process_hits")
+                return profile_data
+            if profile_cache.is_missing(username):
+                raise HTTPException(status_code=404, detail="Profile not found")
+            try:
+                profile_data = scrape_leetcode_profile(username, browser_mode, group_fields(groups) if groups else None)
+            except HTTPException as e:
+                # Scrapes only 404 once GraphQL or the existence probe confirmed the user does not exist
+                if e.status_code == 404:
+                    profile_cache.save_missing(username)
+                raise
+            if groups:
+                # Partial profiles are cached per group and never recorded as history snapshots
+                profile_cache.save_groups(username, profile_data, groups)
+                return profile_data
+            profile_cache.save(username, profile_data)
+            if profile_history:
+                profile_history.record(username, profile_data)
+            return profile_data
+
+    async def run(self, username: str, browser_mode: Optional[str] = None, groups: Optional[tuple] = None) -> ProfileData:
+        """Scrape and cache a profile (or just `groups`); concurrent callers for the same username share one scrape"""
+        key = self.flight_key(username, groups)
+        # A full scrape already in flight covers any projection
+        future = self._inflight.get(key) or (self._inflight.get(profile_cache.key(username)) if groups else None)
+        if future is not None:
+            self._count("coalesced")
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        # Mark the outcome as retrieved even when nobody else was waiting on it
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        self._count("leaders")
+        try:
+            profile_data = await scrape_executor.run(self._scrape, username, browser_mode, groups)
+        except TimeoutError as e:
+            error = HTTPException(status_code=503, detail=str(e))
+            future.set_exception(error)
+            raise error
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(profile_data)
+            return profile_data
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        counters["in_flight"] = len(self._inflight)
+        return counters
+
+single_flight = SingleFlight(SINGLE_FLIGHT_LOCK_DIR)
+
+class RateLimiter:
+    """Async token bucket limiting how fast new scrapes are started against a host"""
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+# Bulk requests may only start BULK_RATE_LIMIT new scrapes per second against each upstream host
+bulk_rate_limiters = {"leetcode.com": RateLimiter(BULK_RATE_LIMIT)}
+
+class UpstreamUnavailable(Exception):
+    """leetcode.com is throttling, challenging or failing us and the governor is holding requests back"""
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, int(retry_after + 0.999))
+
+CHALLENGE_MARKERS = (b"challenge-platform", b"cf-chl", b"<title>Just a moment...</title>")
+CHALLENGE_TITLES = ("just a moment", "attention required")
+
+def page_outcome(driver) -> str:
+    """Classify the page a browser session has loaded: challenge or ok"""
+    title = (driver.title or "").lower()
+    return "challenge" if any(marker in title for marker in CHALLENGE_TITLES) else "ok"
+
+def upstream_outcome(response: httpx.Response) -> str:
+    """Classify an upstream response for the governor: ok, throttled, challenge or server_error"""
+    if response.headers.get("cf-mitigated") == "challenge":
+        return "challenge"
+    if response.status_code == 429:
+        return "throttled"
+    if response.status_code in (403, 503) and any(marker in response.content[:16384] for marker in CHALLENGE_MARKERS):
+        return "challenge"
+    if response.status_code >= 500:
+        return "server_error"
+    return "ok"
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Seconds from a Retry-After header (delta or HTTP date), None when absent or unparseable"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class UpstreamGovernor:
+    """Admission control for leetcode.com: a token bucket, AIMD concurrency and a circuit breaker
+
+    Every upstream request (HTTP call or browser page load) holds a permit while it runs. 429s, challenge pages,
+    5xx, transport errors and responses slower than the latency target halve the concurrency limit (at most once
+    per latency target); successes grow it by one per window of limit requests. A Retry-After holds every new
+    request until it passes. Consecutive failures open the circuit: requests then fail fast with
+    UpstreamUnavailable until the open period ends and a half-open probe succeeds.
+    """
+    FAILURES = ("throttled", "challenge", "server_error", "transport_error")
+
+    def __init__(self, rate: float, burst: int, min_concurrency: int, max_concurrency: int, latency_target: float,
+                 acquire_timeout: float, failure_threshold: int, open_seconds: float, max_open_seconds: float,
+                 half_open_probes: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.latency_target = latency_target
+        self.acquire_timeout = acquire_timeout
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max(open_seconds, max_open_seconds)
+        self.half_open_probes = max(1, half_open_probes)
+        self.limit = float(self.max_concurrency)
+        self.state = "closed"
+        self._in_flight = 0
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        # Retry-After from upstream: no new request starts before this
+        self._hold_until = 0.0
+        self._open_until = 0.0
+        self._open_seconds = open_seconds
+        self._probes = 0
+        self._consecutive_failures = 0
+        self._last_decrease = 0.0
+        self._latency = None
+        self._cond = threading.Condition()
+        self._counters = {
+            "admitted": 0, "rejected": 0, "ok": 0, "throttled": 0, "challenge": 0, "server_error": 0,
+            "transport_error": 0, "slow": 0, "decreases": 0, "trips": 0,
+        }
+
+    def _admit(self, now: float) -> Optional[float]:
+        """Take a permit and return 0, or return the seconds to wait (None: until a permit is released)"""
+        if self.state == "open":
+            if now < self._open_until:
+                self._counters["rejected"] += 1
+                raise UpstreamUnavailable("leetcode.com is unavailable (circuit open)", self._open_until - now)
+            self.state = "half_open"
+            self._probes = 0
+            print("Upstream circuit half-open: probing leetcode.com")
+        if self.state == "half_open" and self._probes >= self.half_open_probes:
+            self._counters["rejected"] += 1
+            raise UpstreamUnavailable("leetcode.com is unavailable (circuit half-open)", self.latency_target)
+        if now < self._hold_until:
+            return self._hold_until - now
+        if self._in_flight >= int(self.limit):
+            return None
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self._in_flight += 1
+        if self.state == "half_open":
+            self._probes += 1
+        self._counters["admitted"] += 1
+        return 0.0
+
+    def _give_up(self, wait: Optional[float], remaining: float):
+        """Fail now rather than wait past the acquire deadline"""
+        if remaining > 0 and (wait is None or wait <= remaining):
+            return
+        self._counters["rejected"] += 1
+        if wait is None:
+            raise UpstreamUnavailable("Too many leetcode.com requests in flight", self.latency_target)
+        raise UpstreamUnavailable("Backing off leetcode.com", wait)
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Block until a permit is available; raises UpstreamUnavailable instead of waiting past the timeout"""
+        deadline = time.monotonic() + (self.acquire_timeout if timeout is None else timeout)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = self._admit(now)
+                if wait == 0:
+                    return
+                self._give_up(wait, deadline - now)
+                self._cond.wait(deadline - now if wait is None else wait)
+
+    def release(self, outcome: str, latency: Optional[float] = None, retry_after: Optional[float] = None):
+        """Return a permit and feed its outcome ("neutral" when upstream never answered) into the limits"""
+        with self._cond:
+            now = time.monotonic()
+            self._in_flight -= 1
+            slow = outcome == "ok" and latency is not None and latency > self.latency_target
+            if outcome != "neutral":
+                self._counters[outcome] += 1
+            if outcome == "ok" and latency is not None:
+                self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            if slow:
+                self._counters["slow"] += 1
+            if outcome in self.FAILURES or slow:
+                # Multiplicative decrease, once per latency target so one burst of errors counts once
+                if now - self._last_decrease >= self.latency_target:
+                    self.limit = max(self.min_concurrency, self.limit / 2)
+                    self._last_decrease = now
+                    self._counters["decreases"] += 1
+            elif outcome == "ok":
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            if retry_after:
+                self._hold_until = max(self._hold_until, now + min(retry_after, self.max_open_seconds))
+            if outcome in self.FAILURES:
+                self._consecutive_failures += 1
+                if self.state == "half_open" or (
+                        self.state == "closed" and self._consecutive_failures >= self.failure_threshold):
+                    self._trip(now, retry_after)
+            elif outcome == "ok":
+                self._consecutive_failures = 0
+                if self.state == "half_open":
+                    self.state = "closed"
+                    self._open_seconds = self.base_open_seconds
+                    print("Upstream circuit closed: leetcode.com is answering again")
+            elif self.state == "half_open":
+                # The probe never reached upstream; let another request try
+                self._probes = max(0, self._probes - 1)
+            self._cond.notify_all()
+
+    def _trip(self, now: float, retry_after: Optional[float]):
+        """Open the circuit; each consecutive trip doubles the open period up to the maximum"""
+        duration = min(max(self._open_seconds, retry_after or 0), self.max_open_seconds)
+        self.state = "open"
+        self._open_until = now + duration
+        self._open_seconds = min(self._open_seconds * 2, self.max_open_seconds)
+        self._counters["trips"] += 1
+        print(f"Upstream circuit open for {duration:.0f}s after {self._consecutive_failures} consecutive failures")
+
+    def is_open(self) -> bool:
+        """True while requests are being refused outright (not yet due for a half-open probe)"""
+        with self._cond:
+            return self.state == "open" and time.monotonic() < self._open_until
+
+    def retry_after(self) -> float:
+        """Seconds until upstream requests are expected to be allowed again"""
+        with self._cond:
+            now = time.monotonic()
+            return max(self._open_until - now if self.state == "open" else 0, self._hold_until - now, 1.0)
+
+    def unavailable(self) -> UpstreamUnavailable:
+        return UpstreamUnavailable("leetcode.com is unavailable (circuit open)", self.retry_after())
+
+    def stats(self) -> dict:
+        with self._cond:
+            now = time.monotonic()
+            state = self.state
+            if state == "open" and now >= self._open_until:
+                state = "half_open"
+            stats = {
+                "state": state,
+                "circuit_open": state == "open",
+                "retry_after": round(max(self._open_until - now, 0), 1) if state == "open" else 0,
+                "consecutive_failures": self._consecutive_failures,
+                "concurrency_limit": round(self.limit, 2),
+                "min_concurrency": self.min_concurrency,
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "rate_limit": self.rate,
+                "tokens": round(min(self.burst, self._tokens + (now - self._updated) * self.rate), 2),
+                "backoff_remaining": round(max(self._hold_until - now, 0), 1),
+                "latency_ewma_ms": round(self._latency * 1000, 1) if self._latency is not None else None,
+            }
+            stats.update(self._counters)
+        return stats
+
+upstream_governor = UpstreamGovernor(
+    UPSTREAM_RATE_LIMIT, UPSTREAM_BURST, UPSTREAM_MIN_CONCURRENCY, UPSTREAM_MAX_CONCURRENCY, UPSTREAM_LATENCY_TARGET,
+    UPSTREAM_ACQUIRE_TIMEOUT, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_OPEN_SECONDS, CIRCUIT_MAX_OPEN_SECONDS,
+    CIRCUIT_HALF_OPEN_PROBES,
+)
+
+# Headers to mimic a real browser
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+class UpstreamHTTPClient:
+    """Shared keep-alive HTTP client for the scrape worker threads, with jittered retries
+
+    Every attempt first takes a permit from upstream_governor and reports how it went.
+    """
+    def __init__(self):
+        self._limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+        self._timeout = httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        self._client = None
+        self._lock = threading.Lock()
+        self._counters = {"requests": 0, "retries": 0, "errors": 0}
+        self._responses = {}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _count_response(self, status: str):
+        with self._lock:
+            self._responses[status] = self._responses.get(status, 0) + 1
+
+    def _client_kwargs(self) -> dict:
+        return {
+            "http2": HTTP2_ENABLED,
+            "limits": self._limits,
+            "timeout": self._timeout,
+            "follow_redirects": True,
+        }
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(**self._client_kwargs())
+            return self._client
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+        return random.uniform(0, HTTP_BACKOFF * (2 ** attempt))
+
+    def _handle_response(self, response: httpx.Response, outcome: str, retry_after: Optional[float], attempt: int):
+        """Return the response to hand back, None to retry it, or raise when upstream is refusing us"""
+        self._count_response(str(response.status_code))
+        # A challenge page will not go away on retry; a 429 might, within the governor's backoff
+        if outcome == "challenge" or (outcome == "throttled" and attempt >= HTTP_RETRIES):
+            self._count("errors")
+            reason = "served a challenge page" if outcome == "challenge" else "is rate limiting us"
+            raise UpstreamUnavailable(
+                f"leetcode.com {reason} (HTTP {response.status_code})", retry_after or upstream_governor.retry_after()
+            )
+        if response.status_code not in RETRY_STATUS_CODES or attempt >= HTTP_RETRIES:
+            if response.status_code >= 400:
+                self._count("errors")
+            return response
+        return None
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        for attempt in range(HTTP_RETRIES + 1):
+            upstream_governor.acquire()
+            self._count("requests")
+            outcome, latency, retry_after = "neutral", None, None
+            start = time.perf_counter()
+            try:
+                response = self.client.request(method, url, **kwargs)
+                latency = time.perf_counter() - start
+                outcome = upstream_outcome(response)
+                retry_after = retry_after_seconds(response) if outcome != "ok" else None
+            except httpx.TransportError:
+                outcome = "transport_error"
+                self._count_response("transport_error")
+                if attempt >= HTTP_RETRIES:
+                    self._count("errors")
+                    raise
+            finally:
+                upstream_governor.release(outcome, latency, retry_after)
+            if outcome != "transport_error":
+                result = self._handle_response(response, outcome, retry_after, attempt)
+                if result is not None:
+                    return result
+            self._count("retries")
+            time.sleep(self._backoff(attempt))
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["responses"] = dict(self._responses)
+        counters["http2"] = HTTP2_ENABLED
+        counters["brotli"] = BROTLI_AVAILABLE
+        return counters
+
+http_client = UpstreamHTTPClient()
+
+# Wraps window.fetch so readiness checks can see when the SPA's GraphQL calls have settled
+GRAPHQL_HOOK_JS = """
+window.__scraperGraphql = {pending: 0, done: 0};
+const __scraperFetch = window.fetch;
+window.fetch = function(input, init) {
+    const url = typeof input === 'string' ? input : (input && input.url) || '';
+    if (!url.includes('/graphql')) {
+        return __scraperFetch.apply(this, arguments);
+    }
+    window.__scraperGraphql.pending++;
+    return __scraperFetch.apply(this, arguments).finally(() => {
+        window.__scraperGraphql.pending--;
+        window.__scraperGraphql.done++;
+    });
+};
+"""
+
+# Ready once the containers we extract from are rendered (or the page says the user does not exist)
+PROFILE_READY_JS = """
+if (document.readyState !== 'complete' || !document.body) { return false; }
+if (/just a moment|attention required/i.test(document.title)) { return true; }
+const text = document.body.innerText || '';
+if (/does not exist|page not found/i.test(text)) { return true; }
+const hasAvatar = !!document.querySelector('img[alt*="Avatar"], img[alt*="avatar"], img[src*="avatar"]');
+const hasSolved = text.includes('Easy') && text.includes('Hard');
+const hasActivity = text.includes('submissions in the past one year') || text.includes('Total active days');
+return hasAvatar && hasSolved && hasActivity;
+"""
+
+NETWORK_STATE_JS = """
+return [document.readyState, performance.getEntriesByType('resource').length];
+"""
+
+GRAPHQL_STATE_JS = """
+const state = window.__scraperGraphql;
+return [document.readyState, state ? state.pending : -1, state ? state.done : -1];
+"""
+
+class ReadinessTracker:
+    """Records how long the Selenium path actually waited for each readiness strategy"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, strategy: str, seconds: float, timed_out: bool):
+        with self._lock:
+            entry = self._stats.setdefault(strategy, {"waits": 0, "timeouts": 0, "seconds_total": 0.0, "seconds_max": 0.0})
+            entry["waits"] += 1
+            entry["timeouts"] += int(timed_out)
+            entry["seconds_total"] += seconds
+            entry["seconds_max"] = max(entry["seconds_max"], seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                strategy: dict(entry, seconds_avg=round(entry["seconds_total"] / entry["waits"], 4))
+                for strategy, entry in self._stats.items()
+            }
+
+readiness_tracker = ReadinessTracker()
+
+def _wait_until(condition, timeout: float) -> bool:
+    """Poll condition() until it is truthy or the timeout expires; returns False on timeout"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if condition():
+                return True
+        except JavascriptException:
+            # The document can be swapped out mid-check while the SPA navigates
+            pass
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(READINESS_POLL_INTERVAL)
+
+def _idle_condition(driver, script: str, is_settled):
+    """Build a condition that holds once script's result is settled and unchanged for READINESS_IDLE_WINDOW"""
+    state = {"value": None, "since": time.monotonic()}
+    
+    def condition():
+        value = driver.execute_script(script)
+        now = time.monotonic()
+        if value != state["value"]:
+            state["value"], state["since"] = value, now
+            return False
+        return is_settled(value) and now - state["since"] >= READINESS_IDLE_WINDOW
+    return condition
+
+def wait_for_profile_ready(driver, strategy: Optional[str] = None, timeout: Optional[float] = None) -> float:
+    """
+    Wait until the loaded profile page is ready to extract from and return the seconds spent waiting.
+    Strategies: "selectors" (stat containers rendered), "network-idle" (no new resources loading),
+    "graphql" (the page's GraphQL calls have settled) and "fixed" (legacy 3 second sleep).
+    """
+    strategy = strategy or READINESS_STRATEGY
+    timeout = READINESS_TIMEOUT if timeout is None else timeout
+    start = time.perf_counter()
+    
+    if strategy == "fixed":
+        time.sleep(min(3, timeout))
+        ready = True
+    elif strategy == "network-idle":
+        ready = _wait_until(
+            _idle_condition(driver, NETWORK_STATE_JS, lambda value: value[0] == "complete"), timeout
+        )
+    elif strategy == "graphql":
+        ready = _wait_until(
+            _idle_condition(driver, GRAPHQL_STATE_JS, lambda value: value[0] == "complete" and value[1] == 0 and value[2] > 0),
+            timeout,
+        )
+    else:
+        strategy = "selectors"
+        ready = _wait_until(lambda: driver.execute_script(PROFILE_READY_JS), timeout)
+    
+    elapsed = time.perf_counter() - start
+    readiness_tracker.record(strategy, elapsed, not ready)
+    if not ready:
+        print(f"Profile page not ready after {elapsed:.2f}s ({strategy}), extracting anyway")
+    return elapsed
+
+METRICS_PREFIX = "leetcode_scraper"
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _metric_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+class Counter:
+    """Monotonic counter rendered in the Prometheus text format, one series per label combination"""
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for values, total in sorted(self._values.items()):
+                lines.append(f"{self.name}{_metric_labels(self.labels, values)} {total}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket latency histogram rendered in the Prometheus text format"""
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = METRICS_LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, seconds: float, *label_values):
+        with self._lock:
+            series = self._series.setdefault(label_values, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series["buckets"][i] += 1
+            series["sum"] += seconds
+            series["count"] += 1
+
+    def totals(self) -> dict:
+        """Observation count and sum per label combination"""
+        with self._lock:
+            return {values: (series["count"], series["sum"]) for values, series in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for values, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    labels = _metric_labels(self.labels + ("le",), values + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _metric_labels(self.labels + ("le",), values + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {series['count']}")
+                lines.append(f"{self.name}_sum{_metric_labels(self.labels, values)} {round(series['sum'], 6)}")
+                lines.append(f"{self.name}_count{_metric_labels(self.labels, values)} {series['count']}")
+        return lines
+
+scrape_stage_seconds = Histogram(
+    f"{METRICS_PREFIX}_stage_seconds", "Time spent in each stage of a profile scrape", ("stage",)
+)
+scrape_duration_seconds = Histogram(
+    f"{METRICS_PREFIX}_scrape_seconds", "End-to-end scrape time by the strategy that produced the result", ("strategy", "outcome")
+)
+scrape_results_total = Counter(
+    f"{METRICS_PREFIX}_scrapes_total", "Finished scrapes by strategy and outcome", ("strategy", "outcome")
+)
+
+class ScrapeTrace:
+    """Timing spans for one scrape, exported to the stage histograms and logged as one key=value line"""
+    def __init__(self, username: str):
+        self.username = username
+        self.strategy = "none"
+        self.outcome = "ok"
+        self.spans = []
+        self._start = time.perf_counter()
+
+    def record(self, stage: str, seconds: float):
+        self.spans.append((stage, seconds))
+        scrape_stage_seconds.observe(seconds, stage)
+
+    @contextmanager
+    def span(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def finish(self):
+        total = time.perf_counter() - self._start
+        scrape_duration_seconds.observe(total, self.strategy, self.outcome)
+        scrape_results_total.inc(self.strategy, self.outcome)
+        spans = " ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in self.spans)
+        print(f"scrape username={self.username} strategy={self.strategy} outcome={self.outcome} total={total * 1000:.1f}ms {spans}")
+
+def profile_url(username: str) -> str:
+    return f"{LEETCODE_BASE_URL}/u/{username}/"
+
+def filled_fields(profile: ProfileData) -> set:
+    return {field for field in PROFILE_FIELDS if getattr(profile, field) not in (None, "", [])}
+
+# Strategies run on the orchestrator's threads and return (source, profile, settled fields, exists).
+# "Settled" fields are known to be final, including ones that are legitimately empty (no contests, no GitHub...).
+
+def graphql_strategy(username: str, trace: ScrapeTrace, cancelled: threading.Event, fields: Optional[frozenset] = None):
+    """One GraphQL round trip selecting only the groups `fields` needs; a clean response settles all of them"""
+    with trace.span("graphql"):
+        profile_data, exists, complete = fetch_graphql_profile(
+            username, groups=field_groups(fields) if fields is not None else None
+        )
+    if complete:
+        return "graphql", profile_data, set(fields if fields is not None else PROFILE_FIELDS), exists
+    return "graphql", profile_data, filled_fields(profile_data), exists
+
+def requests_strategy(username: str, trace: ScrapeTrace, cancelled: threading.Event, fields: Optional[frozenset] = None):
+    """Plain HTTP fetch of the profile page, reading its embedded JSON state and, where that falls short, the markup"""
+    with trace.span("requests_page"):
+        profile_data, settled = fetch_profile_page(username, cancelled, fields)
+    return "requests", profile_data, settled | filled_fields(profile_data), None
+
+def browser_strategy(username: str, trace: ScrapeTrace, cancelled: threading.Event, fields: Optional[frozenset] = None,
+                     browser_mode: Optional[str] = None, probe: bool = False):
+    """Render the profile in a pooled Chrome session; the expensive hedge, abandoned as soon as it is cancelled"""
+    profile_data = empty_profile(username)
+    # Don't pay for a browser session just to learn the user does not exist
+    if probe:
+        with trace.span("existence_probe"):
+            exists = probe_user_exists(username)
+        if exists is False:
+            return "existence_probe", profile_data, set(), False
+    if cancelled.is_set():
+        return "selenium", profile_data, set(), None
+    
+    source = "selenium"
+    # Borrow a long-lived Chrome session from the pool (includes driver startup when the pool grows)
+    checkout_start = time.perf_counter()
+    with driver_pool.checkout() as driver:
+        trace.record("driver_checkout", time.perf_counter() - checkout_start)
+        if driver and not cancelled.is_set():
+            apply_browser_mode(driver, browser_mode)
+            upstream_governor.acquire()
+            outcome = "neutral"
+            try:
+                with trace.span("page_load"):
+                    driver.get(profile_url(username))
+                # Tabs navigate with page_load_strategy "none": get() returns before the document (and its title)
+                # exists, so the page can only be classified once it is ready
+                if DRIVER_POOL_MODE != "tabs":
+                    outcome = page_outcome(driver)
+                if outcome != "challenge" and not cancelled.is_set():
+                    # Wait until the fields we extract are rendered
+                    with trace.span("readiness_wait"):
+                        wait_for_profile_ready(driver)
+                    outcome = page_outcome(driver)
+            finally:
+                upstream_governor.release(outcome)
+            if outcome == "challenge":
+                raise UpstreamUnavailable("leetcode.com served a challenge page", upstream_governor.retry_after())
+            if cancelled.is_set():
+                return source, profile_data, set(), None
+            
+            with trace.span("selenium_extract"):
+                profile_data = extract_profile_with_selenium(driver, None, username, fields=fields)
+            
+            # If we didn't get data with Selenium, parse the page source
+            if fields is not None:
+                found_data = bool(filled_fields(profile_data) & fields)
+            else:
+                found_data = bool(profile_data.name or profile_data.rank)
+            if not found_data:
+                source = "page_source"
+                with trace.span("html_extract"):
+                    profile_data = extract_from_html(driver.page_source, username, fields)
+    
+    if not driver and "requests" not in SCRAPE_STRATEGIES:
+        # No Chrome and the requests strategy is not raced: it is the last resort
+        print("Using requests-only scraping approach...")
+        return requests_strategy(username, trace, cancelled, fields)
+    return source, profile_data, filled_fields(profile_data), None
+
+SCRAPE_STRATEGY_FUNCTIONS = {"graphql": graphql_strategy, "requests": requests_strategy}
+
+# Fields each strategy can fill in; the profile page never shows the university
+STRATEGY_CAPABILITIES = {
+    "graphql": frozenset(PROFILE_FIELDS),
+    "requests": frozenset(PROFILE_FIELDS) - {"university"},
+    "browser": frozenset(PROFILE_FIELDS) - {"university"},
+}
+
+class StrategyOrchestrator:
+    """Hedges the cheap scrape strategies and the browser against each other, merging results field by field
+
+    SCRAPE_STRATEGIES start STRATEGY_STAGGER seconds apart, or at once when the one before finished without
+    settling the profile. The browser follows BROWSER_HEDGE_DELAY seconds in if the requested fields are still not
+    settled, or straight away if every cheap strategy came back without a usable profile. Each field keeps the first
+    non-empty value any strategy returns. Once every requested field is settled the scrape returns and stragglers
+    are cancelled: queued ones never start, and the browser stops at its next checkpoint. Strategies that cannot
+    fill any of the requested fields (STRATEGY_CAPABILITIES) are never launched.
+    """
+    def __init__(self, strategies: List[str], stagger: float, hedge_delay: float, hedge_enabled: bool, workers: int):
+        unknown = [name for name in strategies if name not in SCRAPE_STRATEGY_FUNCTIONS]
+        if unknown:
+            raise ValueError(f"Unknown SCRAPE_STRATEGIES: {', '.join(unknown)}")
+        self.strategies = strategies
+        self.stagger = max(0.0, stagger)
+        self.hedge_delay = max(0.0, hedge_delay)
+        self.hedge_enabled = hedge_enabled
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="strategy")
+        self._lock = threading.Lock()
+        self._counters = {"scrapes": 0, "hedged_strategies": 0, "browser_hedges": 0, "finished_early": 0, "abandoned": 0}
+        self._contributions = {}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def run(self, username: str, trace: ScrapeTrace, browser_mode: Optional[str] = None,
+            fields: Optional[frozenset] = None):
+        """Scrape with as many strategies as it takes to settle `fields` (default: all)
+
+        Returns (merged profile, exists), where exists is True once any strategy confirmed the user.
+        """
+        wanted = set(fields) if fields is not None else set(PROFILE_FIELDS)
+        merged = empty_profile(username)
+        settled = set()
+        sources = []
+        finished = set()
+        throttled = None
+        graphql_exists = None
+        confirmed = False
+        cancelled = threading.Event()
+        waiting = [name for name in self.strategies if STRATEGY_CAPABILITIES[name] & wanted]
+        pending = {}
+        start = time.monotonic()
+        next_launch = start
+        hedge_at = start + self.hedge_delay
+        hedged = not (self.hedge_enabled and STRATEGY_CAPABILITIES["browser"] & wanted)
+        self._count("scrapes")
+        try:
+            while not wanted <= settled:
+                now = time.monotonic()
+                while waiting and throttled is None and (now >= next_launch or not pending):
+                    name = waiting.pop(0)
+                    if not STRATEGY_CAPABILITIES[name] & (wanted - settled):
+                        continue
+                    if pending:
+                        self._count("hedged_strategies")
+                    future = self._executor.submit(SCRAPE_STRATEGY_FUNCTIONS[name], username, trace, cancelled, fields)
+                    pending[future] = name
+                    next_launch = now + self.stagger
+                if fields is not None:
+                    usable = bool(filled_fields(merged) & wanted)
+                else:
+                    usable = bool(merged.name or merged.rank)
+                if (not hedged and throttled is None and STRATEGY_CAPABILITIES["browser"] & (wanted - settled)
+                        and (now >= hedge_at or not (pending or waiting or usable))):
+                    hedged = True
+                    self._count("browser_hedges")
+                    # Probe first only if GraphQL already answered without saying whether the user exists
+                    probe = "graphql" in finished and graphql_exists is None
+                    future = self._executor.submit(browser_strategy, username, trace, cancelled, fields, browser_mode, probe)
+                    pending[future] = "browser"
+                if not pending:
+                    break
+                deadlines = []
+                if throttled is None:
+                    if waiting:
+                        deadlines.append(next_launch)
+                    if not hedged:
+                        deadlines.append(hedge_at)
+                timeout = max(0.0, min(deadlines) - now) if deadlines else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = pending.pop(future)
+                    finished.add(name)
+                    try:
+                        source, profile_data, strategy_settled, exists = future.result()
+                    except UpstreamUnavailable as e:
+                        # Every strategy goes through the same governor; don't pile more requests on
+                        throttled = e
+                        continue
+                    except Exception as e:
+                        print(f"Scrape strategy {name} failed for {username}: {e}")
+                        continue
+                    if name == "graphql":
+                        graphql_exists = exists
+                    if exists is False:
+                        raise HTTPException(status_code=404, detail="Profile not found")
+                    confirmed = confirmed or exists is True
+                    contributed = [
+                        field for field in PROFILE_FIELDS
+                        if field in wanted
+                        and getattr(merged, field) in (None, "", []) and getattr(profile_data, field) not in (None, "", [])
+                    ]
+                    for field in contributed:
+                        setattr(merged, field, getattr(profile_data, field))
+                    if contributed:
+                        sources.append(source)
+                        with self._lock:
+                            self._contributions[source] = self._contributions.get(source, 0) + 1
+                    settled |= strategy_settled
+            if throttled is not None and not (filled_fields(merged) & wanted if fields is not None
+                                              else merged.name or merged.rank):
+                raise throttled
+            return merged, confirmed
+        finally:
+            trace.strategy = "+".join(sources) or "none"
+            if pending:
+                cancelled.set()
+                self._count("finished_early")
+                for future in pending:
+                    if not future.cancel():
+                        self._count("abandoned")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["contributions"] = dict(self._contributions)
+        stats["strategies"] = list(self.strategies)
+        stats["stagger"] = self.stagger
+        stats["browser_hedge_delay"] = self.hedge_delay if self.hedge_enabled else None
+        return stats
+
+strategy_orchestrator = StrategyOrchestrator(
+    SCRAPE_STRATEGIES, STRATEGY_STAGGER, BROWSER_HEDGE_DELAY, BROWSER_HEDGE_ENABLED, STRATEGY_WORKERS
+)
+
+def scrape_leetcode_profile(username: str, browser_mode: Optional[str] = None,
+                            fields: Optional[frozenset] = None) -> ProfileData:
+    """
+    Scrape LeetCode profile data, racing GraphQL and the plain profile page and hedging with Selenium.
+    With `fields`, only those fields are fetched and extracted (the rest stay empty).
+    """
+    trace = ScrapeTrace(username)
+    try:
+        profile_data, exists = strategy_orchestrator.run(username, trace, browser_mode, fields)
+        if fields is not None:
+            # A projection can legitimately come back empty (no contests yet) once the user is known to exist
+            found = exists or bool(filled_fields(profile_data) & fields)
+        else:
+            found = bool(profile_data.name or profile_data.rank)
+        if found:
+            return profile_data
+        else:
+            # Every strategy failed without learning whether the user exists: not a 404, and never negative-cached
+            raise HTTPException(status_code=502, detail="Profile data not accessible from leetcode.com")
+            
+    except HTTPException as e:
+        trace.outcome = "not_found" if e.status_code == 404 else "error"
+        raise
+    except UpstreamUnavailable:
+        trace.outcome = "throttled"
+        raise
+    except TimeoutError as e:
+        trace.outcome = "timeout"
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        trace.outcome = "error"
+        print(f"Detailed error: {e}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Error scraping profile: {str(e)}")
+    finally:
+        trace.finish()
+
+def fetch_profile_page(username: str, cancelled: Optional[threading.Event] = None,
+                       fields: Optional[frozenset] = None):
+    """
+    Fetch the profile page over plain HTTP and return (profile, settled fields).
+    The JSON state embedded in the page is read first, straight from the bytes; the markup is only parsed for the
+    requested fields that state does not answer. Settled fields are the ones the state answers, even if empty.
+    """
+    profile_data = empty_profile(username)
+    settled = set()
+    wanted = set(fields) if fields is not None else set(PROFILE_FIELDS)
+    
+    try:
+        response = http_client.get(profile_url(username), headers=BROWSER_HEADERS)
+        response.raise_for_status()
+        # Another strategy already settled the profile; skip parsing the page
+        if cancelled is not None and cancelled.is_set():
+            return profile_data, settled
+        
+        state = find_embedded_state(response.content)
+        if state is not None:
+            profile_data = extract_from_json_data(state, username)
+            settled = set(group_fields(embedded_state_groups(state)))
+        
+        missing = (wanted & HTML_FIELDS) - settled - filled_fields(profile_data)
+        if missing:
+            html_profile = extract_from_html(response.content, username, frozenset(missing))
+            for field in missing:
+                if getattr(html_profile, field) not in (None, "", []):
+                    setattr(profile_data, field, getattr(html_profile, field))
+        
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error in requests-only scraping: {e}")
+    
+    return profile_data, settled
+
+def scrape_with_requests_only(username: str, cancelled: Optional[threading.Event] = None,
+                              fields: Optional[frozenset] = None) -> ProfileData:
+    """Scrape LeetCode profile using only the HTTP client (fallback method)"""
+    return fetch_profile_page(username, cancelled, fields)[0]
+
+# Selectors used by the Selenium extraction (shared by the WebDriver and batched modes)
+SELENIUM_SELECTORS = {
+    'name': [
+        'div[class*="text-label-1"]',
+        'h1',
+        '.text-label-1',
+        '[data-testid="profile-name"]'
+    ],
+    'avatar': [
+        'img[alt*="Avatar"]',
+        'img[alt*="avatar"]',
+        '.avatar img',
+        'img[src*="avatar"]'
+    ],
+    'rank': [
+        'span[class*="rank"]',
+        '.ranking',
+        '[data-testid="ranking"]'
+    ],
+    'location': [
+        'div[class*="location"]',
+        '.location',
+        '[data-testid="location"]'
+    ],
+    'github': [
+        'a[href*="github.com"]',
+        '.github-link'
+    ],
+    'linkedin': [
+        'a[href*="linkedin.com"]',
+        '.linkedin-link'
+    ]
+}
+
+# Name selectors - more specific than SELENIUM_SELECTORS['name']
+SELENIUM_NAME_SELECTORS = [
+    'div[class*="text-label-1"]:not([class*="text-label-2"]):not([class*="text-label-3"])',
+    'h1:not([class*="text-label-2"])',
+    '.text-label-1:not(.text-label-2):not(.text-label-3)',
+    '[data-testid="profile-name"]'
+]
+
+SELENIUM_NAME_EXCLUDED_WORDS = ['problems', 'contest', 'discuss', 'interview', 'store', 'register', 'log', 'premium']
+
+SELENIUM_XPATHS = {
+    'rank_label': "//*[contains(text(), 'Rank')]/following-sibling::*[1]",
+    'large_number': "//*[text()[matches(., '^[0-9,]+$')]]",
+    'contest_rating': "//div[contains(text(), 'Contest Rating')]/following-sibling::div",
+    'global_ranking': "//div[contains(text(), 'Global Ranking')]/following-sibling::div",
+    'contests_attended': "//div[contains(text(), 'Attended')]/following-sibling::div",
+    'problems_solved': "//span[contains(text(), '/') and contains(text(), '3671')]",
+    'acceptance_rate': "//span[contains(text(), '%')]",
+    'easy_problems': "//div[contains(text(), 'Easy')]/following-sibling::div",
+    'medium_problems': "//div[contains(text(), 'Med.')]/following-sibling::div",
+    'hard_problems': "//div[contains(text(), 'Hard')]/following-sibling::div",
+    'problems_attempting': "//span[contains(text(), 'Attempting')]",
+    'submissions_past_year': "//span[contains(text(), 'submissions in the past one year')]",
+    'total_active_days': "//span[contains(text(), 'Total active days:')]",
+    'max_streak': "//span[contains(text(), 'Max streak:')]",
+}
+
+SELENIUM_SKILL_KEYWORDS = ['python', 'java', 'javascript', 'c++', 'sql', 'dsa', 'dbms', 'aida', 'react', 'node.js']
+
+# The ProfileData field each selector and XPath is read for, so a fields= scrape can skip the rest
+SELENIUM_LOOKUP_FIELDS = {
+    **{selector: 'name' for selector in SELENIUM_NAME_SELECTORS + SELENIUM_SELECTORS['name']},
+    **{selector: 'avatar_url' for selector in SELENIUM_SELECTORS['avatar']},
+    **{selector: 'rank' for selector in SELENIUM_SELECTORS['rank']},
+    **{selector: field for field in ('location', 'github', 'linkedin') for selector in SELENIUM_SELECTORS[field]},
+    SELENIUM_XPATHS['rank_label']: 'rank',
+    SELENIUM_XPATHS['large_number']: 'rank',
+    **{expression: field for field, expression in SELENIUM_XPATHS.items() if field in PROFILE_FIELDS},
+}
+
+# Evaluates every selector and XPath in one round trip; arguments[0] is the lookup plan
+BATCH_EXTRACT_JS = """
+const plan = arguments[0];
+const limit = plan.limit;
+const describe = (el) => ({
+    text: (el.innerText || el.textContent || '').trim(),
+    src: el.src || el.getAttribute('src'),
+    href: el.href || el.getAttribute('href'),
+});
+const result = {css: {}, xpath: {}, body: plan.body && document.body ? document.body.innerText : ''};
+for (const selector of plan.css) {
+    try {
+        result.css[selector] = Array.from(document.querySelectorAll(selector)).slice(0, limit).map(describe);
+    } catch (e) {
+        result.css[selector] = null;
+    }
+}
+for (const expression of plan.xpath) {
+    try {
+        const snapshot = document.evaluate(expression, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        const found = [];
+        for (let i = 0; i < Math.min(snapshot.snapshotLength, limit); i++) {
+            found.push(describe(snapshot.snapshotItem(i)));
+        }
+        result.xpath[expression] = found;
+    } catch (e) {
+        result.xpath[expression] = null;
+    }
+}
+return result;
+"""
+
+class WebDriverFinder:
+    """Element lookups issued as individual WebDriver calls"""
+    def __init__(self, driver):
+        self.driver = driver
+
+    def css(self, selector: str):
+        return self.driver.find_elements(By.CSS_SELECTOR, selector)
+
+    def xpath(self, expression: str):
+        return self.driver.find_elements(By.XPATH, expression)
+
+    def body_text(self) -> str:
+        return self.driver.find_element(By.TAG_NAME, "body").text
+
+class ProjectedFinder:
+    """Answers lookups for fields outside a fields= projection with nothing, without asking the browser"""
+    def __init__(self, finder, fields: frozenset):
+        self.finder = finder
+        self.fields = fields
+
+    def css(self, selector: str):
+        return self.finder.css(selector) if SELENIUM_LOOKUP_FIELDS.get(selector) in self.fields else []
+
+    def xpath(self, expression: str):
+        return self.finder.xpath(expression) if SELENIUM_LOOKUP_FIELDS.get(expression) in self.fields else []
+
+    def body_text(self) -> str:
+        return self.finder.body_text() if 'skills' in self.fields else ''
+
+class PrefetchedElement:
+    """Snapshot of an element returned by BATCH_EXTRACT_JS, mimicking the WebElement API we use"""
+    __slots__ = ("text", "_attributes")
+
+    def __init__(self, data: dict):
+        self.text = data.get('text') or ''
+        self._attributes = {'src': data.get('src'), 'href': data.get('href')}
+
+    def get_attribute(self, name: str):
+        return self._attributes.get(name)
+
+class BatchFinder:
+    """Element lookups answered from a single execute_script call"""
+    def __init__(self, data: dict):
+        self._css = data.get('css') or {}
+        self._xpath = data.get('xpath') or {}
+        self._body = data.get('body') or ''
+
+    @classmethod
+    def collect(cls, driver, fields: Optional[frozenset] = None) -> "BatchFinder":
+        def wanted(lookup):
+            return fields is None or SELENIUM_LOOKUP_FIELDS.get(lookup) in fields
+        css = dict.fromkeys(SELENIUM_NAME_SELECTORS + [s for group in SELENIUM_SELECTORS.values() for s in group])
+        plan = {
+            "css": [selector for selector in css if wanted(selector)],
+            "xpath": [expression for expression in SELENIUM_XPATHS.values() if wanted(expression)],
+            "body": fields is None or 'skills' in fields,
+            "limit": SELENIUM_BATCH_ELEMENT_LIMIT,
+        }
+        return cls(driver.execute_script(BATCH_EXTRACT_JS, plan) or {})
+
+    @staticmethod
+    def _elements(found):
+        if found is None:
+            # Invalid selector in the browser: behave like find_elements raising
+            raise ValueError("selector could not be evaluated")
+        return [PrefetchedElement(item) for item in found]
+
+    def css(self, selector: str):
+        return self._elements(self._css.get(selector, []))
+
+    def xpath(self, expression: str):
+        return self._elements(self._xpath.get(expression, []))
+
+    def body_text(self) -> str:
+        return self._body
+
+def extract_profile_with_selenium(driver, soup, username, mode: Optional[str] = None,
+                                  fields: Optional[frozenset] = None):
+    """
+    Extract profile data using Selenium WebDriver.
+    In "batch" mode every selector is evaluated by one in-browser script; "webdriver" mode
+    issues a WebDriver call per lookup. With `fields`, lookups for other fields are skipped.
+    """
+    mode = mode or SELENIUM_EXTRACTION_MODE
+    finder = WebDriverFinder(driver)
+    if mode == "batch":
+        try:
+            finder = BatchFinder.collect(driver, fields)
+        except WebDriverException as e:
+            print(f"Batch extraction script failed, using per-element lookups: {e}")
+    if fields is not None:
+        finder = ProjectedFinder(finder, fields)
+    
+    profile_data = ProfileData(
+        name="",
+        username=username,
+        rank="",
+        avatar_url="",
+        skills=[],
+        contest_rating=None,
+        global_ranking=None,
+        contests_attended=None,
+        problems_solved=None,
+        acceptance_rate=None,
+        easy_problems=None,
+        medium_problems=None,
+        hard_problems=None,
+        problems_attempting=None,
+        submissions_past_year=None,
+        total_active_days=None,
+        max_streak=None
+    )
+    
+    try:
+        # Extract name - be more specific
+        for selector in SELENIUM_NAME_SELECTORS:
+            try:
+                elements = finder.css(selector)
+                for element in elements:
+                    text = element.text.strip()
+                    # Filter out very long text (likely page content)
+                    if text and len(text) < 100 and not profile_data.name:
+                        # Additional check to ensure it's a name-like text
+                        if not any(word in text.lower() for word in SELENIUM_NAME_EXCLUDED_WORDS):
+                            profile_data.name = text
+                            break
+                if profile_data.name:
+                    break
+            except:
+                continue
+        
+        # Extract avatar
+        for selector in SELENIUM_SELECTORS['avatar']:
+            try:
+                elements = finder.css(selector)
+                for element in elements:
+                    src = element.get_attribute('src')
+                    if src and not profile_data.avatar_url:
+                        profile_data.avatar_url = src
+                        break
+                if profile_data.avatar_url:
+                    break
+            except:
+                continue
+        
+        # Extract rank - look for numbers after "Rank"
+        try:
+            # Look for elements containing "Rank" followed by a number
+            rank_elements = finder.xpath(SELENIUM_XPATHS['rank_label'])
+            for element in rank_elements:
+                text = element.text.strip()
+                if text and text.replace(',', '').replace('.', '').isdigit() and not profile_data.rank:
+                    profile_data.rank = text
+                    break
             
             # Fallback: look for any element with a large number
             if not profile_data.rank:
-                all_elements = driver.find_elements(By.XPATH, "//*[text()[matches(., '^[0-9,]+$')]]")
+                all_elements = finder.xpath(SELENIUM_XPATHS['large_number'])
                 for element in all_elements:
                     text = element.text.strip()
                     if text and len(text) > 3 and text.replace(',', '').isdigit() and not profile_data.rank:
@@ -360,9 +3054,9 @@ def extract_profile_with_selenium(driver, soup, username):
             pass
         
         # Extract location
-        for selector in selectors['location']:
+        for selector in SELENIUM_SELECTORS['location']:
             try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                elements = finder.css(selector)
                 for element in elements:
                     text = element.text.strip()
                     if text and not profile_data.location:
@@ -374,9 +3068,9 @@ def extract_profile_with_selenium(driver, soup, username):
                 continue
         
         # Extract GitHub link
-        for selector in selectors['github']:
+        for selector in SELENIUM_SELECTORS['github']:
             try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                elements = finder.css(selector)
                 for element in elements:
                     href = element.get_attribute('href')
                     if href and 'github.com' in href and not profile_data.github:
@@ -388,9 +3082,9 @@ def extract_profile_with_selenium(driver, soup, username):
                 continue
         
         # Extract LinkedIn link
-        for selector in selectors['linkedin']:
+        for selector in SELENIUM_SELECTORS['linkedin']:
             try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                elements = finder.css(selector)
                 for element in elements:
                     href = element.get_attribute('href')
                     if href and 'linkedin.com' in href and not profile_data.linkedin:
@@ -404,7 +3098,7 @@ def extract_profile_with_selenium(driver, soup, username):
         # Extract contest rating information
         try:
             # Look for contest rating section
-            contest_rating_elements = driver.find_elements(By.XPATH, "//div[contains(text(), 'Contest Rating')]/following-sibling::div")
+            contest_rating_elements = finder.xpath(SELENIUM_XPATHS['contest_rating'])
             for element in contest_rating_elements:
                 text = element.text.strip()
                 if text and text.replace(',', '').isdigit() and not profile_data.contest_rating:
@@ -412,7 +3106,7 @@ def extract_profile_with_selenium(driver, soup, username):
                     break
             
             # Look for global ranking
-            global_ranking_elements = driver.find_elements(By.XPATH, "//div[contains(text(), 'Global Ranking')]/following-sibling::div")
+            global_ranking_elements = finder.xpath(SELENIUM_XPATHS['global_ranking'])
             for element in global_ranking_elements:
                 text = element.text.strip()
                 if text and '/' in text and not profile_data.global_ranking:
@@ -420,7 +3114,7 @@ def extract_profile_with_selenium(driver, soup, username):
                     break
             
             # Look for contests attended
-            attended_elements = driver.find_elements(By.XPATH, "//div[contains(text(), 'Attended')]/following-sibling::div")
+            attended_elements = finder.xpath(SELENIUM_XPATHS['contests_attended'])
             for element in attended_elements:
                 text = element.text.strip()
                 if text and text.isdigit() and not profile_data.contests_attended:
@@ -432,7 +3126,7 @@ def extract_profile_with_selenium(driver, soup, username):
         # Extract problem-solving statistics
         try:
             # Look for problems solved (format: "166/3671")
-            solved_elements = driver.find_elements(By.XPATH, "//span[contains(text(), '/') and contains(text(), '3671')]")
+            solved_elements = finder.xpath(SELENIUM_XPATHS['problems_solved'])
             for element in solved_elements:
                 text = element.text.strip()
                 if text and '/' in text and not profile_data.problems_solved:
@@ -440,7 +3134,7 @@ def extract_profile_with_selenium(driver, soup, username):
                     break
             
             # Look for acceptance rate (format: "65.67%")
-            acceptance_elements = driver.find_elements(By.XPATH, "//span[contains(text(), '%')]")
+            acceptance_elements = finder.xpath(SELENIUM_XPATHS['acceptance_rate'])
             for element in acceptance_elements:
                 text = element.text.strip()
                 if text and '%' in text and '.' in text and not profile_data.acceptance_rate:
@@ -448,7 +3142,7 @@ def extract_profile_with_selenium(driver, soup, username):
                     break
             
             # Look for Easy problems (format: "81/895")
-            easy_elements = driver.find_elements(By.XPATH, "//div[contains(text(), 'Easy')]/following-sibling::div")
+            easy_elements = finder.xpath(SELENIUM_XPATHS['easy_problems'])
             for element in easy_elements:
                 text = element.text.strip()
                 if text and '/' in text and not profile_data.easy_problems:
@@ -456,7 +3150,7 @@ def extract_profile_with_selenium(driver, soup, username):
                     break
             
             # Look for Medium problems (format: "68/1911")
-            medium_elements = driver.find_elements(By.XPATH, "//div[contains(text(), 'Med.')]/following-sibling::div")
+            medium_elements = finder.xpath(SELENIUM_XPATHS['medium_problems'])
             for element in medium_elements:
                 text = element.text.strip()
                 if text and '/' in text and not profile_data.medium_problems:
@@ -464,7 +3158,7 @@ def extract_profile_with_selenium(driver, soup, username):
                     break
             
             # Look for Hard problems (format: "17/865")
-            hard_elements = driver.find_elements(By.XPATH, "//div[contains(text(), 'Hard')]/following-sibling::div")
+            hard_elements = finder.xpath(SELENIUM_XPATHS['hard_problems'])
             for element in hard_elements:
                 text = element.text.strip()
                 if text and '/' in text and not profile_data.hard_problems:
@@ -472,7 +3166,7 @@ def extract_profile_with_selenium(driver, soup, username):
                     break
             
             # Look for problems attempting (format: "6 Attempting")
-            attempting_elements = driver.find_elements(By.XPATH, "//span[contains(text(), 'Attempting')]")
+            attempting_elements = finder.xpath(SELENIUM_XPATHS['problems_attempting'])
             for element in attempting_elements:
                 text = element.text.strip()
                 if text and 'Attempting' in text and not profile_data.problems_attempting:
@@ -484,7 +3178,7 @@ def extract_profile_with_selenium(driver, soup, username):
         # Extract activity statistics
         try:
             # Look for submissions in past year (format: "89 submissions in the past one year")
-            submissions_elements = driver.find_elements(By.XPATH, "//span[contains(text(), 'submissions in the past one year')]")
+            submissions_elements = finder.xpath(SELENIUM_XPATHS['submissions_past_year'])
             for element in submissions_elements:
                 text = element.text.strip()
                 if text and 'submissions in the past one year' in text and not profile_data.submissions_past_year:
@@ -495,7 +3189,7 @@ def extract_profile_with_selenium(driver, soup, username):
                         break
             
             # Look for total active days (format: "Total active days: 22")
-            active_days_elements = driver.find_elements(By.XPATH, "//span[contains(text(), 'Total active days:')]")
+            active_days_elements = finder.xpath(SELENIUM_XPATHS['total_active_days'])
             for element in active_days_elements:
                 text = element.text.strip()
                 if text and 'Total active days:' in text and not profile_data.total_active_days:
@@ -508,7 +3202,7 @@ def extract_profile_with_selenium(driver, soup, username):
                             break
             
             # Look for max streak (format: "Max streak: 5")
-            streak_elements = driver.find_elements(By.XPATH, "//span[contains(text(), 'Max streak:')]")
+            streak_elements = finder.xpath(SELENIUM_XPATHS['max_streak'])
             for element in streak_elements:
                 text = element.text.strip()
                 if text and 'Max streak:' in text and not profile_data.max_streak:
@@ -524,9 +3218,8 @@ def extract_profile_with_selenium(driver, soup, username):
         
         # Extract skills from page text
         try:
-            page_text = driver.find_element(By.TAG_NAME, "body").text.lower()
-            skill_keywords = ['python', 'java', 'javascript', 'c++', 'sql', 'dsa', 'dbms', 'aida', 'react', 'node.js']
-            for keyword in skill_keywords:
+            page_text = finder.body_text().lower()
+            for keyword in SELENIUM_SKILL_KEYWORDS:
                 if keyword in page_text and keyword not in profile_data.skills:
                     profile_data.skills.append(keyword)
         except:
@@ -537,423 +3230,1474 @@ def extract_profile_with_selenium(driver, soup, username):
     
     return profile_data
 
-def extract_from_json_data(data: dict, username: str) -> ProfileData:
-    """Extract profile data from JSON embedded in the page"""
-    profile_data = ProfileData(
-        name="",
-        username=username,
-        rank="",
-        avatar_url="",
-        skills=[],
-        contest_rating=None,
-        global_ranking=None,
-        contests_attended=None,
-        problems_solved=None,
-        acceptance_rate=None,
-        easy_problems=None,
-        medium_problems=None,
-        hard_problems=None,
-        problems_attempting=None,
-        submissions_past_year=None,
-        total_active_days=None,
-        max_streak=None
-    )
-    
-    try:
-        # Navigate through the JSON structure to find profile data
-        if 'profile' in data:
-            profile_info = data['profile']
-            profile_data.name = profile_info.get('realName', '')
-            profile_data.rank = str(profile_info.get('ranking', ''))
-            profile_data.avatar_url = profile_info.get('userAvatar', '')
-            profile_data.location = profile_info.get('location', '')
-            profile_data.github = profile_info.get('githubUrl', '')
-            profile_data.linkedin = profile_info.get('linkedinUrl', '')
-            
-            # Extract skills from tags or other fields
-            if 'skillTags' in profile_info:
-                profile_data.skills = profile_info['skillTags']
-    except (KeyError, TypeError):
-        pass
-    
-    return profile_data
+NEXT_DATA_MARKER = b'__NEXT_DATA__'
+INITIAL_STATE_MARKER = b'window.__INITIAL_STATE__'
+SCRIPT_END = b'</script>'
+_JSON_DECODER = json.JSONDecoder()
 
-def extract_from_html(soup: BeautifulSoup, username: str) -> ProfileData:
-    """Extract profile data from HTML elements"""
-    profile_data = ProfileData(
-        name="",
-        username=username,
-        rank="",
-        avatar_url="",
-        skills=[],
-        contest_rating=None,
-        global_ranking=None,
-        contests_attended=None,
-        problems_solved=None,
-        acceptance_rate=None,
-        easy_problems=None,
-        medium_problems=None,
-        hard_problems=None,
-        problems_attempting=None,
-        submissions_past_year=None,
-        total_active_days=None,
-        max_streak=None
-    )
-    
-    try:
-        # Look for various possible selectors
-        selectors_to_try = [
-            {'name': 'div[class*="text-label-1"]', 'type': 'name'},
-            {'name': 'h1', 'type': 'name'},
-            {'name': 'img[alt*="Avatar"]', 'type': 'avatar'},
-            {'name': 'span[class*="rank"]', 'type': 'rank'},
-            {'name': 'div[class*="location"]', 'type': 'location'},
-            {'name': 'a[href*="github"]', 'type': 'github'},
-            {'name': 'a[href*="linkedin"]', 'type': 'linkedin'},
-        ]
-        
-        for selector in selectors_to_try:
-            elements = soup.select(selector['name'])
-            for element in elements:
-                if selector['type'] == 'name' and not profile_data.name:
-                    profile_data.name = element.get_text(strip=True)
-                elif selector['type'] == 'avatar' and not profile_data.avatar_url:
-                    profile_data.avatar_url = element.get('src', '')
-                elif selector['type'] == 'rank' and not profile_data.rank:
-                    text = element.get_text(strip=True)
-                    if text.replace(',', '').replace('.', '').isdigit():
-                        profile_data.rank = text
-                elif selector['type'] == 'location' and not profile_data.location:
-                    profile_data.location = element.get_text(strip=True)
-                elif selector['type'] == 'github' and not profile_data.github:
-                    href = element.get('href', '')
-                    if 'github.com' in href:
-                        profile_data.github = href.split('/')[-1]
-                elif selector['type'] == 'linkedin' and not profile_data.linkedin:
-                    href = element.get('href', '')
-                    if 'linkedin.com' in href:
-                        profile_data.linkedin = href.split('/')[-1]
-        
-        # Extract contest rating information from HTML
-        try:
-            # Look for contest rating in HTML
-            contest_rating_divs = soup.find_all('div', string=lambda text: text and 'Contest Rating' in text)
-            for div in contest_rating_divs:
-                parent = div.parent
-                if parent:
-                    rating_div = parent.find('div', class_='text-label-1')
-                    if rating_div and rating_div.get_text(strip=True).replace(',', '').isdigit():
-                        profile_data.contest_rating = rating_div.get_text(strip=True)
-                        break
-            
-            # Look for global ranking
-            global_ranking_divs = soup.find_all('div', string=lambda text: text and 'Global Ranking' in text)
-            for div in global_ranking_divs:
-                parent = div.parent
-                if parent:
-                    ranking_div = parent.find('div', class_='text-label-1')
-                    if ranking_div and '/' in ranking_div.get_text(strip=True):
-                        profile_data.global_ranking = ranking_div.get_text(strip=True)
-                        break
-            
-            # Look for contests attended
-            attended_divs = soup.find_all('div', string=lambda text: text and 'Attended' in text)
-            for div in attended_divs:
-                parent = div.parent
-                if parent:
-                    attended_div = parent.find('div', class_='text-label-1')
-                    if attended_div and attended_div.get_text(strip=True).isdigit():
-                        profile_data.contests_attended = attended_div.get_text(strip=True)
-                        break
-        except:
-            pass
-        
-        # Extract problem-solving statistics from HTML
-        try:
-            # Look for problems solved (format: "166/3671")
-            solved_spans = soup.find_all('span', string=lambda text: text and '/' in text and '3671' in text)
-            for span in solved_spans:
-                text = span.get_text(strip=True)
-                if text and '/' in text and not profile_data.problems_solved:
-                    profile_data.problems_solved = text
-                    break
-            
-            # Look for acceptance rate (format: "65.67%")
-            acceptance_spans = soup.find_all('span', string=lambda text: text and '%' in text and '.' in text)
-            for span in acceptance_spans:
-                text = span.get_text(strip=True)
-                if text and '%' in text and '.' in text and not profile_data.acceptance_rate:
-                    profile_data.acceptance_rate = text
-                    break
-            
-            # Look for Easy problems (format: "81/895")
-            easy_divs = soup.find_all('div', string=lambda text: text and 'Easy' in text)
-            for div in easy_divs:
-                parent = div.parent
-                if parent:
-                    easy_div = parent.find('div', class_='text-xs')
-                    if easy_div and '/' in easy_div.get_text(strip=True):
-                        profile_data.easy_problems = easy_div.get_text(strip=True)
-                        break
-            
-            # Look for Medium problems (format: "68/1911")
-            medium_divs = soup.find_all('div', string=lambda text: text and 'Med.' in text)
-            for div in medium_divs:
-                parent = div.parent
-                if parent:
-                    medium_div = parent.find('div', class_='text-xs')
-                    if medium_div and '/' in medium_div.get_text(strip=True):
-                        profile_data.medium_problems = medium_div.get_text(strip=True)
-                        break
-            
-            # Look for Hard problems (format: "17/865")
-            hard_divs = soup.find_all('div', string=lambda text: text and 'Hard' in text)
-            for div in hard_divs:
-                parent = div.parent
-                if parent:
-                    hard_div = parent.find('div', class_='text-xs')
-                    if hard_div and '/' in hard_div.get_text(strip=True):
-                        profile_data.hard_problems = hard_div.get_text(strip=True)
-                        break
-            
-            # Look for problems attempting (format: "6 Attempting")
-            attempting_spans = soup.find_all('span', string=lambda text: text and 'Attempting' in text)
-            for span in attempting_spans:
-                text = span.get_text(strip=True)
-                if text and 'Attempting' in text and not profile_data.problems_attempting:
-                    profile_data.problems_attempting = text
-                    break
-        except:
-            pass
-        
-        # Extract activity statistics from HTML
-        try:
-            # Look for submissions in past year (format: "89 submissions in the past one year")
-            submissions_spans = soup.find_all('span', string=lambda text: text and 'submissions in the past one year' in text)
-            for span in submissions_spans:
-                text = span.get_text(strip=True)
-                if text and 'submissions in the past one year' in text and not profile_data.submissions_past_year:
-                    # Extract the number before "submissions"
-                    parts = text.split(' ')
-                    if len(parts) > 0 and parts[0].isdigit():
-                        profile_data.submissions_past_year = parts[0]
-                        break
-            
-            # Look for total active days (format: "Total active days: 22")
-            active_days_spans = soup.find_all('span', string=lambda text: text and 'Total active days:' in text)
-            for span in active_days_spans:
-                text = span.get_text(strip=True)
-                if text and 'Total active days:' in text and not profile_data.total_active_days:
-                    # Extract the number after the colon
-                    parts = text.split(':')
-                    if len(parts) > 1:
-                        number = parts[1].strip()
-                        if number.isdigit():
-                            profile_data.total_active_days = number
-                            break
-            
-            # Look for max streak (format: "Max streak: 5")
-            streak_spans = soup.find_all('span', string=lambda text: text and 'Max streak:' in text)
-            for span in streak_spans:
-                text = span.get_text(strip=True)
-                if text and 'Max streak:' in text and not profile_data.max_streak:
-                    # Extract the number after the colon
-                    parts = text.split(':')
-                    if len(parts) > 1:
-                        number = parts[1].strip()
-                        if number.isdigit():
-                            profile_data.max_streak = number
-                            break
-        except:
-            pass
+def find_embedded_state(html) -> Optional[dict]:
+    """
+    Pull the JSON state a profile page embeds for hydration straight out of the response bytes, without parsing
+    the HTML: Next.js' <script id="__NEXT_DATA__"> first, then the older window.__INITIAL_STATE__ = {...}.
+    """
+    if isinstance(html, str):
+        html = html.encode()
+    marker = html.find(NEXT_DATA_MARKER)
+    if marker != -1:
+        tag_start = html.rfind(b'<script', 0, marker)
+        tag_end = html.find(b'>', marker)
+        # The id must belong to the script tag itself, not to text elsewhere on the page
+        if tag_start != -1 and tag_end != -1 and html.find(b'>', tag_start, marker) == -1:
+            end = html.find(SCRIPT_END, tag_end)
+            if end != -1:
+                try:
+                    state = loads_json(html[tag_end + 1:end])
+                    if isinstance(state, dict):
+                        return state
+                except ValueError:
+                    pass
+    marker = html.find(INITIAL_STATE_MARKER)
+    if marker != -1:
+        brace = html.find(b'{', marker)
+        end = html.find(SCRIPT_END, marker)
+        if brace != -1 and (end == -1 or brace < end):
+            try:
+                # raw_decode stops at the end of the object, whatever follows it in the script
+                state, _ = _JSON_DECODER.raw_decode(html[brace:end if end != -1 else len(html)].decode('utf-8', 'replace'))
+                if isinstance(state, dict):
+                    return state
+            except ValueError:
+                pass
+    return None
+
+def _merge_state(target: dict, source: dict):
+    """Deep-merge one dehydrated query's data into the others (several queries each carry part of matchedUser)"""
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge_state(target[key], value)
+        elif value is not None or key not in target:
+            target[key] = value
+
+def graphql_state(data: dict) -> Optional[dict]:
+    """GraphQL-shaped data (matchedUser, userContestRanking, ...) from a Next.js page state, if it carries any"""
+    if 'matchedUser' in data:
+        return data
+    page_props = (data.get('props') or {}).get('pageProps') or {}
+    queries = (page_props.get('dehydratedState') or {}).get('queries') or []
+    merged = {}
+    for query in queries:
+        query_data = ((query or {}).get('state') or {}).get('data')
+        if isinstance(query_data, dict):
+            _merge_state(merged, query_data)
+    user = merged.get('matchedUser')
+    if not isinstance(user, dict):
+        return None
+    # Some page queries name the global submission stats differently from the public API
+    if 'submitStatsGlobal' not in user and 'submitStats' in user:
+        user['submitStatsGlobal'] = user['submitStats']
+    return merged
+
+def embedded_state_groups(data: dict) -> tuple:
+    """FIELD_GROUPS the embedded state answers outright, including values that are legitimately empty"""
+    state = graphql_state(data)
+    if state is None:
+        return ('identity', 'skills') if isinstance(data.get('profile'), dict) else ()
+    user = state['matchedUser']
+    present = {
+        'identity': 'profile' in user,
+        'skills': 'skillTags' in (user.get('profile') or {}),
+        'contest': 'userContestRanking' in state,
+        'problems': 'submitStatsGlobal' in user and 'allQuestionsCount' in state,
+        'progress': 'userProfileUserQuestionProgressV2' in state,
+        'activity': 'userCalendar' in user,
+    }
+    return tuple(group for group in FIELD_GROUPS if present[group])
+
+def extract_from_json_data(data: dict, username: str) -> ProfileData:
+    """Extract profile data from JSON embedded in the page (Next.js __NEXT_DATA__ or window.__INITIAL_STATE__)"""
+    profile_data = empty_profile(username)
+    
+    try:
+        # Next.js pages dehydrate the same GraphQL queries the API answers
+        state = graphql_state(data)
+        if state is not None:
+            return extract_from_graphql_data(state, username)
         
-        # Extract skills from various possible locations
-        skill_keywords = ['python', 'java', 'javascript', 'c++', 'sql', 'dsa', 'dbms', 'aida']
-        all_text = soup.get_text().lower()
-        for keyword in skill_keywords:
-            if keyword in all_text and keyword not in profile_data.skills:
-                profile_data.skills.append(keyword)
-                
-    except Exception:
+        # Older pages: a flat profile object
+        if 'profile' in data:
+            profile_info = data['profile']
+            profile_data.name = profile_info.get('realName') or ''
+            if isinstance(profile_info.get('ranking'), int):
+                profile_data.rank = f"{profile_info['ranking']:,}"
+            else:
+                profile_data.rank = str(profile_info.get('ranking') or '')
+            profile_data.avatar_url = profile_info.get('userAvatar') or ''
+            profile_data.location = profile_info.get('location') or None
+            if profile_info.get('githubUrl'):
+                profile_data.github = profile_info['githubUrl'].rstrip('/').split('/')[-1]
+            if profile_info.get('linkedinUrl'):
+                profile_data.linkedin = profile_info['linkedinUrl'].rstrip('/').split('/')[-1]
+            
+            # Extract skills from tags or other fields
+            if 'skillTags' in profile_info:
+                profile_data.skills = profile_info['skillTags'] or []
+    except (KeyError, TypeError, AttributeError):
         pass
     
     return profile_data
 
-def try_graphql_api(username: str, headers: dict) -> ProfileData:
-    """Try to get data using LeetCode's GraphQL API"""
-    profile_data = ProfileData(
-        name="",
-        username=username,
-        rank="",
-        avatar_url="",
-        skills=[],
-        contest_rating=None,
-        global_ranking=None,
-        contests_attended=None,
-        problems_solved=None,
-        acceptance_rate=None,
-        easy_problems=None,
-        medium_problems=None,
-        hard_problems=None,
-        problems_attempting=None,
-        submissions_past_year=None,
-        total_active_days=None,
-        max_streak=None
-    )
+def _class_tokens(element) -> List[str]:
+    return (element.get('class') or '').split()
+
+def _element_text(element) -> str:
+    """Equivalent of BeautifulSoup's get_text(strip=True) for an lxml element"""
+    return ''.join(piece.strip() for piece in element.itertext())
+
+def _find_descendant(parent, tag: str, class_name: str, exclude=None):
+    """First descendant <tag> of parent carrying class_name (like parent.find(tag, class_=class_name))"""
+    for element in parent.iter(tag):
+        if element is not parent and element is not exclude and class_name in _class_tokens(element):
+            return element
+    return None
+
+def _digits_only(text: str, *ignored: str) -> bool:
+    for char in ignored:
+        text = text.replace(char, '')
+    return text.isdigit()
+
+def _number_after_colon(text: str) -> Optional[str]:
+    parts = text.split(':')
+    if len(parts) > 1 and parts[1].strip().isdigit():
+        return parts[1].strip()
+    return None
+
+def _sibling_value(class_name: str, accept):
+    """Matcher reading a stat from the labelled element's parent (e.g. "Contest Rating" -> its value div)"""
+    def match(element, text):
+        parent = element.getparent()
+        if parent is None:
+            return None
+        # The label itself can share the value's class, so never read it back as the value
+        value_element = _find_descendant(parent, 'div', class_name, exclude=element)
+        if value_element is None:
+            return None
+        value = _element_text(value_element)
+        return value if accept(value) else None
+    return match
+
+def _own_text(accept):
+    """Matcher reading a stat from the labelled element's own text"""
+    def match(element, text):
+        value = text.strip()
+        return value if value and accept(value) else None
+    return match
+
+# Element matchers, in priority order per field: (field, tag, attribute, substring, value reader)
+HTML_ELEMENT_MATCHERS = [
+    ('name', 'div', 'class', 'text-label-1', lambda el: _element_text(el)),
+    ('name', 'h1', None, None, lambda el: _element_text(el)),
+    ('avatar_url', 'img', 'alt', 'Avatar', lambda el: el.get('src', '')),
+    ('rank', 'span', 'class', 'rank', lambda el: _element_text(el) if _digits_only(_element_text(el), ',', '.') else ''),
+    ('location', 'div', 'class', 'location', lambda el: _element_text(el)),
+    ('github', 'a', 'href', 'github', lambda el: el.get('href', '').split('/')[-1] if 'github.com' in el.get('href', '') else ''),
+    ('linkedin', 'a', 'href', 'linkedin', lambda el: el.get('href', '').split('/')[-1] if 'linkedin.com' in el.get('href', '') else ''),
+]
+
+# Text matchers keyed by tag: (field, marker that must appear in the element's text, value reader)
+HTML_TEXT_MATCHERS = {
+    'div': [
+        ('contest_rating', 'Contest Rating', _sibling_value('text-label-1', lambda v: _digits_only(v, ','))),
+        ('global_ranking', 'Global Ranking', _sibling_value('text-label-1', lambda v: '/' in v)),
+        ('contests_attended', 'Attended', _sibling_value('text-label-1', lambda v: v.isdigit())),
+        ('easy_problems', 'Easy', _sibling_value('text-xs', lambda v: '/' in v)),
+        ('medium_problems', 'Med.', _sibling_value('text-xs', lambda v: '/' in v)),
+        ('hard_problems', 'Hard', _sibling_value('text-xs', lambda v: '/' in v)),
+    ],
+    'span': [
+        ('problems_solved', '3671', _own_text(lambda v: '/' in v)),
+        ('acceptance_rate', '%', _own_text(lambda v: '.' in v)),
+        ('problems_attempting', 'Attempting', _own_text(lambda v: True)),
+        ('submissions_past_year', 'submissions in the past one year',
+         lambda el, text: text.strip().split(' ')[0] if text.strip().split(' ')[0].isdigit() else None),
+        ('total_active_days', 'Total active days:', lambda el, text: _number_after_colon(text)),
+        ('max_streak', 'Max streak:', lambda el, text: _number_after_colon(text)),
+    ],
+}
+
+SKILL_KEYWORDS = ['python', 'java', 'javascript', 'c++', 'sql', 'dsa', 'dbms', 'aida']
+
+# Every field extract_from_html can find
+HTML_FIELDS = frozenset(
+    [matcher[0] for matcher in HTML_ELEMENT_MATCHERS]
+    + [matcher[0] for matchers in HTML_TEXT_MATCHERS.values() for matcher in matchers]
+    + ['skills']
+)
+
+NON_CONTENT_TAGS = {'script', 'style', 'template'}
+
+def extract_from_html(html, username: str, fields: Optional[frozenset] = None) -> ProfileData:
+    """
+    Extract profile data from a profile page (str, bytes or BeautifulSoup) in a single lxml pass.
+    Every element is visited once and offered to all field matchers at the same time.
+    With `fields`, only those fields' matchers run (and the page text is only collected for skills).
+    """
+    profile_data = ProfileData(name="", username=username, rank="", avatar_url="", skills=[])
     
     try:
-        # LeetCode GraphQL endpoint
-        graphql_url = "https://leetcode.com/graphql/"
-        
-        query = """
-        query userPublicProfile($username: String!) {
-            matchedUser(username: $username) {
-                username
-                profile {
-                    realName
-                    userAvatar
-                    ranking
-                    location
-                    githubUrl
-                    linkedinUrl
-                    skillTags
-                }
-            }
-        }
-        """
-        
-        variables = {"username": username}
+        if isinstance(html, BeautifulSoup):
+            html = str(html)
+        root = lxml.html.document_fromstring(html)
+    except Exception as e:
+        print(f"Error parsing profile HTML: {e}")
+        return profile_data
+    
+    element_matchers = [(priority, matcher) for priority, matcher in enumerate(HTML_ELEMENT_MATCHERS)
+                        if fields is None or matcher[0] in fields]
+    text_matchers = HTML_TEXT_MATCHERS if fields is None else {
+        tag: [matcher for matcher in matchers if matcher[0] in fields] for tag, matchers in HTML_TEXT_MATCHERS.items()
+    }
+    want_skills = fields is None or 'skills' in fields
+    
+    # Best candidate per element-matched field: (matcher priority, value)
+    element_candidates = {}
+    found = {}
+    text_pieces = []
+    
+    for element in root.iter():
+        tag = element.tag
+        if not isinstance(tag, str):
+            # Comments and processing instructions only contribute their tail text
+            if want_skills and element.tail:
+                text_pieces.append(element.tail)
+            continue
         
-        payload = {
-            "query": query,
-            "variables": variables
-        }
+        if want_skills:
+            if tag not in NON_CONTENT_TAGS and element.text:
+                text_pieces.append(element.text)
+            if element.tail:
+                text_pieces.append(element.tail)
         
-        response = requests.post(graphql_url, json=payload, headers=headers, timeout=10)
-        response.raise_for_status()
+        for priority, (field, matcher_tag, attribute, substring, read) in element_matchers:
+            if tag != matcher_tag:
+                continue
+            best = element_candidates.get(field)
+            if best is not None and best[0] <= priority:
+                continue
+            if attribute and substring not in (element.get(attribute) or ''):
+                continue
+            value = read(element)
+            if value:
+                element_candidates[field] = (priority, value)
         
-        data = response.json()
+        # Text matchers only look at elements whose whole content is a single string
+        matchers = text_matchers.get(tag)
+        if matchers and element.text and len(element) == 0:
+            for field, marker, read in matchers:
+                if field not in found and marker in element.text:
+                    value = read(element, element.text)
+                    if value:
+                        found[field] = value
+    
+    for field, (_, value) in element_candidates.items():
+        setattr(profile_data, field, value)
+    for field, value in found.items():
+        setattr(profile_data, field, value)
+    
+    # Extract skills from the visible page text
+    if want_skills:
+        all_text = ''.join(text_pieces).lower()
+        profile_data.skills = [keyword for keyword in SKILL_KEYWORDS if keyword in all_text]
+    
+    return profile_data
+
+GRAPHQL_URL = f"{LEETCODE_BASE_URL}/graphql/"
+
+GRAPHQL_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Content-Type': 'application/json',
+    'Accept': 'application/json',
+    'Referer': f'{LEETCODE_BASE_URL}/',
+    'Origin': LEETCODE_BASE_URL,
+}
+
+# Selections each field group needs: (matchedUser fields, matchedUser.profile fields, root fields)
+GRAPHQL_GROUP_SELECTIONS = {
+    "identity": (["githubUrl", "linkedinUrl"], ["realName", "userAvatar", "ranking", "countryName", "school"], []),
+    "skills": ([], ["skillTags"], []),
+    "contest": ([], [], ["""
+    userContestRanking(username: $username) {
+        attendedContestsCount
+        rating
+        globalRanking
+        totalParticipants
+    }"""]),
+    "problems": (["""
+        submitStatsGlobal {
+            acSubmissionNum { difficulty count submissions }
+            totalSubmissionNum { difficulty count submissions }
+        }"""], [], ["""
+    allQuestionsCount { difficulty count }"""]),
+    "progress": ([], [], ["""
+    userProfileUserQuestionProgressV2(userSlug: $username) {
+        numFailedQuestions { difficulty count }
+    }"""]),
+    "activity": (["""
+        userCalendar {
+            streak
+            totalActiveDays
+            submissionCalendar
+        }"""], [], []),
+}
+
+@lru_cache(maxsize=None)
+def build_profile_query(groups: Optional[tuple] = None) -> str:
+    """Profile query selecting only what the given field groups need (all of them by default)
+
+    matchedUser.username is always selected so the response still says whether the user exists.
+    """
+    user_fields, profile_fields, root_fields = ["username"], [], []
+    for group in groups or tuple(FIELD_GROUPS):
+        user, profile, root = GRAPHQL_GROUP_SELECTIONS[group]
+        user_fields += user
+        profile_fields += profile
+        root_fields += root
+    if profile_fields:
+        user_fields.append("profile {\n" + "".join(f"            {field}\n" for field in profile_fields) + "        }")
+    body = "".join(field if field.startswith("\n") else f"\n        {field}" for field in user_fields)
+    return (
+        "\nquery userProfile($username: String!) {\n    matchedUser(username: $username) {"
+        + body + "\n    }" + "".join(root_fields) + "\n}\n"
+    )
+
+# One round trip for every field ProfileData exposes
+PROFILE_GRAPHQL_QUERY = build_profile_query()
+
+def extract_from_graphql_data(data: dict, username: str) -> ProfileData:
+    """Map a PROFILE_GRAPHQL_QUERY response onto ProfileData, using the same formats as the profile page"""
+    profile_data = ProfileData(name="", username=username, rank="", avatar_url="", skills=[])
+    
+    user_data = data.get('matchedUser')
+    if not user_data:
+        return profile_data
+    
+    profile = user_data.get('profile') or {}
+    profile_data.name = profile.get('realName') or ''
+    if profile.get('ranking'):
+        profile_data.rank = f"{profile['ranking']:,}"
+    profile_data.avatar_url = profile.get('userAvatar') or ''
+    profile_data.location = profile.get('countryName') or None
+    profile_data.university = profile.get('school') or None
+    profile_data.skills = profile.get('skillTags') or []
+    if user_data.get('githubUrl'):
+        profile_data.github = user_data['githubUrl'].rstrip('/').split('/')[-1]
+    if user_data.get('linkedinUrl'):
+        profile_data.linkedin = user_data['linkedinUrl'].rstrip('/').split('/')[-1]
+    
+    # Contest statistics
+    contest = data.get('userContestRanking')
+    if contest:
+        if contest.get('rating') is not None:
+            profile_data.contest_rating = f"{round(contest['rating']):,}"
+        if contest.get('globalRanking') and contest.get('totalParticipants'):
+            profile_data.global_ranking = f"{contest['globalRanking']:,}/{contest['totalParticipants']:,}"
+        if contest.get('attendedContestsCount') is not None:
+            profile_data.contests_attended = str(contest['attendedContestsCount'])
+    
+    # Solved counts by difficulty (format: "81/895")
+    totals = {item['difficulty']: item['count'] for item in data.get('allQuestionsCount') or []}
+    stats = user_data.get('submitStatsGlobal') or {}
+    accepted = {item['difficulty']: item for item in stats.get('acSubmissionNum') or []}
+    submitted = {item['difficulty']: item for item in stats.get('totalSubmissionNum') or []}
+    for difficulty, field in (('All', 'problems_solved'), ('Easy', 'easy_problems'),
+                              ('Medium', 'medium_problems'), ('Hard', 'hard_problems')):
+        if difficulty in accepted and difficulty in totals:
+            setattr(profile_data, field, f"{accepted[difficulty]['count']}/{totals[difficulty]}")
+    
+    # Acceptance rate (format: "65.67%")
+    if 'All' in accepted and 'All' in submitted and submitted['All'].get('submissions'):
+        rate = accepted['All']['submissions'] / submitted['All']['submissions'] * 100
+        profile_data.acceptance_rate = f"{rate:.2f}%"
+    
+    # Problems attempting (format: "6 Attempting")
+    progress = data.get('userProfileUserQuestionProgressV2')
+    if progress and progress.get('numFailedQuestions') is not None:
+        attempting = sum(item['count'] for item in progress['numFailedQuestions'])
+        profile_data.problems_attempting = f"{attempting} Attempting"
+    
+    # Activity statistics
+    calendar = user_data.get('userCalendar')
+    if calendar:
+        if calendar.get('submissionCalendar'):
+            try:
+                submissions = json.loads(calendar['submissionCalendar'])
+                profile_data.submissions_past_year = str(sum(submissions.values()))
+            except (json.JSONDecodeError, TypeError, AttributeError):
+                pass
+        if calendar.get('totalActiveDays') is not None:
+            profile_data.total_active_days = str(calendar['totalActiveDays'])
+        if calendar.get('streak') is not None:
+            profile_data.max_streak = str(calendar['streak'])
+    
+    return profile_data
+
+# Cheapest possible existence check, used before the browser pipeline when the full query failed
+USER_EXISTS_QUERY = """
+query userExists($username: String!) {
+    matchedUser(username: $username) {
+        username
+    }
+}
+"""
+
+def _graphql_user_exists(payload: dict) -> Optional[bool]:
+    """True/False when a GraphQL response says whether matchedUser exists, None when it cannot tell"""
+    data = payload.get('data') or {}
+    if 'matchedUser' not in data:
+        return None
+    if data['matchedUser']:
+        return True
+    # A null matchedUser is only conclusive when the error (if any) says the user does not exist
+    for error in payload.get('errors') or []:
+        if (error.get('path') or [None])[0] == 'matchedUser' and 'does not exist' not in (error.get('message') or ''):
+            return None
+    return False
+
+def _post_graphql(query: str, username: str, headers: Optional[dict] = None) -> dict:
+    payload = {
+        "query": query,
+        "variables": {"username": username}
+    }
+    response = http_client.post(GRAPHQL_URL, json=payload, headers=headers or GRAPHQL_HEADERS)
+    response.raise_for_status()
+    return response.json()
+
+def fetch_graphql_profile(username: str, headers: Optional[dict] = None, groups: Optional[tuple] = None):
+    """Run the profile query for `groups` (all by default) and return (profile, exists, complete)
+
+    exists is None if GraphQL could not say; complete means the response carried no errors, so every
+    requested field is final.
+    """
+    profile_data = ProfileData(name="", username=username, rank="", avatar_url="", skills=[])
+    exists = None
+    complete = False
+    
+    try:
+        data = _post_graphql(build_profile_query(groups) if groups else PROFILE_GRAPHQL_QUERY, username, headers)
+        exists = _graphql_user_exists(data)
         
-        if 'data' in data and 'matchedUser' in data['data']:
-            user_data = data['data']['matchedUser']
-            if user_data and 'profile' in user_data:
-                profile = user_data['profile']
-                profile_data.name = profile.get('realName', '')
-                profile_data.rank = str(profile.get('ranking', ''))
-                profile_data.avatar_url = profile.get('userAvatar', '')
-                profile_data.location = profile.get('location', '')
-                profile_data.github = profile.get('githubUrl', '')
-                profile_data.linkedin = profile.get('linkedinUrl', '')
-                profile_data.skills = profile.get('skillTags', [])
+        # Partial data still comes back alongside "errors" for individual fields
+        if data.get('data'):
+            profile_data = extract_from_graphql_data(data['data'], username)
+            complete = exists is True and not data.get('errors')
                 
-    except Exception:
-        pass
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error in GraphQL scraping: {e}")
     
-    return profile_data
+    return profile_data, exists, complete
+
+def try_graphql_api(username: str, headers: Optional[dict] = None) -> ProfileData:
+    """Try to get data using LeetCode's GraphQL API"""
+    return fetch_graphql_profile(username, headers)[0]
+
+def probe_user_exists(username: str) -> Optional[bool]:
+    """Cheap matchedUser lookup; None when the probe itself fails"""
+    try:
+        return _graphql_user_exists(_post_graphql(USER_EXISTS_QUERY, username))
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        print(f"Error probing user existence: {e}")
+        return None
 
 @app.get("/")
 async def root():
     return {"message": "LeetCode Profile Scraper API", "version": "1.0.0"}
 
-@app.post("/scrape-profile", response_model=ProfileData)
-async def scrape_profile(request: ScrapeRequest):
+_refresh_tasks = set()
+
+async def refresh_profile(username: str, groups: Optional[tuple] = None):
+    """Re-scrape a stale profile (or just `groups` of it) in the background and update the cache"""
+    try:
+        await single_flight.run(username, groups=groups)
+    except HTTPException as e:
+        print(f"Background refresh of {username} failed: {e.detail}")
+    except Exception as e:
+        print(f"Background refresh of {username} failed: {e}")
+    finally:
+        _refresh_tasks.discard(single_flight.flight_key(username, groups))
+
+class RefreshScheduler:
+    """Keeps a watched set of profiles fresh in the background so API reads stay cache hits
+    
+    The watchlist and per-profile access scores live in the SQLite store, so every worker sees the same set;
+    only the worker holding the scheduler lock file runs refreshes, which keeps the rate budget global.
+    """
+    # Seconds to pause after an unexpected error before the loop carries on
+    ERROR_BACKOFF = 5.0
+
+    def __init__(self, enabled: bool, interval: float, jitter: float, rate: float, concurrency: int,
+                 auto_watch: bool, max_watched: int, half_life: float, sync_interval: float, lock_dir: str):
+        self.enabled = enabled
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.auto_watch = auto_watch
+        self.max_watched = max_watched
+        self.half_life = half_life
+        self.sync_interval = sync_interval
+        self.lock_path = os.path.join(lock_dir, "refresh-scheduler.lock")
+        self.leader = False
+        self._limiter = RateLimiter(rate, burst=1)
+        self._lock = threading.Lock()
+        self._watched = {}
+        self._hits = {}
+        self._pending = {}
+        self._next_due = {}
+        self._running = set()
+        self._lock_file = None
+        self._task = None
+        self._counters = {"refreshed": 0, "skipped_fresh": 0, "failed": 0, "unwatched_missing": 0, "deferred": 0,
+                          "errors": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _score(self, entry: dict, now: float) -> float:
+        return entry["score"] * 0.5 ** ((now - entry["score_updated"]) / self.half_life)
+
+    def _jittered_interval(self) -> float:
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def is_watched(self, username: str) -> bool:
+        return self.enabled and profile_cache.key(username) in self._watched
+
+    def record_access(self, username: str):
+        """Count a read towards the profile's refresh priority (buffered; flushed on the next sync)"""
+        if not self.enabled:
+            return
+        key = profile_cache.key(username)
+        with self._lock:
+            if key in self._watched or key in self._pending:
+                self._hits[key] = self._hits.get(key, 0) + 1
+            elif self.auto_watch and len(self._watched) + len(self._pending) < self.max_watched:
+                self._pending[key] = username
+                self._hits[key] = 1
+
+    def watch(self, usernames: List[str]) -> int:
+        """Add usernames to the watchlist; returns how many are watched afterwards"""
+        now = time.time()
+        names = {profile_cache.key(username): username for username in usernames}
+        with self._lock:
+            new = [key for key in names if key not in self._watched]
+            if len(self._watched) + len(new) > self.max_watched:
+                raise ValueError(f"At most {self.max_watched} usernames can be watched")
+            for key in new:
+                self._watched[key] = {"username": names[key], "score": 0.0, "score_updated": now}
+        if profile_cache.store:
+            try:
+                profile_cache.store.watch(names, now)
+            except sqlite3.Error as e:
+                print(f"Watchlist write failed: {e}")
+        return len(self._watched)
+
+    def unwatch(self, username: str) -> bool:
+        key = profile_cache.key(username)
+        with self._lock:
+            removed = self._watched.pop(key, None) is not None
+            self._pending.pop(key, None)
+            self._next_due.pop(key, None)
+        if profile_cache.store:
+            try:
+                profile_cache.store.unwatch(key)
+            except sqlite3.Error as e:
+                print(f"Watchlist write failed: {e}")
+        return removed
+
+    def load_watchlist(self, usernames: str, path: str):
+        """Seed the watchlist from a comma-separated list and/or a file with one username per line"""
+        names = [name.strip() for name in usernames.split(",") if name.strip()]
+        if path:
+            try:
+                with open(path) as f:
+                    names.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+            except OSError as e:
+                print(f"Could not read watchlist file {path}: {e}")
+        if names:
+            try:
+                self.watch(names[:self.max_watched])
+            except ValueError as e:
+                print(f"Watchlist truncated: {e}")
+
+    def _sync(self):
+        """Flush buffered accesses and reload the shared watchlist (runs off the event loop)"""
+        now = time.time()
+        with self._lock:
+            hits, self._hits = self._hits, {}
+            pending, self._pending = self._pending, {}
+        rows = None
+        if profile_cache.store:
+            try:
+                if pending:
+                    profile_cache.store.watch(pending, now)
+                if hits:
+                    profile_cache.store.add_watch_hits(hits, now, self.half_life)
+                rows = profile_cache.store.watched()
+            except sqlite3.Error as e:
+                print(f"Watchlist sync failed: {e}")
+        with self._lock:
+            if rows is not None:
+                self._watched = {
+                    key: {"username": name, "score": score, "score_updated": updated}
+                    for key, name, score, updated in rows
+                }
+            else:
+                for key, username in pending.items():
+                    self._watched.setdefault(key, {"username": username, "score": 0.0, "score_updated": now})
+                for key, count in hits.items():
+                    entry = self._watched.get(key)
+                    if entry:
+                        entry["score"] = self._score(entry, now) + count
+                        entry["score_updated"] = now
+            for key in list(self._next_due):
+                if key not in self._watched:
+                    del self._next_due[key]
+            new_keys = [key for key in self._watched if key not in self._next_due]
+        # Profiles cached recently (by any worker) are not due until a full interval after that scrape
+        for key in new_keys:
+            fetched_at = profile_cache.fetched_at(key)
+            self._next_due[key] = fetched_at + self._jittered_interval() if fetched_at else now
+        self._try_lead()
+
+    def _try_lead(self):
+        if self.leader:
+            return
+        if fcntl is None:
+            self.leader = True
+            return
+        try:
+            os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+            lock_file = open(self.lock_path, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return
+        except OSError as e:
+            print(f"Refresh scheduler lock unavailable: {e}")
+            return
+        self._lock_file = lock_file
+        self.leader = True
+        print(f"Refresh scheduler running in process {os.getpid()}")
+
+    def _next_key(self, now: float) -> Optional[tuple]:
+        """(key, username) of the most-read watched profile that is due, if any"""
+        with self._lock:
+            due = [
+                key for key, due_at in self._next_due.items()
+                if due_at <= now and key not in self._running and key in self._watched
+            ]
+            if not due:
+                return None
+            key = max(due, key=lambda key: self._score(self._watched[key], now))
+            return key, self._watched[key]["username"]
+
+    def _sleep_seconds(self, now: float) -> float:
+        with self._lock:
+            upcoming = [due_at for key, due_at in self._next_due.items() if key not in self._running]
+        return max(0.05, min([self.sync_interval] + [due_at - now for due_at in upcoming]))
+
+    async def _refresh(self, key: str, username: str, semaphore: asyncio.Semaphore):
+        next_due = None
+        try:
+            await single_flight.run(username)
+            self._count("refreshed")
+        except HTTPException as e:
+            if e.status_code == 404:
+                self._count("unwatched_missing")
+                self.unwatch(username)
+                print(f"Stopped watching {username}: profile not found")
+            elif e.status_code == 503:
+                # Executor saturated by user traffic; try again shortly
+                next_due = time.time() + scrape_executor.retry_after
+            else:
+                self._count("failed")
+                print(f"Scheduled refresh of {username} failed: {e.detail}")
+        except UpstreamUnavailable as e:
+            self._count("deferred")
+            next_due = time.time() + e.retry_after
+        except Exception as e:
+            self._count("failed")
+            print(f"Scheduled refresh of {username} failed: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(key)
+                if key in self._next_due:
+                    self._next_due[key] = next_due or time.time() + self._jittered_interval()
+            semaphore.release()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        next_sync = 0.0
+        while True:
+            try:
+                now = time.time()
+                if now >= next_sync:
+                    await loop.run_in_executor(None, self._sync)
+                    next_sync = now + self.sync_interval
+                due = self._next_key(now) if self.leader else None
+                if due is None:
+                    await asyncio.sleep(self._sleep_seconds(now))
+                    continue
+                if upstream_governor.is_open():
+                    # Nothing would get through; keep syncing and wait for the circuit to close
+                    await asyncio.sleep(min(self.sync_interval, upstream_governor.retry_after()))
+                    continue
+                key, username = due
+                # Skip (without spending rate budget) profiles another worker or a user request just scraped
+                fetched_at = profile_cache.fetched_at(username)
+                if fetched_at and now - fetched_at < self.interval * (1 - self.jitter):
+                    self._count("skipped_fresh")
+                    with self._lock:
+                        self._next_due[key] = fetched_at + self._jittered_interval()
+                    continue
+                await self._limiter.acquire()
+                await semaphore.acquire()
+                with self._lock:
+                    self._running.add(key)
+                loop.create_task(self._refresh(key, username, semaphore))
+            except Exception as e:
+                # One bad iteration must not stop background refresh for good
+                self._count("errors")
+                print(f"Refresh scheduler error: {e}")
+                await asyncio.sleep(self.ERROR_BACKOFF)
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            self.leader = False
+
+    def snapshot(self) -> List[dict]:
+        """Watched profiles, most-read first"""
+        now = time.time()
+        with self._lock:
+            entries = [
+                {
+                    "username": entry["username"],
+                    "score": round(self._score(entry, now), 3),
+                    "next_refresh_in": round(self._next_due[key] - now, 1) if key in self._next_due else None,
+                }
+                for key, entry in self._watched.items()
+            ]
+        return sorted(entries, key=lambda entry: entry["score"], reverse=True)
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            counters = dict(self._counters)
+            counters["watched"] = len(self._watched)
+            counters["overdue"] = sum(1 for due_at in self._next_due.values() if due_at <= now)
+            counters["running"] = len(self._running)
+        counters["enabled"] = self.enabled
+        counters["leader"] = self.leader
+        return counters
+
+refresh_scheduler = RefreshScheduler(
+    REFRESH_ENABLED, REFRESH_INTERVAL, REFRESH_JITTER, REFRESH_RATE_LIMIT, REFRESH_CONCURRENCY,
+    REFRESH_AUTO_WATCH, REFRESH_MAX_WATCHED, REFRESH_SCORE_HALF_LIFE, REFRESH_SYNC_INTERVAL, SINGLE_FLIGHT_LOCK_DIR,
+)
+
+class ResponseStats:
+    """Conditional request and compression counters for API responses (only updated on the event loop)"""
+    def __init__(self):
+        self._counters = {"conditional_requests": 0, "not_modified": 0, "compressed_responses": 0,
+                          "uncompressed_bytes": 0, "compressed_bytes": 0}
+        self._encodings = {}
+
+    def count(self, name: str, amount: int = 1):
+        self._counters[name] += amount
+
+    def count_compressed(self, encoding: str, size: int, compressed_size: int):
+        self._counters["compressed_responses"] += 1
+        self._counters["uncompressed_bytes"] += size
+        self._counters["compressed_bytes"] += compressed_size
+        self._encodings[encoding] = self._encodings.get(encoding, 0) + 1
+
+    def stats(self) -> dict:
+        stats = dict(self._counters)
+        stats["encodings"] = dict(self._encodings)
+        stats["compression_ratio"] = (
+            round(stats["compressed_bytes"] / stats["uncompressed_bytes"], 4) if stats["uncompressed_bytes"] else None
+        )
+        return stats
+
+response_stats = ResponseStats()
+
+def cache_control(status: str) -> str:
+    """Cache-Control for a profile response; fallback copies are already past their freshness"""
+    if HTTP_CACHE_MAX_AGE <= 0:
+        return "no-cache"
+    directives = ["public", f"max-age={0 if status == 'fallback' else HTTP_CACHE_MAX_AGE}"]
+    if HTTP_CACHE_STALE_WHILE_REVALIDATE > 0:
+        directives.append(f"stale-while-revalidate={HTTP_CACHE_STALE_WHILE_REVALIDATE}")
+    if HTTP_CACHE_STALE_IF_ERROR > 0:
+        directives.append(f"stale-if-error={HTTP_CACHE_STALE_IF_ERROR}")
+    return ", ".join(directives)
+
+def entity_tag(body: bytes) -> str:
+    """Strong ETag from the encoded body, so an unchanged profile keeps its tag across re-scrapes"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires: W/ prefixes (added by compression) are ignored"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when there is none"""
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_none_match is None and not if_modified_since:
+        return False
+    response_stats.count("conditional_requests")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    # Last-Modified is sent with one-second resolution
+    return int(last_modified) <= since
+
+def cacheable_response(request: Optional[Request], content, status: str, age: float) -> Response:
+    """JSON response with validators and Cache-Control; 304 when a conditional GET already holds this body
+
+    Last-Modified is when the served copy was scraped. POST requests get the same headers but are never answered
+    with 304.
+    """
+    body = dumps_json(content)
+    last_modified = time.time() - age
+    headers = {
+        "X-Cache": status.upper(),
+        "Age": str(int(age)),
+        "ETag": entity_tag(body),
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": cache_control(status),
+    }
+    if request is not None and request.method == "GET" and is_not_modified(request, headers["ETag"], last_modified):
+        response_stats.count("not_modified")
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+COMPRESSIBLE_MEDIA_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+class StreamEncoder:
+    """Incremental gzip or brotli encoder; chunks of a streamed body are flushed so they are not held back"""
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int, size_hint: Optional[int] = None):
+        self.encoding = encoding
+        # A window no larger than the body avoids allocating brotli's default 4 MB ring buffer per response
+        window = min(22, max(10, size_hint.bit_length())) if size_hint else 22
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality, lgwin=window)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + min(15, max(9, window)))
+
+    def encode(self, data: bytes, more: bool) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + (self._compressor.flush() if more else self._compressor.finish())
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH if more else zlib.Z_FINISH)
+
+class CompressionMiddleware:
+    """gzip/brotli for JSON, NDJSON and text responses, picked from Accept-Encoding (brotli preferred)
+
+    Bodies sent in one piece are compressed when at least `minimum_size` bytes; streamed ones (bulk NDJSON) always,
+    chunk by chunk. Responses to requests that negotiated an encoding get a weak ETag, since the bytes may differ
+    from the identity encoding; 304s get the same ETag and Vary as the 200 they stand for.
+    """
+    def __init__(self, app, minimum_size: int, gzip_level: int, brotli_quality: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    @staticmethod
+    def choose_encoding(accept_encoding: str) -> Optional[str]:
+        qualities = {}
+        for item in accept_encoding.lower().split(","):
+            coding, _, params = item.partition(";")
+            quality = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            qualities[coding.strip()] = quality
+        for encoding in (("br", "gzip") if BROTLI_AVAILABLE else ("gzip",)):
+            if qualities.get(encoding, qualities.get("*", 0.0)) > 0:
+                return encoding
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"accept-encoding"), "")
+        encoding = self.choose_encoding(accept_encoding)
+        start = None
+        encoder = None
+        passthrough = False
+        sizes = [0, 0]
+
+        async def send_compressed(message):
+            nonlocal start, encoder, passthrough
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(raw=start["headers"])
+                # A 304 has no body, but must carry the ETag and Vary of the 200 it revalidates
+                not_modified = start["status"] == 304
+                compressible = not_modified or (
+                    headers.get("content-type", "").startswith(COMPRESSIBLE_MEDIA_TYPES)
+                    and "content-encoding" not in headers and start["status"] != 204
+                )
+                if compressible:
+                    headers.add_vary_header("Accept-Encoding")
+                    # Weak whenever an encoding was negotiated, whether or not this body was big enough to compress
+                    if encoding is not None and "etag" in headers and not headers["etag"].startswith("W/"):
+                        headers["ETag"] = "W/" + headers["etag"]
+                if (not_modified or not compressible or encoding is None
+                        or (not more and len(body) < self.minimum_size)):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                encoder = StreamEncoder(encoding, self.gzip_level, self.brotli_quality, None if more else len(body))
+                headers["Content-Encoding"] = encoding
+                data = encoder.encode(body, more)
+                if more:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(data))
+                await send(start)
+            else:
+                data = encoder.encode(body, more)
+            sizes[0] += len(body)
+            sizes[1] += len(data)
+            if not more:
+                response_stats.count_compressed(encoding, *sizes)
+            await send({"type": "http.response.body", "body": data, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
+
+if RESPONSE_COMPRESSION:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=RESPONSE_COMPRESSION_MIN_SIZE,
+        gzip_level=RESPONSE_GZIP_LEVEL,
+        brotli_quality=RESPONSE_BROTLI_QUALITY,
+    )
+
+def serve_fallback(username: str, error: UpstreamUnavailable, groups: Optional[tuple] = None):
+    """Serve any cached copy, however old, while leetcode.com is unavailable; otherwise 503 with Retry-After"""
+    entry = profile_cache.fallback(username, groups)
+    if entry is None:
+        raise HTTPException(status_code=503, detail=error.detail, headers={"Retry-After": str(error.retry_after)})
+    profile_data, fetched_at = entry
+    return profile_data, "fallback", time.time() - fetched_at
+
+async def resolve_profile(username: str, rate_limiter: Optional[RateLimiter] = None, browser_mode: Optional[str] = None,
+                          fields: Optional[frozenset] = None):
+    """Return (profile, cache status, age), scraping on a miss and revalidating stale entries in the background
+
+    With `fields`, only the FIELD_GROUPS covering them are looked up and scraped; other fields may be empty.
+    """
+    if profile_cache.is_missing(username):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    groups = field_groups(fields) if fields is not None else None
+    refresh_scheduler.record_access(username)
+    profile_data, status, age = profile_cache.lookup(username, groups)
+    if status == "miss":
+        try:
+            if upstream_governor.is_open():
+                raise upstream_governor.unavailable()
+            if rate_limiter:
+                await rate_limiter.acquire()
+            profile_data = await single_flight.run(username, browser_mode, groups)
+        except UpstreamUnavailable as e:
+            return serve_fallback(username, e, groups)
+        age = 0
+    elif status == "stale" and not refresh_scheduler.is_watched(username) and not upstream_governor.is_open():
+        # Watched profiles are refreshed on the scheduler's budget instead of on read
+        key = single_flight.flight_key(username, groups)
+        if key not in _refresh_tasks:
+            _refresh_tasks.add(key)
+            profile_cache.mark_refresh()
+            asyncio.get_running_loop().create_task(refresh_profile(username, groups))
+    return profile_data, status, age
+
+async def load_profile(username: str, request: Request, browser_mode: Optional[str] = None, fields=None) -> Response:
+    """Serve a profile (or a fields= projection of it) for a single-profile endpoint, with cache headers"""
+    fields = parse_fields(fields)
+    profile_data, status, age = await resolve_profile(username, browser_mode=browser_mode, fields=fields)
+    content = project_profile(profile_data, fields) if fields is not None else profile_data.model_dump()
+    return cacheable_response(request, content, status, age)
+
+async def bulk_fetch_one(username: str, version: int = 1) -> dict:
+    """Fetch one profile for a bulk request, reporting failures inline instead of raising"""
+    for attempt in range(BULK_RETRIES + 1):
+        try:
+            profile_data, status, _ = await resolve_profile(username, bulk_rate_limiters["leetcode.com"])
+            profile = ProfileStats.from_profile(profile_data).to_dict() if version == 2 else profile_data.model_dump()
+            return {"username": username, "ok": True, "cache": status.upper(), "profile": profile}
+        except HTTPException as e:
+            # Executor saturation is transient for a bulk job: wait and retry rather than fail the user
+            if e.status_code == 503 and attempt < BULK_RETRIES and not upstream_governor.is_open():
+                await asyncio.sleep(scrape_executor.retry_after)
+                continue
+            return {"username": username, "ok": False, "status_code": e.status_code, "error": e.detail}
+        except Exception as e:
+            return {"username": username, "ok": False, "status_code": 500, "error": str(e)}
+
+async def stream_bulk_profiles(usernames: List[str], concurrency: int, version: int = 1):
+    """Yield one NDJSON line per username as soon as its profile is ready"""
+    results = asyncio.Queue(maxsize=concurrency)
+    pending = iter(usernames)
+    
+    async def worker():
+        # Workers share one iterator, so each username is fetched exactly once
+        for username in pending:
+            await results.put(await bulk_fetch_one(username, version))
+    
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(usernames)))]
+    try:
+        for _ in range(len(usernames)):
+            result = await results.get()
+            yield dumps_json(result) + b"\n"
+    finally:
+        # Stop fetching if the client disconnects mid-stream
+        for task in workers:
+            task.cancel()
+
+@app.post("/scrape-profile", response_model=None, responses=PROFILE_RESPONSES)
+async def scrape_profile(request: ScrapeRequest, http_request: Request):
     """
     Scrape LeetCode profile data for a given username
     """
     try:
-        profile_data = scrape_leetcode_profile(request.username)
-        return profile_data
+        return await load_profile(request.username, http_request, request.browser_mode, request.fields)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
-@app.get("/scrape-profile/{username}", response_model=ProfileData)
-async def scrape_profile_get(username: str):
+@app.get("/scrape-profile/{username}", response_model=None, responses=PROFILE_RESPONSES)
+async def scrape_profile_get(username: str, request: Request, browser_mode: Optional[BrowserMode] = None,
+                             fields: Optional[str] = Query(None, description=FIELDS_QUERY_DESCRIPTION)):
     """
-    Scrape LeetCode profile data for a given username (GET endpoint)
+    Scrape LeetCode profile data for a given username (GET endpoint); honours If-None-Match/If-Modified-Since
     """
     try:
-        profile_data = scrape_leetcode_profile(username)
-        return profile_data
+        return await load_profile(username, request, browser_mode, fields)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
+def bulk_profiles_response(request: BulkScrapeRequest, version: int) -> StreamingResponse:
+    usernames = list(dict.fromkeys(u.strip() for u in request.usernames if u.strip()))
+    if not usernames:
+        raise HTTPException(status_code=400, detail="No usernames provided")
+    if len(usernames) > BULK_MAX_USERNAMES:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_USERNAMES} usernames per request")
+    concurrency = max(1, min(request.concurrency or BULK_CONCURRENCY, BULK_MAX_CONCURRENCY))
+    return StreamingResponse(stream_bulk_profiles(usernames, concurrency, version), media_type="application/x-ndjson")
+
+@app.post("/scrape-profiles")
+async def scrape_profiles(request: BulkScrapeRequest):
+    """
+    Scrape many LeetCode profiles, streaming results as NDJSON in completion order
+    """
+    return bulk_profiles_response(request, version=1)
+
+async def fetch_for_leaderboard(username: str, semaphore: asyncio.Semaphore) -> bool:
+    """Scrape a missing or stale cohort member; failures just leave it out of (or stale in) the ranking"""
+    async with semaphore:
+        try:
+            if profile_cache.is_missing(username) or upstream_governor.is_open():
+                return False
+            await bulk_rate_limiters["leetcode.com"].acquire()
+            await single_flight.run(username)
+            return True
+        except (HTTPException, UpstreamUnavailable):
+            return False
+        except Exception as e:
+            print(f"Leaderboard fetch of {username} failed: {e}")
+            return False
+
+async def build_leaderboard(request: LeaderboardRequest) -> dict:
+    if request.sort not in LEADERBOARD_COLUMNS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Cannot sort by {request.sort} (available: {', '.join(LEADERBOARD_COLUMNS)})",
+        )
+    names = {}
+    for username in request.usernames:
+        username = username.strip()
+        if username:
+            names.setdefault(profile_cache.key(username), username)
+    if not names:
+        raise HTTPException(status_code=400, detail="No usernames provided")
+    if len(names) > LEADERBOARD_MAX_USERNAMES:
+        raise HTTPException(status_code=400, detail=f"At most {LEADERBOARD_MAX_USERNAMES} usernames per leaderboard")
+    order = request.order or ("asc" if request.sort in LEADERBOARD_ASCENDING else "desc")
+    limit = max(1, min(request.limit, LEADERBOARD_MAX_PAGE))
+    offset = max(0, request.offset)
+    keys = list(names)
+    loop = asyncio.get_running_loop()
+    
+    # Scrape missing and stale members in parallel, within a per-request budget and deadline
+    fetched = 0
+    stale = 0
+    if request.fetch_missing:
+        missing, stale_keys = await loop.run_in_executor(None, leaderboard_index.freshness, keys)
+        stale = len(stale_keys)
+        to_fetch = (missing + stale_keys)[:LEADERBOARD_FETCH_LIMIT]
+        if to_fetch:
+            semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+            tasks = [asyncio.create_task(fetch_for_leaderboard(names[key], semaphore)) for key in to_fetch]
+            done, pending = await asyncio.wait(tasks, timeout=LEADERBOARD_FETCH_TIMEOUT)
+            for task in pending:
+                task.cancel()
+            fetched = sum(1 for task in done if not task.cancelled() and task.result())
+    
+    result = await loop.run_in_executor(None, rank_cohort, keys, request.sort, order, offset, limit)
+    absent = [names[key] for key in keys if key not in result["present"]]
+    return {
+        "sort": request.sort,
+        "order": order,
+        "cohort": {
+            "requested": len(keys),
+            "cached": len(result["present"]),
+            "ranked": result["ranked"],
+            "fetched": fetched,
+            "stale": stale,
+            "missing_count": len(absent),
+            "missing": absent[:100],
+        },
+        "summary": result["summary"],
+        "difficulty_distribution": result["difficulty_distribution"],
+        "offset": offset,
+        "entries": result["entries"],
+    }
+
+@app.get("/leaderboard")
+async def get_leaderboard(usernames: str, sort: str = "contest_rating", order: Optional[Literal["asc", "desc"]] = None,
+                          limit: int = 100, offset: int = 0, fetch_missing: bool = True):
+    """
+    Rank a cohort (comma-separated usernames) by a numeric stat, with cohort summaries
+    """
+    request = LeaderboardRequest(
+        usernames=usernames.split(","), sort=sort, order=order, limit=limit, offset=offset, fetch_missing=fetch_missing
+    )
+    return Response(dumps_json(await build_leaderboard(request)), media_type="application/json")
+
+@app.post("/leaderboard")
+async def post_leaderboard(request: LeaderboardRequest):
+    """
+    Same as GET /leaderboard, for cohorts too large for a query string
+    """
+    return Response(dumps_json(await build_leaderboard(request)), media_type="application/json")
+
+async def load_profile_v2(username: str, browser_mode: Optional[str] = None, request: Optional[Request] = None) -> Response:
+    """Serve a profile with parsed numeric stats, encoded without going through pydantic"""
+    profile_data, status, age = await resolve_profile(username, browser_mode=browser_mode)
+    return cacheable_response(request, ProfileStats.from_profile(profile_data).to_dict(), status, age)
+
+@app.post("/v2/scrape-profile", response_model=None, responses={200: {"model": ProfileDataV2}})
+async def scrape_profile_v2(request: ScrapeRequest):
+    """
+    Scrape a LeetCode profile and return typed stats (ints and floats instead of display strings)
+    """
+    if request.fields is not None:
+        raise HTTPException(status_code=400, detail="fields is only supported by /scrape-profile")
+    return await load_profile_v2(request.username, request.browser_mode)
+
+@app.get("/v2/scrape-profile/{username}", response_model=None, responses={200: {"model": ProfileDataV2}})
+async def scrape_profile_v2_get(username: str, request: Request, browser_mode: Optional[BrowserMode] = None):
+    """
+    Scrape a LeetCode profile and return typed stats (GET endpoint)
+    """
+    return await load_profile_v2(username, browser_mode, request)
+
+@app.post("/v2/scrape-profiles")
+async def scrape_profiles_v2(request: BulkScrapeRequest):
+    """
+    Bulk scrape with typed stats in each NDJSON line's "profile"
+    """
+    return bulk_profiles_response(request, version=2)
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "chrome": resolve_chrome_binaries()}
+
+@app.get("/stats")
+async def stats():
+    """Runtime metrics for the scraping backend"""
+    return {
+        "driver_pool": driver_pool.stats(),
+        "executor": scrape_executor.stats(),
+        "cache": profile_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "strategies": strategy_orchestrator.stats(),
+        "upstream_http": http_client.stats(),
+        "upstream_governor": upstream_governor.stats(),
+        "readiness": readiness_tracker.stats(),
+        "refresh_scheduler": refresh_scheduler.stats(),
+        "history": profile_history.stats() if profile_history else {"enabled": False},
+        "responses": response_stats.stats(),
+    }
+
+@app.get("/upstream")
+async def upstream_status():
+    """Circuit breaker state, adaptive concurrency limit and rate budget for leetcode.com"""
+    return upstream_governor.stats()
+
+async def load_history(username: str, since: Optional[float], until: Optional[float], limit: int):
+    """Read a user's snapshots off the event loop; 404 when nothing was ever recorded"""
+    if profile_history is None:
+        raise HTTPException(status_code=503, detail="Profile history is disabled")
+    limit = max(1, min(limit, HISTORY_MAX_POINTS))
+    loop = asyncio.get_running_loop()
+    try:
+        snapshots = await loop.run_in_executor(None, profile_history.snapshots, username, since, until, limit)
+        summary = await loop.run_in_executor(None, profile_history.summary, username)
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"Profile history read failed: {e}")
+    if snapshots is None or summary is None:
+        raise HTTPException(status_code=404, detail="No history recorded for this username")
+    return snapshots, summary
+
+@app.get("/history/{username}")
+async def get_profile_history(username: str, since: Optional[float] = None, until: Optional[float] = None,
+                              limit: int = HISTORY_MAX_POINTS):
+    """
+    Recorded snapshots of a profile, oldest first (since/until are Unix timestamps). Never scrapes
+    """
+    snapshots, summary = await load_history(username, since, until, limit)
+    return {
+        "username": username,
+        "total_snapshots": summary["snapshots"],
+        "last_seen": summary["last_seen"],
+        "snapshots": [
+            {"taken_at": taken_at, "profile": dict(zip(HISTORY_FIELDS, state), username=username)}
+            for taken_at, state in snapshots
+        ],
+    }
+
+@app.get("/history/{username}/series")
+async def get_profile_history_series(username: str, fields: Optional[str] = None, since: Optional[float] = None,
+                                     until: Optional[float] = None, limit: int = HISTORY_MAX_POINTS):
+    """
+    Numeric stats over time (e.g. ?fields=contest_rating,problems_solved,max_streak), one point per change
+    """
+    names = [name.strip() for name in fields.split(",") if name.strip()] if fields else list(HISTORY_SERIES_FIELDS)
+    unknown = [name for name in names if name not in HISTORY_SERIES_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown series fields: {', '.join(unknown)} (available: {', '.join(HISTORY_SERIES_FIELDS)})",
+        )
+    snapshots, summary = await load_history(username, since, until, limit)
+    positions = [(name, HISTORY_FIELDS.index(name)) for name in names]
+    return {
+        "username": username,
+        "fields": names,
+        "last_seen": summary["last_seen"],
+        "points": [
+            dict({name: history_number(state[index]) for name, index in positions}, taken_at=taken_at)
+            for taken_at, state in snapshots
+        ],
+    }
+
+@app.get("/watchlist")
+async def get_watchlist():
+    """Watched usernames with their access score and time until the next scheduled refresh"""
+    return {"enabled": refresh_scheduler.enabled, "watched": refresh_scheduler.snapshot()}
+
+@app.post("/watchlist")
+async def add_to_watchlist(request: WatchlistRequest):
+    """Add usernames to the background refresh watchlist"""
+    usernames = list(dict.fromkeys(u.strip() for u in request.usernames if u.strip()))
+    if not usernames:
+        raise HTTPException(status_code=400, detail="No usernames provided")
+    try:
+        watched = await asyncio.get_running_loop().run_in_executor(None, refresh_scheduler.watch, usernames)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"added": len(usernames), "watched": watched}
+
+@app.delete("/watchlist/{username}")
+async def remove_from_watchlist(username: str):
+    """Stop refreshing a username in the background"""
+    removed = await asyncio.get_running_loop().run_in_executor(None, refresh_scheduler.unwatch, username)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Username is not watched")
+    return {"removed": username}
+
+def _stats_metrics(section: str, stats: dict, label: Optional[str] = None) -> List[str]:
+    """Render a stats() dict as typed gauges; one level of nested dicts becomes a label"""
+    families = {}
+    for key, value in stats.items():
+        if isinstance(value, dict) and label:
+            for label_value, nested in value.items():
+                if isinstance(nested, dict):
+                    for nested_key, nested_value in nested.items():
+                        if isinstance(nested_value, (int, float)):
+                            families.setdefault(nested_key, []).append((f'{{{label}="{label_value}"}}', nested_value))
+                elif isinstance(nested, (int, float)):
+                    families.setdefault(key, []).append((f'{{{label}="{label_value}"}}', nested))
+        elif isinstance(value, (bool, int, float)):
+            families.setdefault(key, []).append(("", value))
+    # Samples of one metric are grouped under its HELP/TYPE lines, as the exposition format requires
+    lines = []
+    for key, samples in families.items():
+        name = f"{METRICS_PREFIX}_{section}_{key}"
+        lines.append(f"# HELP {name} {section} {key} (see /stats)")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(f"{name}{labels} {float(value)}" for labels, value in samples)
+    return lines
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: per-stage scrape latency plus the /stats counters as gauges"""
+    lines = []
+    for metric in (scrape_stage_seconds, scrape_duration_seconds, scrape_results_total):
+        lines.extend(metric.render())
+    lines.extend(_stats_metrics("driver_pool", driver_pool.stats()))
+    lines.extend(_stats_metrics("executor", scrape_executor.stats()))
+    lines.extend(_stats_metrics("cache", profile_cache.stats()))
+    lines.extend(_stats_metrics("single_flight", single_flight.stats()))
+    lines.extend(_stats_metrics("strategies", strategy_orchestrator.stats(), label="source"))
+    lines.extend(_stats_metrics("upstream", http_client.stats(), label="status"))
+    lines.extend(_stats_metrics("upstream_governor", upstream_governor.stats()))
+    lines.extend(_stats_metrics("readiness", {"strategies": readiness_tracker.stats()}, label="strategy"))
+    lines.extend(_stats_metrics("refresh_scheduler", refresh_scheduler.stats()))
+    if profile_history:
+        lines.extend(_stats_metrics("history", profile_history.stats()))
+    lines.extend(_stats_metrics("responses", response_stats.stats(), label="encoding"))
+    return PlainTextResponse("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4")
+
+@app.on_event("startup")
+async def resolve_chrome_on_startup():
+    """Resolve browser binaries before serving so cold requests skip driver discovery"""
+    binaries = await asyncio.get_running_loop().run_in_executor(None, resolve_chrome_binaries)
+    if CHROMEDRIVER_REQUIRED and not binaries["available"]:
+        raise RuntimeError(f"chromedriver is required but unavailable: {binaries['error']}")
+
+@app.on_event("startup")
+async def start_refresh_scheduler():
+    """Seed the watchlist from the environment and start background refreshes"""
+    if REFRESH_ENABLED:
+        await asyncio.get_running_loop().run_in_executor(
+            None, refresh_scheduler.load_watchlist, REFRESH_WATCHLIST, REFRESH_WATCHLIST_FILE
+        )
+        refresh_scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_scraping():
+    await refresh_scheduler.stop()
+    scrape_executor.shutdown()
+    strategy_orchestrator.shutdown()
+    driver_pool.close()
+    await http_client.aclose()
 
 @app.get("/test-scrape/{username}")
-async def test_scrape(username: str):
+async def test_scrape(username: str, browser_mode: Optional[BrowserMode] = None):
     """
     Test endpoint to debug scraping issues with Selenium
     """
-    driver = None
+    return await scrape_executor.run(run_test_scrape, username, browser_mode)
+
+def run_test_scrape(username: str, browser_mode: Optional[str] = None) -> dict:
+    """Collect page diagnostics for a profile (runs on the scrape executor)"""
     try:
-        driver = get_chrome_driver()
-        
-        if driver:
-            url = f"https://leetcode.com/u/{username}/"
-            driver.get(url)
-            
-            # Wait for page to load
-            time.sleep(5)
-            
-            page_source = driver.page_source
-            soup = BeautifulSoup(page_source, 'html.parser')
-            
-            return {
-                "method": "selenium",
-                "url": url,
-                "page_title": driver.title,
-                "content_length": len(page_source),
-                "has_script_tags": len(soup.find_all('script')),
-                "page_loaded": "body" in page_source.lower(),
-                "profile_elements_found": {
-                    "name_elements": len(driver.find_elements(By.CSS_SELECTOR, 'div[class*="text-label-1"]')),
-                    "avatar_elements": len(driver.find_elements(By.CSS_SELECTOR, 'img[alt*="Avatar"]')),
-                    "rank_elements": len(driver.find_elements(By.CSS_SELECTOR, 'span[class*="rank"]')),
-                    "github_links": len(driver.find_elements(By.CSS_SELECTOR, 'a[href*="github.com"]')),
-                    "linkedin_links": len(driver.find_elements(By.CSS_SELECTOR, 'a[href*="linkedin.com"]'))
+        with driver_pool.checkout() as driver:
+            if driver:
+                apply_browser_mode(driver, browser_mode)
+                url = profile_url(username)
+                driver.get(url)
+                
+                # Wait for page to load
+                readiness_seconds = wait_for_profile_ready(driver)
+                
+                page_source = driver.page_source
+                soup = BeautifulSoup(page_source, 'html.parser')
+                
+                return {
+                    "method": "selenium",
+                    "url": url,
+                    "browser_mode": browser_mode or BROWSER_MODE,
+                    "readiness_strategy": READINESS_STRATEGY,
+                    "readiness_seconds": round(readiness_seconds, 3),
+                    "page_title": driver.title,
+                    "content_length": len(page_source),
+                    "has_script_tags": len(soup.find_all('script')),
+                    "page_loaded": "body" in page_source.lower(),
+                    "profile_elements_found": {
+                        "name_elements": len(driver.find_elements(By.CSS_SELECTOR, 'div[class*="text-label-1"]')),
+                        "avatar_elements": len(driver.find_elements(By.CSS_SELECTOR, 'img[alt*="Avatar"]')),
+                        "rank_elements": len(driver.find_elements(By.CSS_SELECTOR, 'span[class*="rank"]')),
+                        "github_links": len(driver.find_elements(By.CSS_SELECTOR, 'a[href*="github.com"]')),
+                        "linkedin_links": len(driver.find_elements(By.CSS_SELECTOR, 'a[href*="linkedin.com"]'))
+                    }
                 }
-            }
-        else:
-            # Test requests-only approach
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-            
-            url = f"https://leetcode.com/u/{username}/"
-            response = requests.get(url, headers=headers, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            return {
-                "method": "requests_only",
-                "url": url,
-                "status_code": response.status_code,
-                "content_length": len(response.content),
-                "has_script_tags": len(soup.find_all('script')),
-                "page_loaded": "body" in response.text.lower(),
-                "profile_elements_found": {
-                    "name_elements": len(soup.select('div[class*="text-label-1"]')),
-                    "avatar_elements": len(soup.select('img[alt*="Avatar"]')),
-                    "rank_elements": len(soup.select('span[class*="rank"]')),
-                    "github_links": len(soup.select('a[href*="github.com"]')),
-                    "linkedin_links": len(soup.select('a[href*="linkedin.com"]'))
+            else:
+                # Test requests-only approach
+                url = profile_url(username)
+                response = http_client.get(url, headers=BROWSER_HEADERS)
+                soup = BeautifulSoup(response.content, 'html.parser')
+                
+                return {
+                    "method": "requests_only",
+                    "url": url,
+                    "status_code": response.status_code,
+                    "http_version": response.http_version,
+                    "content_length": len(response.content),
+                    "has_script_tags": len(soup.find_all('script')),
+                    "page_loaded": "body" in response.text.lower(),
+                    "profile_elements_found": {
+                        "name_elements": len(soup.select('div[class*="text-label-1"]')),
+                        "avatar_elements": len(soup.select('img[alt*="Avatar"]')),
+                        "rank_elements": len(soup.select('span[class*="rank"]')),
+                        "github_links": len(soup.select('a[href*="github.com"]')),
+                        "linkedin_links": len(soup.select('a[href*="linkedin.com"]'))
+                    }
                 }
-            }
     except Exception as e:
         return {"error": str(e)}
-    finally:
-        if driver:
-            driver.quit()
 
 if __name__ == "__main__":
     import uvicorn